@@ -0,0 +1,128 @@
+"""Write-behind buffer for the activity log.
+
+record() only appends the event to an in-memory deque, so logging costs the
+request a few microseconds and never a commit. A background thread per
+worker process writes the buffered events in one batch when
+ACTIVITY_FLUSH_SIZE of them are waiting or every ACTIVITY_FLUSH_SECONDS,
+whichever comes first. Buffered events are lost if the process dies
+without running its exit handlers; a failed write is retried with the next
+flush, and events beyond ACTIVITY_BUFFER_MAX are dropped (and counted).
+"""
+import atexit
+import os
+import threading
+from collections import deque
+
+import logs
+import metrics
+
+ACTIVITY_LOG_ENABLED = os.environ.get('ACTIVITY_LOG_ENABLED', 'True').lower() == 'true'
+ACTIVITY_FLUSH_SIZE = int(os.environ.get('ACTIVITY_FLUSH_SIZE', '200'))
+ACTIVITY_FLUSH_SECONDS = float(os.environ.get('ACTIVITY_FLUSH_SECONDS', '2'))
+ACTIVITY_BUFFER_MAX = int(os.environ.get('ACTIVITY_BUFFER_MAX', '50000'))
+
+log = logs.get_logger('activity')
+
+metrics.describe('activity_events_total', 'Activity events recorded', 'counter')
+metrics.describe('activity_events_dropped_total', 'Activity events dropped because the buffer was full', 'counter')
+metrics.describe('activity_flushes_total', 'Activity buffer flushes by outcome', 'counter')
+metrics.describe('activity_buffer_size', 'Activity events waiting to be written', 'gauge')
+
+
+class WriteBehindBuffer:
+    def __init__(self, write, flush_size=ACTIVITY_FLUSH_SIZE, flush_seconds=ACTIVITY_FLUSH_SECONDS,
+                 max_buffered=ACTIVITY_BUFFER_MAX):
+        self.write = write
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.max_buffered = max_buffered
+        self._events = deque()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+        self._pid = None
+
+    def record(self, event):
+        if self._pid != os.getpid():
+            self._start()
+        if len(self._events) >= self.max_buffered:
+            metrics.inc('activity_events_dropped_total')
+            return
+        self._events.append(event)
+        metrics.inc('activity_events_total')
+        if len(self._events) >= self.flush_size:
+            self._wake.set()
+
+    def size(self):
+        return len(self._events)
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of events written"""
+        with self._flush_lock:
+            batch = []
+            while self._events and len(batch) < self.max_buffered:
+                batch.append(self._events.popleft())
+            if not batch:
+                return 0
+            try:
+                self.write(batch)
+            except Exception as e:
+                metrics.inc('activity_flushes_total', outcome='failure')
+                log.error('activity.flush_failed', "❌ Writing activity events failed", events=len(batch), error=str(e))
+                # Back to the front, keeping the newest if that overflows the buffer
+                room = self.max_buffered - len(self._events)
+                if room < len(batch):
+                    metrics.inc('activity_events_dropped_total', len(batch) - max(room, 0))
+                self._events.extendleft(reversed(batch[-room:] if room > 0 else []))
+                return 0
+            metrics.inc('activity_flushes_total', outcome='success')
+            return len(batch)
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
+    def _start(self):
+        # Threads don't survive fork, so each worker process starts its own
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='activity-log', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+
+_buffer = None
+
+
+def configure(write):
+    """Set the function that inserts a batch of events (a list of dicts)"""
+    global _buffer
+    if ACTIVITY_LOG_ENABLED:
+        _buffer = WriteBehindBuffer(write)
+    return _buffer
+
+
+def record(event):
+    if _buffer is not None:
+        _buffer.record(event)
+
+
+def flush():
+    return _buffer.flush() if _buffer is not None else 0
+
+
+@metrics.register_collector
+def collect_activity_buffer():
+    if _buffer is not None:
+        yield 'activity_buffer_size', {}, _buffer.size()
@@ -0,0 +1,203 @@
+"""Admission control: cap concurrent expensive requests per route group and shed the excess.
+
+Each gate allows `limit` requests in flight across all gunicorn workers and up
+to `queue_size` more waiting for a slot in each worker. Anything beyond that,
+or anything that waits longer than the queue timeout, is rejected immediately
+with 503 and Retry-After so cheap routes keep their workers.
+
+Slots are rows in a local SQLite file shared by the workers (like the rate
+limiter's buckets), so the limits hold with sync workers too, where each
+process only ever runs one request. A slot is leased for
+ADMISSION_LEASE_SECONDS, so slots held by a worker that died are freed.
+"""
+import itertools
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify
+
+import logs
+import metrics
+
+QUEUE_TIMEOUT_MS = int(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', '2000'))
+RETRY_AFTER_SECONDS = int(os.environ.get('ADMISSION_RETRY_AFTER', '2'))
+ADMISSION_STORAGE_PATH = os.environ.get(
+    'ADMISSION_STORAGE_PATH', os.path.join(tempfile.gettempdir(), 'todoapp-admission.db')
+)
+# Longer than any request runs (gunicorn kills sync workers after GUNICORN_TIMEOUT)
+ADMISSION_LEASE_SECONDS = float(os.environ.get('ADMISSION_LEASE_SECONDS', '60'))
+# How often a queued request checks for a free slot
+POLL_SECONDS = 0.02
+
+# Route group -> (default in-flight limit, default queue size)
+DEFAULT_GATES = {
+    'password_hash': (4, 16),  # login, register, reset_password
+    'smtp': (8, 32),           # forgot_password, send_email_summary
+    'google': (8, 32),         # google_auth
+}
+
+log = logs.get_logger('admission')
+
+metrics.describe('admission_in_flight', 'Requests of this worker currently holding an admission slot', 'gauge')
+metrics.describe('admission_queue_depth', 'Requests of this worker waiting for an admission slot', 'gauge')
+metrics.describe('admission_admitted_total', 'Requests admitted', 'counter')
+metrics.describe('admission_shed_total', 'Requests rejected with 503', 'counter')
+
+
+class SlotStore:
+    """Leased slots in a SQLite file; one connection per process, used under a lock"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._holders = itertools.count()
+
+    def _connect(self):
+        # Connections don't survive fork, so each worker process opens its own
+        if self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS slots ('
+                'gate TEXT NOT NULL, holder TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (gate, holder)'
+                ') WITHOUT ROWID'
+            )
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def take(self, gate, limit):
+        """Lease a slot of the gate; returns its holder id, or None when all `limit` are taken"""
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('DELETE FROM slots WHERE gate = ? AND expires < ?', (gate, now))
+                (taken,) = connection.execute('SELECT count(*) FROM slots WHERE gate = ?', (gate,)).fetchone()
+                holder = None
+                if taken < limit:
+                    holder = f'{os.getpid()}-{next(self._holders)}'
+                    connection.execute('INSERT INTO slots (gate, holder, expires) VALUES (?, ?, ?)',
+                                       (gate, holder, now + ADMISSION_LEASE_SECONDS))
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+        return holder
+
+    def give_back(self, gate, holder):
+        with self._lock:
+            self._connect().execute('DELETE FROM slots WHERE gate = ? AND holder = ?', (gate, holder))
+
+
+store = SlotStore(ADMISSION_STORAGE_PATH)
+
+
+class AdmissionGate:
+    def __init__(self, name, limit, queue_size, queue_timeout, slots=None):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.slots = slots or store
+        self.in_flight = 0
+        self.waiting = 0
+        self._lock = threading.Lock()
+
+    def _take(self):
+        try:
+            return self.slots.take(self.name, self.limit)
+        except sqlite3.Error as e:
+            # Fail open (admitted without a slot): a broken store shouldn't take the endpoint down
+            log.warning('admission.unavailable', "⚠️ Admission store unavailable", gate=self.name, error=str(e))
+            return ''
+
+    def acquire(self):
+        """Take a slot, waiting in the bounded queue if needed; returns the slot, or None to shed"""
+        holder = self._take()
+        if holder is None:
+            with self._lock:
+                if self.waiting >= self.queue_size:
+                    metrics.inc('admission_shed_total', gate=self.name, reason='queue_full')
+                    return None
+                self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while holder is None and time.monotonic() < deadline:
+                    time.sleep(POLL_SECONDS)
+                    holder = self._take()
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if holder is None:
+                metrics.inc('admission_shed_total', gate=self.name, reason='queue_timeout')
+                return None
+
+        with self._lock:
+            self.in_flight += 1
+        metrics.inc('admission_admitted_total', gate=self.name)
+        return holder
+
+    def release(self, holder):
+        with self._lock:
+            self.in_flight -= 1
+        if holder:
+            try:
+                self.slots.give_back(self.name, holder)
+            except sqlite3.Error as e:
+                # The lease runs out on its own
+                log.warning('admission.release_failed', "⚠️ Admission slot not released", gate=self.name,
+                            error=str(e))
+
+
+def _build_gates():
+    gates = {}
+    for name, (limit, queue_size) in DEFAULT_GATES.items():
+        prefix = f'ADMISSION_{name.upper()}'
+        gates[name] = AdmissionGate(
+            name,
+            limit=int(os.environ.get(f'{prefix}_LIMIT', limit)),
+            queue_size=int(os.environ.get(f'{prefix}_QUEUE', queue_size)),
+            queue_timeout=QUEUE_TIMEOUT_MS / 1000,
+        )
+    return gates
+
+
+gates = _build_gates()
+
+
+@metrics.register_collector
+def collect_admission_gauges():
+    for gate in gates.values():
+        yield 'admission_in_flight', {'gate': gate.name}, gate.in_flight
+        yield 'admission_queue_depth', {'gate': gate.name}, gate.waiting
+
+
+def admission_limit(gate_name):
+    """Decorator: run the view only if the gate admits it, otherwise 503 + Retry-After"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            gate = gates[gate_name]
+            holder = gate.acquire()
+            if holder is None:
+                response = jsonify({
+                    'error': 'Server is busy, please try again shortly',
+                    'retry_after': RETRY_AFTER_SECONDS
+                })
+                response.status_code = 503
+                response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+                return response
+            try:
+                return view(*args, **kwargs)
+            finally:
+                gate.release(holder)
+        return wrapper
+    return decorator
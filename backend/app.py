@@ -1,80 +1,445 @@
-from flask import Flask, request, jsonify
+from flask import (Flask, Blueprint, Response, request, jsonify, g, current_app, has_request_context, send_file,
+                   stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, get_jwt
-from flask_mail import Mail, Message
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, get_jwt, verify_jwt_in_request
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import csv
+import gc
+import io
+import json
 import os
-from urllib.parse import urlparse
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
-import requests
-from dotenv import load_dotenv
+import re
 import secrets
-import string
-from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
+import smtplib
+import threading
+import time
+from dotenv import load_dotenv
+import click
+from sqlalchemy import and_, bindparam, case, delete, func, insert, inspect, literal, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn, CreateTable
+from collections import Counter
+from contextlib import ExitStack, suppress
+from functools import partial, wraps
+from db_engine import build_engine_options, report_engine_settings
+from db_routing import (RoutingSession, build_replica_binds, read_replica, record_write,
+                        replica_reads, REPLICA_BIND_KEYS)
+from sharding import (SHARDING_ENABLED, SHARD_BIND_KEYS, SHARD_MOVE_DRAIN_SECONDS, SHARDED_TABLES,
+                      ShardMovingError, build_shard_binds, create_shard_schema, directory_metadata, each_shard,
+                      move_user, shard_metadata, shard_tables, user_shard, using_shard, using_user_shard)
+from warmup import warmup_step, warmup_status, is_ready, start_warmup, wait_for_warmup
+from admission import admission_limit
+from ratelimit import rate_limit
+from resilience import breakers, CircuitOpenError
+from ordering import key_between, keys_after, ORDER_KEY_MAX_LENGTH, ORDER_KEY_COLUMN_LENGTH
+import reminders
+import activity
+import group_commit
+import logs
+import profiling
+import server_timing
+import memory
+from read_models import (ARCHIVED_TODO_ROW_FIELDS, TASK_ROW_FIELDS, TODO_ROW_FIELDS, ArchivedTodoRow, TaskRow,
+                         TodoRow)
+from recurrence import normalize_rule, next_occurrence
+import metrics
+
+# Google OAuth, Flask-Mail and itsdangerous are imported where they are used, so
+# worker boot doesn't pay for integrations most requests never touch
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
-
-# JWT Configuration
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=7)  # Extended to 7 days
-app.config['JWT_ALGORITHM'] = 'HS256'
-
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID', '1234567890-abcdefghijklmnopqrstuvwxyz.apps.googleusercontent.com')
 GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET', 'your-google-client-secret')
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+
+# Upstream timeout budgets; calls also go through the circuit breakers in resilience.py
+GOOGLE_TIMEOUT_SECONDS = float(os.environ.get('GOOGLE_TIMEOUT_SECONDS', '5'))
+SMTP_TIMEOUT_SECONDS = float(os.environ.get('SMTP_TIMEOUT_SECONDS', '10'))
+
+# Notification emails list the newest active tasks up to this many, then "+N more"
+EMAIL_TASK_LIST_LIMIT = int(os.environ.get('EMAIL_TASK_LIST_LIMIT', '20'))
+
+# Google's signing certs rotate rarely, so they are cached per worker for as
+# long as Google's Cache-Control allows instead of fetched on every sign-in
+_google_response_cache = {}  # url -> (expires_at, response)
+_google_request = None
+
+class CachingGoogleRequest:
+    """google.auth transport that reuses one HTTP session and caches GET responses"""
+
+    def __init__(self):
+        import requests
+        from google.auth.transport import requests as google_requests
+        self._request = google_requests.Request(session=requests.Session())
+
+    def _send(self, url, method, timeout, **kwargs):
+        return breakers['google'].call(
+            self._request, url, method=method, timeout=timeout,
+            is_failure=lambda response: response.status >= 500, **kwargs
+        )
+
+    def __call__(self, url, method='GET', timeout=None, **kwargs):
+        timeout = timeout or GOOGLE_TIMEOUT_SECONDS
+        if method != 'GET':
+            return self._send(url, method, timeout, **kwargs)
+
+        cached = _google_response_cache.get(url)
+        if cached and cached[0] > time.time():
+            return cached[1]
+
+        response = self._send(url, method, timeout, **kwargs)
+        if response.status == 200:
+            match = re.search(r'max-age=(\d+)', response.headers.get('cache-control', ''))
+            if match:
+                _google_response_cache[url] = (time.time() + int(match.group(1)), response)
+        return response
+
+def google_api_get(url):
+    """GET a Google API URL with the timeout budget, through the Google circuit breaker"""
+    import requests
+    return breakers['google'].call(
+        requests.get, url, timeout=GOOGLE_TIMEOUT_SECONDS,
+        is_failure=lambda response: response.status_code >= 500
+    )
+
+def get_google_request():
+    global _google_request
+    if _google_request is None:
+        _google_request = CachingGoogleRequest()
+    return _google_request
+
+log = logs.get_logger('app')
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+jwt = JWTManager()
+api = Blueprint('api', __name__, cli_group=None)
+
+def configure_app(app):
+    """Load configuration from environment variables"""
+    # JWT Configuration
+    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=7)  # Extended to 7 days
+    app.config['JWT_ALGORITHM'] = 'HS256'
+
+    # Database configuration
+    if os.environ.get('DATABASE_URL'):
+        # For production (Render)
+        database_url = os.environ.get('DATABASE_URL')
+        if database_url.startswith('postgres://'):
+            database_url = database_url.replace('postgres://', 'postgresql://', 1)
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    else:
+        # For local development - using SQLite
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///todoapp.db'
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Optional read replicas (DATABASE_REPLICA_URLS), used by routes marked @read_replica,
+    # and optional user shards (DATABASE_SHARD_URLS, see sharding.py)
+    app.config['SQLALCHEMY_BINDS'] = {**build_replica_binds(), **build_shard_binds()}
+
+    # Email Configuration with error handling
+    try:
+        app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+        mail_port = os.getenv('MAIL_PORT', '587')
+        app.config['MAIL_PORT'] = int(mail_port) if mail_port.isdigit() else 587
+        app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'True').lower() == 'true'
+        app.config['MAIL_USE_SSL'] = os.getenv('MAIL_USE_SSL', 'False').lower() == 'true'
+        app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+        app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
+        app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
+        log.info('config.email_loaded', "✅ Email configuration loaded successfully")
+    except Exception as e:
+        log.warning('config.email_error', "⚠️ Email configuration error", error=str(e))
+        # Set default values
+        app.config['MAIL_SERVER'] = 'smtp.gmail.com'
+        app.config['MAIL_PORT'] = 587
+        app.config['MAIL_USE_TLS'] = True
+        app.config['MAIL_USE_SSL'] = False
+
+def create_app(config=None):
+    """Application factory"""
+    app = Flask(__name__)
+    logs.configure()
+    configure_app(app)
+    if server_timing.SERVER_TIMING_ENABLED:
+        app.json = server_timing.TimedJSONProvider(app)
+    if memory.MEMORY_ROUTE_SAMPLE_RATE:
+        app.wsgi_app = memory.RetainedMemoryMiddleware(app.wsgi_app)
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', build_engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    CORS(app)
+    jwt.init_app(app)
+    db.init_app(app)
+    app.register_blueprint(api)
+    activity.configure(lambda events: write_activity_events(app, events))
+    group_commit.configure(lambda shard, mutations: run_group_commit(app, shard, mutations))
 
-jwt = JWTManager(app)
-
-# Database configuration
-if os.environ.get('DATABASE_URL'):
-    # For production (Render)
-    database_url = os.environ.get('DATABASE_URL')
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-else:
-    # For local development - using SQLite
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///todoapp.db'
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Email Configuration with error handling
-try:
-    app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
-    mail_port = os.getenv('MAIL_PORT', '587')
-    app.config['MAIL_PORT'] = int(mail_port) if mail_port.isdigit() else 587
-    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'True').lower() == 'true'
-    app.config['MAIL_USE_SSL'] = os.getenv('MAIL_USE_SSL', 'False').lower() == 'true'
-    app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-    app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-    app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
-    print("✅ Email configuration loaded successfully")
-except Exception as e:
-    print(f"⚠️ Email configuration error: {e}")
-    # Set default values
-    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-    app.config['MAIL_PORT'] = 587
-    app.config['MAIL_USE_TLS'] = True
-    app.config['MAIL_USE_SSL'] = False
-
-db = SQLAlchemy(app)
-mail = Mail(app)
+    return app
+
+def get_mail():
+    """Return the Flask-Mail state, importing Flask-Mail on first use"""
+    mail = current_app.extensions.get('mail')
+    if mail is None:
+        from flask_mail import Mail
+        mail = Mail(current_app).state
+    return mail
+
+def make_message(**kwargs):
+    """Create a Flask-Mail Message; Message() reads the default sender from the mail extension"""
+    from flask_mail import Message
+    get_mail()
+    return Message(**kwargs)
+
+def report_database_engines():
+    """Log the effective settings of the primary, replica and shard engines"""
+    report_engine_settings(db.engine)
+    for bind_key in REPLICA_BIND_KEYS + SHARD_BIND_KEYS:
+        report_engine_settings(db.engines[bind_key])
+
+def add_missing_columns(engine, tables):
+    """Add nullable columns that were added to the models after their table was created"""
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    for table in tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}'))
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+def add_todo_autoincrement(engine):
+    """Rebuild a SQLite todo table created without AUTOINCREMENT; returns whether it was rebuilt.
+
+    Without it SQLite reuses the ids of archived todos. Archived rows that
+    already share an id with a todo get a fresh one, and the id sequence
+    starts above every id handed out so far.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.connect() as connection:
+        ddl = connection.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'todo'"))
+    if ddl is None or 'AUTOINCREMENT' in ddl.upper():
+        return False
+
+    table = Todo.__table__
+    columns = ', '.join(engine.dialect.identifier_preparer.quote(column.name) for column in table.columns)
+    create = str(CreateTable(table).compile(dialect=engine.dialect)).replace('TABLE todo (', 'TABLE todo_rebuild (', 1)
+    all_ids = 'SELECT id FROM todo UNION ALL SELECT id FROM archived_todo'
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        # The table is swapped for a copy, so todo_tag's foreign key mustn't fire meanwhile
+        connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+        try:
+            connection.exec_driver_sql(create)
+            connection.exec_driver_sql(f'INSERT INTO todo_rebuild ({columns}) SELECT {columns} FROM todo')
+            connection.exec_driver_sql('DROP TABLE todo')
+            connection.exec_driver_sql('ALTER TABLE todo_rebuild RENAME TO todo')
+            for (archived_id,) in connection.exec_driver_sql(
+                'SELECT id FROM archived_todo WHERE id IN (SELECT id FROM todo)'
+            ).all():
+                connection.exec_driver_sql(
+                    f'UPDATE archived_todo SET id = (SELECT max(id) + 1 FROM ({all_ids})) WHERE id = ?', (archived_id,)
+                )
+            connection.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'todo'")
+            connection.exec_driver_sql(
+                f"INSERT INTO sqlite_sequence (name, seq) SELECT 'todo', coalesce(max(id), 0) FROM ({all_ids})"
+            )
+            connection.exec_driver_sql('COMMIT')
+        except Exception:
+            connection.exec_driver_sql('ROLLBACK')
+            raise
+        finally:
+            connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+    return True
+
+def init_database():
+    """Create database tables, and any columns and indexes added since the tables were created"""
+    # In sharded mode the central database only holds users and the shard directory
+    central_tables = [
+        table for table in db.metadata.sorted_tables
+        if not (SHARDING_ENABLED and table.name in SHARDED_TABLES)
+    ]
+    db.metadata.create_all(db.engine, tables=central_tables)
+    schemas = [(db.engine, central_tables)]
+    if SHARDING_ENABLED:
+        directory_metadata.create_all(db.engine)
+        metadata = shard_metadata(db.metadata)
+        for shard_index, bind_key in enumerate(SHARD_BIND_KEYS):
+            create_shard_schema(db.engines[bind_key], shard_index, metadata)
+            schemas.append((db.engines[bind_key], metadata.sorted_tables))
+
+    for engine, tables in schemas:
+        for column in add_missing_columns(engine, tables):
+            log.info('db.column_added', "✅ Added column", column=column)
+        if Todo.__table__ in tables and add_todo_autoincrement(engine):
+            log.info('db.todo_autoincrement', "✅ Rebuilt the todo table with AUTOINCREMENT ids")
+        for table in tables:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+    backfilled = backfill_positions()
+    if backfilled:
+        log.info('db.positions_backfilled', "✅ Assigned order keys", users=backfilled)
+    log.info('db.initialized', "✅ Database tables created")
+
+@api.cli.command('init-db')
+def init_db_command():
+    """Create database tables, and any columns and indexes added since the tables were created"""
+    init_database()
+    report_database_engines()
 
 # Blacklist for JWT tokens (for logout)
 blacklisted_tokens = set()
 
+metrics.describe('jwt_blocklist_size', 'Revoked token ids held in this worker', 'gauge')
+
+@metrics.register_collector
+def collect_jwt_blocklist():
+    yield 'jwt_blocklist_size', {}, len(blacklisted_tokens)
+
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
     jti = jwt_payload['jti']
     return jti in blacklisted_tokens
 
+def jwt_required(**options):
+    """flask_jwt_extended's @jwt_required(), with the token check timed as auth in Server-Timing"""
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            with server_timing.phase('auth'):
+                verify_jwt_in_request(**options)
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+        return decorator
+    return wrapper
+
+# Users allowed to use the diagnostics endpoints (profiler, memory), by email
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+
+def is_admin(user_id):
+    if not ADMIN_EMAILS:
+        return False
+    user = db.session.get(User, user_id)
+    return user is not None and user.email.lower() in ADMIN_EMAILS
+
+def admin_required(view):
+    """Like @jwt_required(), and the user must be listed in ADMIN_EMAILS"""
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not is_admin(int(get_jwt_identity())):
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# Caller supplied request ids (e.g. from a proxy) are kept if they look sane
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+@api.before_app_request
+def start_server_timing():
+    server_timing.begin()
+
+@api.after_app_request
+def add_server_timing_header(response):
+    """Registered first so it runs last, after the other after-request hooks"""
+    if request.path.startswith('/api/'):
+        value = server_timing.header()
+        if value:
+            response.headers['Server-Timing'] = value
+    return response
+
+@api.before_app_request
+def assign_request_id():
+    """Tag the request with an id that every log line it writes carries"""
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else secrets.token_hex(8)
+
+@api.after_app_request
+def add_request_id_header(response):
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+# Answered while warm-up runs; everything else waits for it (see warmup.py)
+WARMUP_EXEMPT_PATHS = {'/api/ready', '/api/health', '/metrics'}
+
+@api.before_app_request
+def hold_until_warm():
+    if request.path in WARMUP_EXEMPT_PATHS or wait_for_warmup():
+        return None
+    response = jsonify({'error': 'Server is starting, please try again shortly', **warmup_status()})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+@api.before_app_request
+def start_request_profiling():
+    """Join sampling windows, and run an admin's request with X-Profile: 1 under cProfile"""
+    if not profiling.PROFILER_ENABLED:
+        return
+    g.sampled_thread = profiling.enter_request()
+    if request.headers.get('X-Profile') != '1':
+        return
+    try:
+        token = verify_jwt_in_request(optional=True)
+    except Exception:
+        return
+    if token is not None and is_admin(int(get_jwt_identity())):
+        g.profiler = profiling.start_request_profile()
+        g.profile_busy = g.profiler is None
+
+@api.after_app_request
+def finish_request_profiling(response):
+    if not profiling.PROFILER_ENABLED:
+        return response
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        response.headers['X-Profile-Id'] = profiling.finish_request_profile(
+            profiler, f'{request.endpoint}-{g.get("request_id")}'
+        )
+    elif g.get('profile_busy'):
+        response.headers['X-Profile-Id'] = 'busy'
+    return response
+
+@api.teardown_app_request
+def count_request_for_memory_history(exc):
+    route = request.endpoint or 'unmatched'
+    request.environ[memory.ROUTE_ENVIRON_KEY] = route
+    memory.record_request(route)
+
+@api.teardown_app_request
+def end_request_profiling(exc):
+    if not profiling.PROFILER_ENABLED:
+        return
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiling.abandon_request_profile(profiler)
+    if g.get('sampled_thread') is not None:
+        profiling.exit_request(g.pop('sampled_thread'))
+
+@api.after_app_request
+def pin_writer_to_primary(response):
+    """Keep a user's reads on the primary for a short window after their own write"""
+    if REPLICA_BIND_KEYS and g.get('wrote_to_primary'):
+        try:
+            user_id = get_jwt_identity()
+        except RuntimeError:  # Route without @jwt_required
+            user_id = None
+        if user_id is not None:
+            record_write(user_id)
+    return response
+
 # User Model
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -86,8 +451,9 @@ class User(db.Model):
     auth_provider = db.Column(db.String(20), default='local')  # 'local' or 'google'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Relationship with todos
-    todos = db.relationship('Todo', backref='user', lazy=True, cascade='all, delete-orphan')
+    # Relationship with todos; passive_deletes leaves removing them to the database
+    # (ON DELETE CASCADE) instead of loading every todo to delete it
+    todos = db.relationship('Todo', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def set_password(self, password):
         if password:  # Only set password for local auth
@@ -117,8 +483,50 @@ class Todo(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Manual order key (see ordering.py); compared bytewise, hence the C collation on Postgres
+    position = db.Column(
+        db.String(ORDER_KEY_COLUMN_LENGTH).with_variant(db.String(ORDER_KEY_COLUMN_LENGTH, collation='C'), 'postgresql'),
+        nullable=True
+    )
+    
+    # Due date and reminder (naive UTC). reminder_claimed_until is the lease a
+    # worker takes before sending (and, after a failed send, the end of the retry
+    # backoff); reminder_sent_at is set once the email went out, reminder_failed_at
+    # once it has been given up on
+    due_at = db.Column(db.DateTime, nullable=True)
+    remind_at = db.Column(db.DateTime, nullable=True)
+    reminder_sent_at = db.Column(db.DateTime, nullable=True)
+    reminder_claimed_until = db.Column(db.DateTime, nullable=True)
+    reminder_claim = db.Column(db.String(32), nullable=True)
+    reminder_attempts = db.Column(db.Integer, nullable=True)  # failed sends; NULL for none
+    reminder_failed_at = db.Column(db.DateTime, nullable=True)
+    
+    # Recurrence (see recurrence.py): only the next occurrence is stored. Completing it
+    # creates the one after and records its id (no FK, a deleted successor just isn't recreated)
+    recurrence = db.Column(db.String(200), nullable=True)
+    recurrence_start = db.Column(db.DateTime, nullable=True)
+    recurrence_index = db.Column(db.Integer, nullable=True)
+    next_occurrence_id = db.Column(db.Integer, nullable=True)
+    
     # Foreign key to user
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+
+    # Serve the per-user newest-first and manual-order lists and exports without a sort.
+    # The reminder index only holds pending reminders, so sent ones cost nothing.
+    # AUTOINCREMENT: archived todos keep their id, so SQLite mustn't hand it out again
+    __table_args__ = (
+        db.Index('ix_todo_user_created', 'user_id', 'created_at'),
+        db.Index('ix_todo_user_position', 'user_id', 'position'),
+        db.Index(
+            'ix_todo_pending_reminder', 'remind_at',
+            sqlite_where=text('remind_at IS NOT NULL AND reminder_sent_at IS NULL AND completed = 0'),
+            postgresql_where=text('remind_at IS NOT NULL AND reminder_sent_at IS NULL AND NOT completed')
+        ),
+        {'sqlite_autoincrement': True},
+    )
+
+    # Links are written with Core statements (see tag_todos) and removed by ON DELETE CASCADE
+    tags = db.relationship('Tag', secondary='todo_tag', order_by='Tag.name', viewonly=True)
 
     def to_dict(self):
         return {
@@ -128,18 +536,923 @@ class Todo(db.Model):
             'completed': self.completed,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
+            'position': self.position,
+            'due_at': self.due_at.isoformat() if self.due_at else None,
+            'remind_at': self.remind_at.isoformat() if self.remind_at else None,
+            'reminder_sent_at': self.reminder_sent_at.isoformat() if self.reminder_sent_at else None,
+            'recurrence': self.recurrence,
+            'tags': [tag.name for tag in self.tags],
+            'archived': False,
+            'user_id': self.user_id
+        }
+
+# Tags: per-user names linked to todos through todo_tag. todo_count is the
+# number of linked todos, kept in step by every tagging path for the sidebar
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    name = db.Column(db.String(50), nullable=False)
+    todo_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uq_tag_user_name'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'count': self.todo_count
+        }
+
+# Primary key serves "tags of these todos"; the reverse index serves tag filters
+todo_tag = db.Table(
+    'todo_tag',
+    db.Column('todo_id', db.Integer, db.ForeignKey('todo.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_todo_tag_tag_todo', 'tag_id', 'todo_id'),
+)
+
+# Per-user todo counters, kept in step with the todo table by every write path
+class TodoStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    active = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'active': self.active,
+            'completed': self.completed
+        }
+
+# Cold tier: completed todos moved out of the todo table by archive_todos() once they
+# are ARCHIVE_AFTER_DAYS old. Same ids, tags kept as a JSON list of names, and only one
+# index, so the archive stays compact and the hot table stays near the working set
+class ArchivedTodo(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    position = db.Column(
+        db.String(ORDER_KEY_COLUMN_LENGTH).with_variant(db.String(ORDER_KEY_COLUMN_LENGTH, collation='C'), 'postgresql'),
+        nullable=True
+    )
+    due_at = db.Column(db.DateTime, nullable=True)
+    remind_at = db.Column(db.DateTime, nullable=True)
+    reminder_sent_at = db.Column(db.DateTime, nullable=True)
+    recurrence = db.Column(db.String(200), nullable=True)
+    recurrence_start = db.Column(db.DateTime, nullable=True)
+    recurrence_index = db.Column(db.Integer, nullable=True)
+    next_occurrence_id = db.Column(db.Integer, nullable=True)
+    tags = db.Column(db.Text, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_archived_todo_user_created', 'user_id', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'completed': True,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'position': self.position,
+            'due_at': self.due_at.isoformat() if self.due_at else None,
+            'remind_at': self.remind_at.isoformat() if self.remind_at else None,
+            'reminder_sent_at': self.reminder_sent_at.isoformat() if self.reminder_sent_at else None,
+            'recurrence': self.recurrence,
+            'tags': json.loads(self.tags) if self.tags else [],
+            'archived': True,
+            'archived_at': self.archived_at.isoformat(),
             'user_id': self.user_id
         }
 
+# Per-user data; stored in the user's shard when DATABASE_SHARD_URLS is set
+shard_tables(Todo.__table__, TodoStats.__table__, Tag.__table__, todo_tag, ArchivedTodo.__table__)
+
+def compute_todo_stats(user_id):
+    """Count a user's todos, archived ones included (not added to the session)"""
+    total, completed = db.session.query(
+        func.count(Todo.id),
+        func.coalesce(func.sum(case((Todo.completed == True, 1), else_=0)), 0)
+    ).filter(Todo.user_id == user_id).one()
+    archived = db.session.scalar(select(func.count()).where(ArchivedTodo.user_id == user_id))
+    return TodoStats(user_id=user_id, total=total + archived, active=total - completed, completed=completed + archived)
+
+def get_todo_stats(user_id):
+    """Return the user's counters, counting once if they have no stats row yet"""
+    stats = db.session.get(TodoStats, user_id)
+    if stats is None:
+        stats = compute_todo_stats(user_id)
+    return stats
+
+def adjust_todo_stats(user_id, total=0, active=0, completed=0):
+    """Apply counter deltas in the current transaction.
+
+    Call after the todo change has been added to the session. A user without
+    a stats row is seeded from the todo table, which already includes the change.
+    """
+    statement = (
+        update(TodoStats)
+        .where(TodoStats.user_id == user_id)
+        .values(
+            total=TodoStats.total + total,
+            active=TodoStats.active + active,
+            completed=TodoStats.completed + completed,
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(statement).rowcount:
+        return
+    stats = compute_todo_stats(user_id)
+    try:
+        with db.session.begin_nested():
+            db.session.add(stats)
+    except IntegrityError:
+        # A concurrent first write seeded the row (without this change): add the deltas to it
+        db.session.execute(statement)
+
+def reconcile_todo_stats():
+    """Rewrite every stats row that drifted from the todo and archive tables; returns the number repaired"""
+    actual = {
+        user_id: (total, completed)
+        for user_id, total, completed in db.session.query(
+            Todo.user_id,
+            func.count(Todo.id),
+            func.coalesce(func.sum(case((Todo.completed == True, 1), else_=0)), 0)
+        ).group_by(Todo.user_id)
+    }
+    # Archived todos are all completed
+    for user_id, archived in db.session.query(ArchivedTodo.user_id, func.count()).group_by(ArchivedTodo.user_id):
+        total, completed = actual.get(user_id, (0, 0))
+        actual[user_id] = (total + archived, completed + archived)
+    stored = {stats.user_id: stats for stats in TodoStats.query.all()}
+
+    repaired = 0
+    for user_id in set(actual) | set(stored):
+        total, completed = actual.get(user_id, (0, 0))
+        stats = stored.get(user_id)
+        if stats is None:
+            if not db.session.get(User, user_id):
+                continue
+            stats = TodoStats(user_id=user_id)
+            db.session.add(stats)
+        elif (stats.total, stats.active, stats.completed) == (total, total - completed, completed):
+            continue
+        stats.total, stats.active, stats.completed = total, total - completed, completed
+        repaired += 1
+
+    db.session.commit()
+    return repaired
+
+def reconcile_tag_counts():
+    """Recount todo_count for tags that drifted from todo_tag; returns the number repaired"""
+    actual = (
+        select(func.count())
+        .select_from(todo_tag)
+        .where(todo_tag.c.tag_id == Tag.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        update(Tag).where(Tag.todo_count != actual).values(todo_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+@api.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Repair per-user todo and tag counters that drifted from the tables they count"""
+    repaired_stats = repaired_tags = 0
+    for shard in each_shard():
+        with using_shard(shard):
+            repaired_stats += reconcile_todo_stats()
+            repaired_tags += reconcile_tag_counts()
+    print(f"✅ Todo stats reconciled: {repaired_stats} user(s) repaired")
+    print(f"✅ Tag counts reconciled: {repaired_tags} tag(s) repaired")
+
+# Tagging: bulk link/unlink with Core statements, adjusting Tag.todo_count in the same transaction
+TAG_BULK_MAX = int(os.environ.get('TAG_BULK_MAX', '1000'))
+
+def normalize_tag_names(names):
+    """Strip and de-duplicate tag names; raises ValueError for an invalid list"""
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError('tags must be a list of strings')
+    normalized = []
+    for name in names:
+        name = ' '.join(name.split())
+        if not name:
+            raise ValueError('tag names cannot be empty')
+        if len(name) > 50:
+            raise ValueError('tag names are limited to 50 characters')
+        if name not in normalized:
+            normalized.append(name)
+    return normalized
+
+def adjust_tag_counts(deltas):
+    """Apply {tag_id: delta} to Tag.todo_count"""
+    for tag_id, delta in deltas.items():
+        if delta:
+            db.session.execute(
+                update(Tag).where(Tag.id == tag_id).values(todo_count=Tag.todo_count + delta)
+                .execution_options(synchronize_session=False)
+            )
+
+def tag_todos(user_id, todo_ids, names):
+    """Link the user's todos to the named tags, creating missing tags; returns the number of new links"""
+    if not todo_ids or not names:
+        return 0
+    tags = {tag.name: tag for tag in Tag.query.filter(Tag.user_id == user_id, Tag.name.in_(names))}
+    for name in names:
+        if name not in tags:
+            tags[name] = Tag(user_id=user_id, name=name, todo_count=0)
+            db.session.add(tags[name])
+    db.session.flush()
+
+    tag_ids = [tag.id for tag in tags.values()]
+    existing = set(db.session.execute(
+        select(todo_tag.c.todo_id, todo_tag.c.tag_id)
+        .where(todo_tag.c.todo_id.in_(todo_ids), todo_tag.c.tag_id.in_(tag_ids))
+    ).all())
+    links = [
+        {'todo_id': todo_id, 'tag_id': tag_id}
+        for todo_id in todo_ids for tag_id in tag_ids
+        if (todo_id, tag_id) not in existing
+    ]
+    if links:
+        db.session.execute(todo_tag.insert(), links)
+        adjust_tag_counts(Counter(link['tag_id'] for link in links))
+    return len(links)
+
+def untag_todos(user_id, todo_ids, names):
+    """Unlink the user's todos from the named tags; returns the number of removed links"""
+    if not todo_ids or not names:
+        return 0
+    tag_ids = select(Tag.id).where(Tag.user_id == user_id, Tag.name.in_(names))
+    links = (todo_tag.c.todo_id.in_(todo_ids), todo_tag.c.tag_id.in_(tag_ids))
+    removed = dict(db.session.execute(
+        select(todo_tag.c.tag_id, func.count()).where(*links).group_by(todo_tag.c.tag_id)
+    ).all())
+    if removed:
+        db.session.execute(todo_tag.delete().where(*links))
+        adjust_tag_counts({tag_id: -count for tag_id, count in removed.items()})
+    return sum(removed.values())
+
+def tag_filter(user_id, names, mode):
+    """WHERE clause for todos carrying all (mode='all') or any (mode='any') of the named tags"""
+    tag_ids = select(Tag.id).where(Tag.user_id == user_id, Tag.name.in_(names))
+    tagged = select(todo_tag.c.todo_id).where(todo_tag.c.tag_id.in_(tag_ids))
+    if mode == 'all':
+        tagged = tagged.group_by(todo_tag.c.todo_id).having(func.count() == len(names))
+    return Todo.id.in_(tagged)
+
+# Manual ordering: each todo has a fractional order key, so a move rewrites one row
+metrics.describe('todo_position_rebalances_total', 'Per-user order key rebalances', 'counter')
+
+_rebalancing_users = set()
+_rebalancing_lock = threading.Lock()
+
+def first_position(user_id):
+    """Smallest order key of the user's todos (one index lookup)"""
+    return db.session.scalar(select(func.min(Todo.position)).where(Todo.user_id == user_id))
+
+def last_position(user_id):
+    """Largest order key of the user's todos (one index lookup)"""
+    return db.session.scalar(select(func.max(Todo.position)).where(Todo.user_id == user_id))
+
+def position_between(user_id, todo_id, above, below):
+    """New order key for todo_id placed below `above` and above `below` (either may be None).
+
+    With only one neighbour given, the todo on the other side of the gap is
+    looked up through the (user_id, position) index.
+    """
+    if (above and above.position is None) or (below and below.position is None):
+        raise ValueError('neighbour has no order key')
+    lower = above.position if above else None
+    upper = below.position if below else None
+    if above is None:
+        lower = db.session.scalar(
+            select(func.max(Todo.position))
+            .where(Todo.user_id == user_id, Todo.position < upper, Todo.id != todo_id)
+        )
+    elif below is None:
+        upper = db.session.scalar(
+            select(func.min(Todo.position))
+            .where(Todo.user_id == user_id, Todo.position > lower, Todo.id != todo_id)
+        )
+    return key_between(lower, upper)
+
+def rebalance_positions(user_id):
+    """Give the user's todos short, evenly spaced order keys in their current order.
+
+    Todos without a key are placed after the keyed ones, newest first. Runs in
+    the current transaction; updated_at is left alone.
+    """
+    todo_ids = db.session.scalars(
+        select(Todo.id)
+        .where(Todo.user_id == user_id)
+        .order_by(Todo.position.is_(None), Todo.position, Todo.created_at.desc(), Todo.id.desc())
+        .with_for_update()
+    ).all()
+    table = Todo.__table__
+    if todo_ids:
+        db.session.execute(
+            table.update()
+            .where(table.c.id == bindparam('todo_id'))
+            .values(position=bindparam('new_position'), updated_at=table.c.updated_at),
+            [
+                {'todo_id': todo_id, 'new_position': key}
+                for todo_id, key in zip(todo_ids, keys_after(None, len(todo_ids)))
+            ]
+        )
+    metrics.inc('todo_position_rebalances_total')
+    return len(todo_ids)
+
+def schedule_position_rebalance(app, user_id):
+    """Rebalance a user's order keys in a background thread, once at a time per user"""
+    with _rebalancing_lock:
+        if user_id in _rebalancing_users:
+            return
+        _rebalancing_users.add(user_id)
+    request_id = logs.current_request_id()
+
+    def worker():
+        try:
+            with app.app_context(), using_user_shard(db.engine, user_id):
+                g.request_id = request_id
+                count = rebalance_positions(user_id)
+                db.session.commit()
+                log.info('todos.rebalanced', "↕️ Rebalanced order keys", user_id=user_id, todos=count)
+        except Exception as e:
+            log.error('todos.rebalance_failed', "❌ Order key rebalance failed", user_id=user_id, error=str(e))
+        finally:
+            with _rebalancing_lock:
+                _rebalancing_users.discard(user_id)
+    threading.Thread(target=worker, daemon=True).start()
+
+def backfill_positions():
+    """Key the todos of users that have unkeyed ones (created before manual ordering)"""
+    backfilled = 0
+    for shard in each_shard():
+        with using_shard(shard):
+            user_ids = db.session.scalars(select(Todo.user_id).where(Todo.position.is_(None)).distinct()).all()
+            for user_id in user_ids:
+                rebalance_positions(user_id)
+                db.session.commit()
+            backfilled += len(user_ids)
+    return backfilled
+
+@api.cli.command('rebalance-positions')
+@click.argument('user_id', type=int, required=False)
+def rebalance_positions_command(user_id):
+    """Rewrite order keys for one user, or for every user with todos"""
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = []
+        for shard in each_shard():
+            with using_shard(shard):
+                user_ids += db.session.scalars(select(Todo.user_id).distinct()).all()
+    for uid in user_ids:
+        with using_user_shard(db.engine, uid):
+            rebalance_positions(uid)
+            db.session.commit()
+    print(f"✅ Rebalanced order keys for {len(user_ids)} user(s)")
+
+@api.cli.command('shard-move')
+@click.argument('user_id', type=int)
+@click.argument('shard_index', type=int)
+@click.option('--drain-seconds', type=float, default=SHARD_MOVE_DRAIN_SECONDS, show_default=True)
+def shard_move_command(user_id, shard_index, drain_seconds):
+    """Move one user's todos to another shard (the user is read-only meanwhile)"""
+    if not SHARDING_ENABLED or not 0 <= shard_index < len(SHARD_BIND_KEYS):
+        raise click.BadParameter(f'expected a shard index below {len(SHARD_BIND_KEYS)}', param_hint='SHARD_INDEX')
+    copied = move_user(db.engines, db.engine, db.metadata, user_id, SHARD_BIND_KEYS[shard_index], drain_seconds)
+    print(f"✅ Moved user {user_id} to {SHARD_BIND_KEYS[shard_index]}: {copied or 'already there'}")
+
+@api.cli.command('shard-rebalance')
+@click.option('--drain-seconds', type=float, default=SHARD_MOVE_DRAIN_SECONDS, show_default=True)
+def shard_rebalance_command(drain_seconds):
+    """Move users from the fullest to the emptiest shard until user counts differ by at most one"""
+    if not SHARDING_ENABLED:
+        print("Sharding is not enabled (DATABASE_SHARD_URLS)")
+        return
+    moved = 0
+    while True:
+        counts = dict.fromkeys(SHARD_BIND_KEYS, 0)
+        counts.update(db.session.execute(
+            select(user_shard.c.shard, func.count()).group_by(user_shard.c.shard)
+        ).all())
+        db.session.commit()
+        fullest = max(counts, key=counts.get)
+        emptiest = min(counts, key=counts.get)
+        if counts[fullest] - counts[emptiest] <= 1:
+            break
+        user_id = db.session.scalar(
+            select(user_shard.c.user_id)
+            .where(user_shard.c.shard == fullest, user_shard.c.status == 'active')
+            .order_by(user_shard.c.user_id.desc())
+            .limit(1)
+        )
+        db.session.commit()
+        if user_id is None:
+            break
+        move_user(db.engines, db.engine, db.metadata, user_id, emptiest, drain_seconds)
+        moved += 1
+        print(f"🔀 Moved user {user_id} from {fullest} to {emptiest}")
+    print(f"✅ Shards balanced, {moved} user(s) moved")
+
+# List orders: ORDER BY columns, served by ix_todo_user_created / ix_todo_user_position
+TODO_ORDERS = {
+    'created': (Todo.created_at.desc(), Todo.id.desc()),
+    'position': (Todo.position.asc(), Todo.id.asc()),
+}
+ARCHIVED_TODO_ORDERS = {
+    'created': (ArchivedTodo.created_at.desc(), ArchivedTodo.id.desc()),
+    'position': (ArchivedTodo.position.asc(), ArchivedTodo.id.asc()),
+}
+TODO_PAGE_MAX = int(os.environ.get('TODO_PAGE_MAX', '500'))
+
+def make_cursor(order, todo):
+    """Keyset cursor pointing just past todo"""
+    value = todo.position if order == 'position' else todo.created_at.isoformat()
+    return f'{value}~{todo.id}'
+
+def cursor_filter(order, cursor, model=Todo):
+    """WHERE clause for rows of model (Todo or ArchivedTodo) after the cursor; raises ValueError for a malformed cursor"""
+    value, todo_id = cursor.rsplit('~', 1)
+    todo_id = int(todo_id)
+    if order == 'position':
+        return or_(model.position > value, and_(model.position == value, model.id > todo_id))
+    created_at = datetime.fromisoformat(value)
+    return or_(model.created_at < created_at, and_(model.created_at == created_at, model.id < todo_id))
+
+def toggle_completed(todo_id, user_id, completed):
+    """Group-commit mutation for a checkbox toggle; returns whether the todo changed"""
+    result = db.session.execute(
+        update(Todo)
+        .where(Todo.id == todo_id, Todo.user_id == user_id, Todo.completed != completed)
+        .values(completed=completed, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        change = 1 if completed else -1
+        adjust_todo_stats(user_id, active=-change, completed=change)
+    return result.rowcount > 0
+
+def run_group_commit(app, shard, mutations):
+    """Run a group-commit batch in one transaction on the shard (None when not sharded)"""
+    with app.app_context(), using_shard(shard):
+        try:
+            results = [mutation() for mutation in mutations]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return results
+
+# Read models (see read_models.py): list and email queries select these columns
+TODO_ROW_COLUMNS = [getattr(Todo, field) for field in TODO_ROW_FIELDS]
+ARCHIVED_TODO_ROW_COLUMNS = [getattr(ArchivedTodo, field) for field in ARCHIVED_TODO_ROW_FIELDS]
+TASK_ROW_COLUMNS = [getattr(Todo, field) for field in TASK_ROW_FIELDS]
+# Todos per tag lookup, as selectinload does
+TAG_LOAD_BATCH_SIZE = 500
+
+def load_todo_rows(statement):
+    """Run a select of TODO_ROW_COLUMNS and return TodoRows with their tag names"""
+    rows = db.session.execute(statement).all()
+    tags = {}
+    for start in range(0, len(rows), TAG_LOAD_BATCH_SIZE):
+        todo_ids = [row[0] for row in rows[start:start + TAG_LOAD_BATCH_SIZE]]
+        for todo_id, name in db.session.execute(
+            select(todo_tag.c.todo_id, Tag.name)
+            .join(Tag, Tag.id == todo_tag.c.tag_id)
+            .where(todo_tag.c.todo_id.in_(todo_ids))
+            .order_by(Tag.name)
+        ):
+            tags.setdefault(todo_id, []).append(name)
+    return [TodoRow(*row, tags.get(row[0], [])) for row in rows]
+
+def todo_dicts(todos):
+    """to_dict() of each todo, timed as serialize in Server-Timing"""
+    with server_timing.phase('serialize'):
+        return [todo.to_dict() for todo in todos]
+
+def load_archived_todo_rows(statement):
+    """Run a select of ARCHIVED_TODO_ROW_COLUMNS and return ArchivedTodoRows"""
+    return [ArchivedTodoRow(*row) for row in db.session.execute(statement)]
+
+def active_task_rows(user_id, limit=None):
+    """The user's active todos for the email task lists, newest first (at most limit of them)"""
+    return [
+        TaskRow(*row) for row in db.session.execute(
+            select(*TASK_ROW_COLUMNS)
+            .where(Todo.user_id == user_id, Todo.completed == False)
+            .order_by(Todo.created_at.desc())
+            .limit(limit)
+        )
+    ]
+
+def merge_archived(order, todos, archived):
+    """Interleave todos and archived todos (each already in list order) in list order"""
+    if order == 'position':
+        return sorted(todos + archived, key=lambda todo: (todo.position or '', todo.id))
+    return sorted(todos + archived, key=lambda todo: (todo.created_at, todo.id), reverse=True)
+
+def parse_datetime_field(data, field):
+    """Read an ISO 8601 date-time (or null) from the request body as naive UTC"""
+    value = data.get(field)
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        raise ValueError(f'{field} must be an ISO 8601 date-time')
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def set_recurrence(todo, text):
+    """Start (or clear, for None) a recurring series at the todo's due date, defaulting it to now"""
+    if text is None:
+        todo.recurrence = todo.recurrence_start = todo.recurrence_index = None
+        return
+    if todo.due_at is None:
+        todo.due_at = datetime.utcnow().replace(microsecond=0)
+    todo.recurrence = normalize_rule(text, todo.due_at)
+    todo.recurrence_start = todo.due_at
+    todo.recurrence_index = 1
+
+def spawn_next_occurrence(todo):
+    """Create the occurrence after a just-completed recurring todo; returns it, or None if there is none"""
+    if not todo.recurrence or todo.next_occurrence_id:
+        return None
+    # The API keeps due_at set on recurring todos; rows from before that fall back to the series start
+    due_at, index = next_occurrence(
+        todo.recurrence, todo.due_at or todo.recurrence_start or datetime.utcnow(), todo.recurrence_start or
+        todo.due_at or datetime.utcnow(), todo.recurrence_index or 1, not_before=datetime.utcnow()
+    )
+    if due_at is None:
+        return None
+
+    # Same lead time for the reminder, and the slot right below the completed todo
+    try:
+        position = position_between(todo.user_id, todo.id, todo, None)
+    except ValueError:
+        position = key_between(None, first_position(todo.user_id))
+    next_todo = Todo(
+        title=todo.title,
+        description=todo.description,
+        user_id=todo.user_id,
+        position=position,
+        due_at=due_at,
+        remind_at=due_at - (todo.due_at - todo.remind_at) if todo.remind_at and todo.due_at else None,
+        recurrence=todo.recurrence,
+        recurrence_start=todo.recurrence_start,
+        recurrence_index=index
+    )
+    db.session.add(next_todo)
+    db.session.flush()
+    todo.next_occurrence_id = next_todo.id
+    adjust_todo_stats(todo.user_id, total=1, active=1)
+    tag_todos(todo.user_id, [next_todo.id], [tag.name for tag in todo.tags])
+    return next_todo
+
+# Archival: completed todos untouched for ARCHIVE_AFTER_DAYS move to archived_todo
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '500'))
+# Columns copied between todo and archived_todo (reminder leases are left behind)
+ARCHIVED_COLUMNS = [
+    'id', 'user_id', 'title', 'description', 'created_at', 'updated_at', 'position', 'due_at', 'remind_at',
+    'reminder_sent_at', 'recurrence', 'recurrence_start', 'recurrence_index', 'next_occurrence_id'
+]
+
+def archived_tag_filter(names, mode):
+    """WHERE clause on ArchivedTodo.tags (a JSON list of names) with tag_filter's modes"""
+    matches = [ArchivedTodo.tags.contains(json.dumps(name), autoescape=True) for name in names]
+    return and_(*matches) if mode == 'all' else or_(*matches)
+
+def archive_todos(before):
+    """Move completed todos last updated before `before` to the archive, one batch per transaction.
+
+    Stats are unchanged (archived todos still count as completed); tag links
+    are dropped and their counts adjusted. Returns the number archived.
+    """
+    archived = 0
+    while True:
+        todo_ids = db.session.scalars(
+            select(Todo.id)
+            .where(Todo.completed == True, Todo.updated_at < before)
+            .order_by(Todo.id)
+            .limit(ARCHIVE_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not todo_ids:
+            break
+
+        # The conditions are checked again by the insert, which takes SQLite's write lock
+        stale = (Todo.id.in_(todo_ids), Todo.completed == True, Todo.updated_at < before)
+        archived_at = datetime.utcnow()
+        db.session.execute(
+            insert(ArchivedTodo).from_select(
+                ARCHIVED_COLUMNS + ['archived_at'],
+                select(*[getattr(Todo, column) for column in ARCHIVED_COLUMNS], literal(archived_at)).where(*stale)
+            )
+        )
+        # Only rows this batch copied: matched on owner and archive time too, not just the id
+        moved = db.session.scalars(
+            select(ArchivedTodo.id)
+            .join(Todo, and_(Todo.id == ArchivedTodo.id, Todo.user_id == ArchivedTodo.user_id))
+            .where(ArchivedTodo.id.in_(todo_ids), ArchivedTodo.archived_at == archived_at)
+        ).all()
+
+        tags = {}
+        tag_deltas = Counter()
+        for todo_id, tag_id, name in db.session.execute(
+            select(todo_tag.c.todo_id, Tag.id, Tag.name)
+            .join(Tag, Tag.id == todo_tag.c.tag_id)
+            .where(todo_tag.c.todo_id.in_(moved))
+            .order_by(Tag.name)
+        ):
+            tags.setdefault(todo_id, []).append(name)
+            tag_deltas[tag_id] -= 1
+        if tags:
+            db.session.execute(
+                update(ArchivedTodo.__table__)
+                .where(ArchivedTodo.__table__.c.id == bindparam('todo_id'))
+                .values(tags=bindparam('tags')),
+                [{'todo_id': todo_id, 'tags': json.dumps(names)} for todo_id, names in tags.items()]
+            )
+        adjust_tag_counts(tag_deltas)
+        # todo_tag rows go with the todos (ON DELETE CASCADE)
+        db.session.execute(delete(Todo).where(Todo.id.in_(moved)))
+        db.session.commit()
+        archived += len(moved)
+        if len(todo_ids) < ARCHIVE_BATCH_SIZE:
+            break
+    return archived
+
+def restore_archived_todo(archived):
+    """Move an archived todo back to the todo table with its tags; returns the restored (completed) todo"""
+    todo = Todo(**{column: getattr(archived, column) for column in ARCHIVED_COLUMNS}, completed=True)
+    # Touched now, so the next archive run doesn't take it straight back
+    todo.updated_at = datetime.utcnow()
+    # Todo tables from before AUTOINCREMENT (see add_todo_autoincrement) may have reused the id
+    if db.session.get(Todo, archived.id) is not None:
+        todo.id = None
+    db.session.add(todo)
+    db.session.delete(archived)
+    db.session.flush()
+    if archived.tags:
+        tag_todos(todo.user_id, [todo.id], json.loads(archived.tags))
+    return todo
+
+@api.cli.command('archive-todos')
+@click.option('--days', type=int, default=ARCHIVE_AFTER_DAYS, show_default=True,
+              help='Archive completed todos not updated for this many days')
+def archive_todos_command(days):
+    """Move old completed todos to the archive table (run it daily, e.g. from cron)"""
+    before = datetime.utcnow() - timedelta(days=days)
+    archived = 0
+    for shard in each_shard():
+        with using_shard(shard):
+            archived += archive_todos(before)
+    print(f"🗄️ Archived {archived} completed todo(s) older than {days} day(s)")
+
+# Account deletion, done in bounded chunks by a background job
+ACCOUNT_DELETION_CHUNK_SIZE = int(os.environ.get('ACCOUNT_DELETION_CHUNK_SIZE', '500'))
+# Pause between chunks so other writers can take the SQLite write lock
+ACCOUNT_DELETION_PAUSE_MS = int(os.environ.get('ACCOUNT_DELETION_PAUSE_MS', '10'))
+
+class AccountDeletion(db.Model):
+    id = db.Column(db.String(32), primary_key=True, default=lambda: secrets.token_urlsafe(16))
+    user_id = db.Column(db.Integer, nullable=False, index=True)  # No FK: outlives the user row
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, failed
+    todos_total = db.Column(db.Integer, nullable=False, default=0)
+    todos_deleted = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'todos_total': self.todos_total,
+            'todos_deleted': self.todos_deleted,
+            'progress': round(self.todos_deleted / self.todos_total, 3) if self.todos_total else 1.0,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+# Activity log: append-only, buffered in memory and written in batches (see activity.py)
+ACTIVITY_RETENTION_DAYS = int(os.environ.get('ACTIVITY_RETENTION_DAYS', '180'))
+ACTIVITY_PAGE_MAX = int(os.environ.get('ACTIVITY_PAGE_MAX', '200'))
+ACTIVITY_PRUNE_CHUNK_SIZE = 5000
+
+class ActivityEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)  # No FK: kept until retention removes it
+    action = db.Column(db.String(40), nullable=False)  # e.g. todo.update, auth.login
+    todo_id = db.Column(db.Integer, nullable=True)
+    ip = db.Column(db.String(45), nullable=True)
+    details = db.Column(db.Text, nullable=True)  # JSON
+
+    # Newest-first pages per user, and retention by age
+    __table_args__ = (
+        db.Index('ix_activity_event_user_id', 'user_id', 'id'),
+        db.Index('ix_activity_event_created', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat(),
+            'action': self.action,
+            'todo_id': self.todo_id,
+            'ip': self.ip,
+            'details': json.loads(self.details) if self.details else {}
+        }
+
+def record_activity(action, user_id, todo_id=None, **details):
+    """Queue an activity event; the write happens later, off the request path"""
+    activity.record({
+        'created_at': datetime.utcnow(),
+        'user_id': user_id,
+        'action': action,
+        'todo_id': todo_id,
+        'ip': request.remote_addr if has_request_context() else None,
+        'details': json.dumps(details) if details else None
+    })
+
+def write_activity_events(app, events):
+    """Insert a batch of buffered events (runs on the activity log thread)"""
+    with app.app_context():
+        db.session.execute(insert(ActivityEvent), events)
+        db.session.commit()
+
+def prune_activity(before):
+    """Delete events older than `before` in short transactions; returns the number deleted"""
+    deleted = 0
+    while True:
+        chunk = select(ActivityEvent.id).where(ActivityEvent.created_at < before).limit(ACTIVITY_PRUNE_CHUNK_SIZE)
+        result = db.session.execute(delete(ActivityEvent).where(ActivityEvent.id.in_(chunk.scalar_subquery())))
+        db.session.commit()
+        deleted += result.rowcount
+        if result.rowcount < ACTIVITY_PRUNE_CHUNK_SIZE:
+            return deleted
+
+@api.cli.command('prune-activity')
+@click.option('--days', type=int, default=ACTIVITY_RETENTION_DAYS, show_default=True,
+              help='Keep events from the last this many days')
+def prune_activity_command(days):
+    """Apply the activity log retention policy (run it daily, e.g. from cron)"""
+    deleted = prune_activity(datetime.utcnow() - timedelta(days=days))
+    print(f"🧹 Deleted {deleted} activity event(s) older than {days} day(s)")
+
+def run_account_deletion(job_id):
+    """Delete a user's todos and archived todos in chunks, one short transaction each, then the user row"""
+    job = db.session.get(AccountDeletion, job_id)
+    if not job or job.status == 'completed':
+        return job
+
+    # The todos live in the user's shard in sharded mode
+    with using_user_shard(db.engine, job.user_id):
+        try:
+            job.status = 'running'
+            job.todos_total = job.todos_deleted + sum(
+                db.session.scalar(select(func.count(model.id)).where(model.user_id == job.user_id))
+                for model in (Todo, ArchivedTodo)
+            )
+            db.session.commit()
+
+            for model in (Todo, ArchivedTodo):
+                while True:
+                    chunk = select(model.id).where(model.user_id == job.user_id).limit(ACCOUNT_DELETION_CHUNK_SIZE)
+                    result = db.session.execute(delete(model).where(model.id.in_(chunk.scalar_subquery())))
+                    if result.rowcount == 0:
+                        break
+                    job.todos_deleted += result.rowcount
+                    db.session.commit()
+                    time.sleep(ACCOUNT_DELETION_PAUSE_MS / 1000)
+
+            # Anything created since the last chunk goes with the user row
+            db.session.execute(delete(Todo).where(Todo.user_id == job.user_id))
+            db.session.execute(delete(ArchivedTodo).where(ArchivedTodo.user_id == job.user_id))
+            db.session.execute(delete(TodoStats).where(TodoStats.user_id == job.user_id))
+            db.session.execute(delete(Tag).where(Tag.user_id == job.user_id))
+            db.session.execute(delete(User).where(User.id == job.user_id))
+            if SHARDING_ENABLED:
+                db.session.execute(delete(user_shard).where(user_shard.c.user_id == job.user_id))
+            job.status = 'completed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            log.info('account.deleted', "🗑️ Account deleted", user_id=job.user_id, todos=job.todos_deleted)
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(AccountDeletion, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            db.session.commit()
+            log.error('account.deletion_failed', "❌ Account deletion failed", job_id=job_id, error=str(e))
+
+    return job
+
+def start_account_deletion(app, job_id):
+    request_id = logs.current_request_id()
+
+    def worker():
+        with app.app_context():
+            g.request_id = request_id
+            run_account_deletion(job_id)
+    threading.Thread(target=worker, daemon=True).start()
+
+@api.cli.command('delete-account')
+@click.argument('user_id', type=int)
+def delete_account_command(user_id):
+    """Delete a user and their todos, resuming an unfinished job if there is one"""
+    job = AccountDeletion.query.filter(
+        AccountDeletion.user_id == user_id,
+        AccountDeletion.status != 'completed'
+    ).first()
+    if not job:
+        job = AccountDeletion(user_id=user_id)
+        db.session.add(job)
+        db.session.commit()
+    job = run_account_deletion(job.id)
+    print(f"Account deletion {job.id}: {job.status}, {job.todos_deleted}/{job.todos_total} todos")
+
 # Email Notification Functions
-def send_email_sync(msg):
-    """Send email synchronously"""
+metrics.describe('emails_sent_total', 'Emails sent, by kind', 'counter')
+metrics.describe('email_message_bytes_total', 'Size of the emails sent as encoded on the wire, by kind', 'counter')
+
+def count_sent_email(kind, size):
+    metrics.inc('emails_sent_total', kind=kind)
+    metrics.inc('email_message_bytes_total', size, kind=kind)
+
+def smtp_connection():
+    """Flask-Mail connection with SMTP_TIMEOUT_SECONDS on every socket operation.
+
+    last_message_bytes is the encoded size of the last message it sent.
+    """
+    from flask_mail import Connection
+
+    class TimeoutConnection(Connection):
+        last_message_bytes = 0
+
+        # Flask-Mail opens smtplib connections without a timeout, so a stalled
+        # server would hold the worker indefinitely
+        def configure_host(self):
+            smtp_class = smtplib.SMTP_SSL if self.mail.use_ssl else smtplib.SMTP
+            host = smtp_class(self.mail.server, self.mail.port, timeout=SMTP_TIMEOUT_SECONDS)
+            host.set_debuglevel(int(self.mail.debug))
+            if self.mail.use_tls:
+                host.starttls()
+            if self.mail.username and self.mail.password:
+                host.login(self.mail.username, self.mail.password)
+            # Connection.send encodes the message itself; measure it on the way
+            # out rather than encoding it twice
+            sendmail = host.sendmail
+
+            def measured_sendmail(from_addr, to_addrs, message, *args):
+                self.last_message_bytes = len(message)
+                return sendmail(from_addr, to_addrs, message, *args)
+            host.sendmail = measured_sendmail
+            return host
+
+    return TimeoutConnection(get_mail())
+
+def deliver_message(msg):
+    """Send one message over its own SMTP connection; returns its size in bytes"""
+    with smtp_connection() as connection:
+        connection.send(msg)
+        return connection.last_message_bytes
+
+def send_email_sync(msg, kind='other'):
+    """Send email synchronously, through the SMTP circuit breaker"""
     try:
-        mail.send(msg)
-        print(f"✅ Email sent successfully to {msg.recipients}")
+        with server_timing.phase('smtp'):
+            size = breakers['smtp'].call(deliver_message, msg)
+        count_sent_email(kind, size)
+        log.info('email.sent', "✅ Email sent successfully", recipients=msg.recipients, kind=kind, bytes=size)
         return True
+    except CircuitOpenError as e:
+        log.warning('email.skipped', "⚠️ Email skipped", error=str(e))
+        return False
     except Exception as e:
-        print(f"❌ Failed to send email: {str(e)}")
+        log.error('email.failed', "❌ Failed to send email", error=str(e))
         return False
 
 def send_todo_creation_email(user_email, username, todo_title, todo_description=None, user_id=None):
@@ -147,22 +1460,31 @@ def send_todo_creation_email(user_email, username, todo_title, todo_description=
     
     # Check if email notifications are enabled
     if not os.getenv('SEND_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
-        print("Email notifications are disabled")
+        log.debug('email.disabled', "Email notifications are disabled")
         return False
     
     # Check if email configuration is set up
-    if not app.config['MAIL_USERNAME'] or not app.config['MAIL_PASSWORD']:
-        print("Email configuration not set up - skipping email notification")
+    if not current_app.config['MAIL_USERNAME'] or not current_app.config['MAIL_PASSWORD']:
+        log.debug('email.not_configured', "Email configuration not set up - skipping email notification")
+        return False
+    
+    # Don't render or query anything when SMTP is known to be down
+    if breakers['smtp'].is_open():
+        log.info('email.circuit_open', "SMTP circuit open - skipping email notification")
         return False
     
     try:
-        # Get all active (incomplete) todos for the user
+        # Get the newest active (incomplete) todos for the user
         active_todos = []
+        active_count = 0
         if user_id:
-            active_todos = Todo.query.filter_by(user_id=user_id, completed=False).order_by(Todo.created_at.desc()).all()
+            active_todos = active_task_rows(user_id, EMAIL_TASK_LIST_LIMIT)
+            active_count = get_todo_stats(user_id).active
+        more_tasks = max(active_count - len(active_todos), 0)
         
         # Create email message
-        subject = f"🎯 New Todo Added: {todo_title} | {len(active_todos)} Active Tasks"
+        render_started = time.perf_counter()
+        subject = f"🎯 New Todo Added: {todo_title} | {active_count} Active Tasks"
         
         # Build active tasks list for HTML
         active_tasks_html = ""
@@ -189,13 +1511,15 @@ def send_todo_creation_email(user_email, username, todo_title, todo_description=
                         <br><small style="color: #666;">📅 Created: {task_date}</small>
                     </div>
                     """
+            if more_tasks:
+                active_tasks_html += f"<p style='color: #666; font-style: italic;'>➕ {more_tasks} more active tasks - open the app to see them all</p>"
         else:
             active_tasks_html = "<p style='color: #666; font-style: italic;'>🎉 This is your first active task!</p>"
         
         # Build active tasks list for plain text
         active_tasks_text = ""
         if active_todos:
-            active_tasks_text = f"\n📋 Your Current Active Tasks ({len(active_todos)} total):\n" + "="*50 + "\n"
+            active_tasks_text = f"\n📋 Your Current Active Tasks ({active_count} total):\n" + "="*50 + "\n"
             for i, task in enumerate(active_todos, 1):
                 task_description = f"\n   📝 {task.description}" if task.description else ""
                 task_date = task.created_at.strftime('%b %d, %Y')
@@ -205,6 +1529,8 @@ def send_todo_creation_email(user_email, username, todo_title, todo_description=
                     active_tasks_text += f"\n🆕 {i}. {task.title} [NEW TASK]{task_description}\n   📅 Created: {task_date}\n"
                 else:
                     active_tasks_text += f"\n📌 {i}. {task.title}{task_description}\n   📅 Created: {task_date}\n"
+            if more_tasks:
+                active_tasks_text += f"\n➕ {more_tasks} more active tasks - open the app to see them all\n"
         else:
             active_tasks_text = "\n🎉 This is your first active task!"
         
@@ -245,7 +1571,7 @@ def send_todo_creation_email(user_email, username, todo_title, todo_description=
                     
                     <div class="stats-bar">
                         <h3>📊 Your Task Summary</h3>
-                        <p><strong>{len(active_todos)} Active Tasks</strong> • Ready to tackle!</p>
+                        <p><strong>{active_count} Active Tasks</strong> • Ready to tackle!</p>
                     </div>
                     
                     <div class="tasks-container">
@@ -269,7 +1595,7 @@ def send_todo_creation_email(user_email, username, todo_title, todo_description=
                 <div class="footer">
                     <p>📱 This email was sent from your Todo App</p>
                     <p>🔧 You receive this email whenever you add a new task</p>
-                    <p>📊 Total Active Tasks: {len(active_todos)} | Last Updated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
+                    <p>📊 Total Active Tasks: {active_count} | Last Updated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
                 </div>
             </div>
         </body>
@@ -288,7 +1614,7 @@ def send_todo_creation_email(user_email, username, todo_title, todo_description=
         📅 Added: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
         
         📊 TASK SUMMARY:
-        • Total Active Tasks: {len(active_todos)}
+        • Total Active Tasks: {active_count}
         • Status: Ready to tackle!
         {active_tasks_text}
         
@@ -307,36 +1633,261 @@ def send_todo_creation_email(user_email, username, todo_title, todo_description=
         """
         
         # Create message
-        msg = Message(
+        msg = make_message(
             subject=subject,
             recipients=[user_email],
             html=html_body,
             body=text_body
         )
+        server_timing.add_since('render', render_started)
         
         # Send email synchronously
-        success = send_email_sync(msg)
+        success = send_email_sync(msg, 'todo_created')
         
         if success:
-            print(f"📧 Email notification with {len(active_todos)} active tasks sent successfully to {user_email}")
+            log.info('email.todo_notification_sent', "📧 Email notification sent",
+                     user_id=user_id, active_tasks=active_count)
         else:
-            print(f"❌ Failed to send email notification to {user_email}")
+            log.warning('email.todo_notification_failed', "❌ Failed to send email notification", user_id=user_id)
         
         return success
         
-    except Exception as e:
-        print(f"Error creating email notification: {str(e)}")
+    except Exception:
+        log.exception('email.todo_notification_error', "Error creating email notification", user_id=user_id)
         return False
 
+# Reminders: reminders.py keeps the next window of due reminders in memory and
+# hands them over in batches. Rows are claimed with a lease before sending, so
+# with several workers (or a separate `flask run-reminders` process) each
+# reminder is sent by one of them. A failed send is retried after a backoff
+# that doubles from REMINDER_RETRY_SECONDS, and given up on after
+# REMINDER_MAX_ATTEMPTS; a reminder whose user is gone is given up on at once
+REMINDER_LEASE_SECONDS = int(os.environ.get('REMINDER_LEASE_SECONDS', '300'))
+REMINDER_MAX_ATTEMPTS = int(os.environ.get('REMINDER_MAX_ATTEMPTS', '5'))
+REMINDER_RETRY_SECONDS = int(os.environ.get('REMINDER_RETRY_SECONDS', '60'))
+
+metrics.describe('reminders_sent_total', 'Reminder emails sent', 'counter')
+metrics.describe('reminders_failed_total', 'Reminder emails that failed and will be retried', 'counter')
+metrics.describe('reminders_abandoned_total', 'Reminders given up on, by reason', 'counter')
+
+def pending_reminder():
+    """Conditions of a reminder still to send: ix_todo_pending_reminder's WHERE clause, minus given up ones"""
+    return (
+        Todo.remind_at.isnot(None), Todo.reminder_sent_at.is_(None), Todo.completed == False,
+        Todo.reminder_failed_at.is_(None)
+    )
+
+def load_due_reminders(until, limit):
+    """(send at, (shard, todo_id)) of pending reminders due by `until`, earliest first.
+
+    A reminder under another worker's lease or in a retry backoff is sent once
+    that ends, and left for a later load if it ends after `until`.
+    """
+    due = []
+    for shard in each_shard():
+        with using_shard(shard):
+            due += [
+                (max(remind_at, claimed_until or remind_at), (shard, todo_id))
+                for remind_at, claimed_until, todo_id in db.session.execute(
+                    select(Todo.remind_at, Todo.reminder_claimed_until, Todo.id)
+                    .where(
+                        *pending_reminder(), Todo.remind_at <= until,
+                        or_(Todo.reminder_claimed_until.is_(None), Todo.reminder_claimed_until <= until)
+                    )
+                    .order_by(Todo.remind_at)
+                    .limit(limit)
+                )
+            ]
+    return sorted(due)[:limit]
+
+def build_reminder_message(todo, user_email, username):
+    due = f"\nDue: {todo.due_at.strftime('%b %d, %Y %H:%M')} UTC" if todo.due_at else ""
+    description = f"\n\n{todo.description}" if todo.description else ""
+    return make_message(
+        subject=f"⏰ Reminder: {todo.title}",
+        recipients=[user_email],
+        body=f"Hi {username},\n\nThis is your reminder for: {todo.title}{due}{description}\n\nGood luck! 🚀",
+        html=f"""
+        <div style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <h2 style="color: #667eea;">⏰ Reminder</h2>
+            <p>Hi <strong>{username}</strong>, this is your reminder for:</p>
+            <div style="background: #f8f9fa; padding: 15px; border-radius: 8px; border-left: 4px solid #667eea;">
+                <strong>{todo.title}</strong>
+                {f"<br><small style='color: #666;'>{todo.description}</small>" if todo.description else ""}
+                {f"<br><small style='color: #666;'>📅 Due: {todo.due_at.strftime('%b %d, %Y %H:%M')} UTC</small>" if todo.due_at else ""}
+            </div>
+        </div>
+        """
+    )
+
+def send_reminder_emails(claimed, claim):
+    """Send [(todo, email, username)] over one SMTP connection, settling each row as it goes.
+
+    A failed message doesn't stop the others (the next one gets a fresh
+    connection). Returns (sent, failed); rows left over when the SMTP breaker
+    opens keep their lease and are retried when it ends.
+    """
+    sent = failed = 0
+    connection = None
+    connections = ExitStack()
+
+    def send(todo, user_email, username):
+        nonlocal connection
+        if connection is None:
+            connection = connections.enter_context(smtp_connection())
+        connection.send(build_reminder_message(todo, user_email, username))
+        return connection.last_message_bytes
+
+    try:
+        for todo, user_email, username in claimed:
+            try:
+                size = breakers['smtp'].call(send, todo, user_email, username)
+            except CircuitOpenError:
+                log.warning('reminders.circuit_open', "⚠️ SMTP circuit open - leaving reminders for later",
+                            reminders=len(claimed) - sent - failed)
+                break
+            except Exception as e:
+                failed += 1
+                reminder_failed(todo, claim, str(e))
+                # The connection may be unusable now
+                connection = None
+                with suppress(Exception):
+                    connections.close()
+                continue
+            sent += 1
+            count_sent_email('reminder', size)
+            settle_reminder(todo.id, claim, reminder_sent_at=datetime.utcnow())
+    finally:
+        with suppress(Exception):
+            connections.close()
+    return sent, failed
+
+def settle_reminder(todo_id, claim, **values):
+    """Update a reminder this dispatch still holds the claim on, and commit"""
+    db.session.execute(
+        update(Todo)
+        .where(Todo.id == todo_id, Todo.reminder_claim == claim)
+        .values(updated_at=Todo.updated_at, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+def reminder_failed(todo, claim, error):
+    """Count a failed send: retry after a backoff, or give up after REMINDER_MAX_ATTEMPTS"""
+    attempts = (todo.reminder_attempts or 0) + 1
+    now = datetime.utcnow()
+    if attempts >= REMINDER_MAX_ATTEMPTS:
+        settle_reminder(todo.id, claim, reminder_attempts=attempts, reminder_failed_at=now, reminder_claim=None)
+        metrics.inc('reminders_abandoned_total', reason='attempts')
+        log.error('reminders.abandoned', "❌ Giving up on reminder", todo_id=todo.id, attempts=attempts, error=error)
+        return
+    backoff = REMINDER_RETRY_SECONDS * 2 ** (attempts - 1)
+    settle_reminder(todo.id, claim, reminder_attempts=attempts, reminder_claim=None,
+                    reminder_claimed_until=now + timedelta(seconds=backoff))
+    log.warning('reminders.send_failed', "⚠️ Reminder failed, will retry", todo_id=todo.id, attempts=attempts,
+                retry_in=backoff, error=error)
+
+def dispatch_reminders(keys):
+    """Claim the due reminders among (shard, todo_id) keys, email them and mark them sent; returns the number sent"""
+    todo_ids_by_shard = {}
+    for shard, todo_id in keys:
+        todo_ids_by_shard.setdefault(shard, []).append(todo_id)
+    sent = 0
+    for shard, todo_ids in todo_ids_by_shard.items():
+        with using_shard(shard):
+            sent += dispatch_shard_reminders(shard, todo_ids)
+    return sent
+
+def dispatch_shard_reminders(shard, todo_ids):
+    now = datetime.utcnow()
+    if SHARDING_ENABLED:
+        # Leave users that are being moved (or were moved away) to the next load
+        user_ids = db.session.scalars(select(Todo.user_id).where(Todo.id.in_(todo_ids)).distinct()).all()
+        settled = set(db.session.scalars(
+            select(user_shard.c.user_id)
+            .where(user_shard.c.user_id.in_(user_ids), user_shard.c.shard == shard, user_shard.c.status == 'active')
+        ))
+        todo_ids = db.session.scalars(
+            select(Todo.id).where(Todo.id.in_(todo_ids), Todo.user_id.in_(settled))
+        ).all()
+        if not todo_ids:
+            return 0
+
+    claim = secrets.token_hex(16)
+    db.session.execute(
+        update(Todo)
+        .where(
+            Todo.id.in_(todo_ids), *pending_reminder(), Todo.remind_at <= now,
+            or_(Todo.reminder_claimed_until.is_(None), Todo.reminder_claimed_until < now)
+        )
+        .values(
+            reminder_claim=claim,
+            reminder_claimed_until=now + timedelta(seconds=REMINDER_LEASE_SECONDS),
+            updated_at=Todo.updated_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    # Users live in the central database, so they are not joined in
+    todos = db.session.scalars(select(Todo).where(Todo.id.in_(todo_ids), Todo.reminder_claim == claim)).all()
+    if not todos:
+        return 0
+    users = {
+        user_id: (email, username) for user_id, email, username in db.session.execute(
+            select(User.id, User.email, User.username).where(User.id.in_({todo.user_id for todo in todos}))
+        )
+    }
+    claimed = []
+    for todo in todos:
+        if todo.user_id in users:
+            claimed.append((todo, *users[todo.user_id]))
+        else:
+            # Nobody to send it to, ever
+            settle_reminder(todo.id, claim, reminder_failed_at=now, reminder_claim=None)
+            metrics.inc('reminders_abandoned_total', reason='no_user')
+
+    sent, failed = send_reminder_emails(claimed, claim)
+    metrics.inc('reminders_sent_total', sent)
+    metrics.inc('reminders_failed_total', failed)
+    log.info('reminders.sent', "⏰ Sent due reminders", sent=sent, failed=failed, due=len(claimed))
+    return sent
+
+def start_reminders(app):
+    """Start this process's reminder engine, if email is configured"""
+    if not app.config['MAIL_USERNAME'] or not app.config['MAIL_PASSWORD']:
+        return None
+
+    def load_due(until, limit):
+        with app.app_context():
+            return load_due_reminders(until, limit)
+
+    def dispatch(keys):
+        with app.app_context():
+            dispatch_reminders(keys)
+
+    return reminders.start_scheduler(load_due, dispatch)
+
+@api.cli.command('run-reminders')
+def run_reminders_command():
+    """Run the reminder engine in the foreground (e.g. as a dedicated process)"""
+    scheduler = start_reminders(current_app._get_current_object())
+    if scheduler is None:
+        print("Reminders are disabled or email is not configured")
+        return
+    scheduler.join()
+
 # Password Reset Functions
 def generate_password_reset_token(email):
     """Generate a signed token for password reset"""
-    serializer = URLSafeTimedSerializer(app.config['JWT_SECRET_KEY'])
+    from itsdangerous import URLSafeTimedSerializer
+    serializer = URLSafeTimedSerializer(current_app.config['JWT_SECRET_KEY'])
     return serializer.dumps(email, salt='password-reset-salt')
 
 def verify_password_reset_token(token, expiration=3600):
     """Verify password reset token (expires in 1 hour by default)"""
-    serializer = URLSafeTimedSerializer(app.config['JWT_SECRET_KEY'])
+    from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
+    serializer = URLSafeTimedSerializer(current_app.config['JWT_SECRET_KEY'])
     try:
         email = serializer.loads(token, salt='password-reset-salt', max_age=expiration)
         return email
@@ -348,16 +1899,21 @@ def send_password_reset_email(user_email, username, reset_token):
     
     # Check if email notifications are enabled
     if not os.getenv('SEND_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
-        print("Email notifications are disabled")
+        log.debug('email.disabled', "Email notifications are disabled")
         return False
     
     # Check if email configuration is set up
-    if not app.config['MAIL_USERNAME'] or not app.config['MAIL_PASSWORD']:
-        print("Email configuration not set up - skipping password reset email")
+    if not current_app.config['MAIL_USERNAME'] or not current_app.config['MAIL_PASSWORD']:
+        log.warning('email.not_configured', "Email configuration not set up - skipping password reset email")
+        return False
+    
+    if breakers['smtp'].is_open():
+        log.warning('email.circuit_open', "SMTP circuit open - skipping password reset email")
         return False
     
     try:
         # Create reset link
+        render_started = time.perf_counter()
         reset_link = f"http://localhost:3000/reset-password?token={reset_token}"
         
         # Create email subject
@@ -461,29 +2017,31 @@ def send_password_reset_email(user_email, username, reset_token):
         """
         
         # Create message
-        msg = Message(
+        msg = make_message(
             subject=subject,
             recipients=[user_email],
             html=html_body,
             body=text_body
         )
+        server_timing.add_since('render', render_started)
         
         # Send email synchronously
-        success = send_email_sync(msg)
+        success = send_email_sync(msg, 'password_reset')
         
         if success:
-            print(f"🔐 Password reset email sent successfully to {user_email}")
+            log.info('email.password_reset_sent', "🔐 Password reset email sent", username=username)
         else:
-            print(f"❌ Failed to send password reset email to {user_email}")
+            log.warning('email.password_reset_failed', "❌ Failed to send password reset email", username=username)
         
         return success
         
-    except Exception as e:
-        print(f"Error sending password reset email: {str(e)}")
+    except Exception:
+        log.exception('email.password_reset_error', "Error sending password reset email", username=username)
         return False
 
 # Authentication Routes
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
+@admission_limit('password_hash')
 def register():
     data = request.get_json()
     
@@ -506,6 +2064,7 @@ def register():
     
     db.session.add(user)
     db.session.commit()
+    record_activity('auth.register', user.id)
     
     # Create access token
     access_token = create_access_token(identity=str(user.id))
@@ -516,7 +2075,9 @@ def register():
         'user': user.to_dict()
     }), 201
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
+@rate_limit('login')
+@admission_limit('password_hash')
 def login():
     data = request.get_json()
     
@@ -529,7 +2090,10 @@ def login():
     ).first()
     
     if not user or not user.check_password(data['password']):
+        if user:
+            record_activity('auth.login_failed', user.id)
         return jsonify({'error': 'Invalid credentials'}), 401
+    record_activity('auth.login', user.id, method='password')
     
     # Create access token
     access_token = create_access_token(identity=str(user.id))
@@ -540,15 +2104,54 @@ def login():
         'user': user.to_dict()
     }), 200
 
-@app.route('/api/logout', methods=['POST'])
+@api.route('/api/logout', methods=['POST'])
 @jwt_required()
 def logout():
     jti = get_jwt()['jti']
     blacklisted_tokens.add(jti)
+    record_activity('auth.logout', int(get_jwt_identity()))
     return jsonify({'message': 'Successfully logged out'}), 200
 
+@api.route('/api/me', methods=['DELETE'])
+@jwt_required()
+def delete_account():
+    """Start deleting the current user's account; returns a job to poll for progress"""
+    current_user_id = int(get_jwt_identity())
+    if not db.session.get(User, current_user_id):
+        return jsonify({'error': 'User not found'}), 404
+
+    job = AccountDeletion.query.filter(
+        AccountDeletion.user_id == current_user_id,
+        AccountDeletion.status.in_(['pending', 'running'])
+    ).first()
+    if not job:
+        job = AccountDeletion(user_id=current_user_id)
+        db.session.add(job)
+        db.session.commit()
+        start_account_deletion(current_app._get_current_object(), job.id)
+        record_activity('account.delete', current_user_id)
+
+    # The account is going away, so this token is too
+    blacklisted_tokens.add(get_jwt()['jti'])
+
+    return jsonify({
+        'message': 'Account deletion started',
+        'job': job.to_dict(),
+        'status_url': f'/api/account-deletions/{job.id}'
+    }), 202
+
+@api.route('/api/account-deletions/<job_id>', methods=['GET'])
+def get_account_deletion(job_id):
+    """Progress of an account deletion job (the job id is unguessable)"""
+    job = db.session.get(AccountDeletion, job_id)
+    if not job:
+        return jsonify({'error': 'Deletion job not found'}), 404
+    return jsonify(job.to_dict())
+
 # Password Reset Routes
-@app.route('/api/forgot-password', methods=['POST'])
+@api.route('/api/forgot-password', methods=['POST'])
+@rate_limit('forgot_password')
+@admission_limit('smtp')
 def forgot_password():
     """Send password reset email"""
     try:
@@ -580,17 +2183,19 @@ def forgot_password():
         
         # Send password reset email
         email_sent = send_password_reset_email(user.email, user.username, reset_token)
+        record_activity('auth.password_reset_requested', user.id, email_sent=email_sent)
         
         return jsonify({
             'message': 'If an account with that email exists, a password reset link has been sent.',
             'email_sent': email_sent
         }), 200
         
-    except Exception as e:
-        print(f"Error in forgot_password: {str(e)}")
+    except Exception:
+        log.exception('auth.forgot_password_error', "Error in forgot_password")
         return jsonify({'error': 'An error occurred while processing your request'}), 500
 
-@app.route('/api/reset-password', methods=['POST'])
+@api.route('/api/reset-password', methods=['POST'])
+@admission_limit('password_hash')
 def reset_password():
     """Reset password using token"""
     try:
@@ -625,19 +2230,20 @@ def reset_password():
         # Update password
         user.set_password(new_password)
         db.session.commit()
+        record_activity('auth.password_reset', user.id)
         
-        print(f"🔐 Password reset successful for user: {user.username}")
+        log.info('auth.password_reset', "🔐 Password reset successful", user_id=user.id)
         
         return jsonify({
             'message': 'Password has been reset successfully. You can now login with your new password.',
             'success': True
         }), 200
         
-    except Exception as e:
-        print(f"Error in reset_password: {str(e)}")
+    except Exception:
+        log.exception('auth.reset_password_error', "Error in reset_password")
         return jsonify({'error': 'An error occurred while resetting your password'}), 500
 
-@app.route('/api/verify-reset-token', methods=['POST'])
+@api.route('/api/verify-reset-token', methods=['POST'])
 def verify_reset_token():
     """Verify if reset token is valid"""
     try:
@@ -671,17 +2277,23 @@ def verify_reset_token():
             'username': user.username
         }), 200
         
-    except Exception as e:
-        print(f"Error in verify_reset_token: {str(e)}")
+    except Exception:
+        log.exception('auth.verify_reset_token_error', "Error in verify_reset_token")
         return jsonify({
             'valid': False,
             'error': 'An error occurred while verifying the token'
         }), 500
 
 # Google OAuth Routes
-@app.route('/api/auth/google', methods=['POST'])
+@api.route('/api/auth/google', methods=['POST'])
+@admission_limit('google')
 def google_auth():
     """Handle Google OAuth authentication"""
+    from google.oauth2 import id_token
+
+    if breakers['google'].is_open():
+        return google_unavailable()
+
     try:
         data = request.get_json()
         token = data.get('token')
@@ -695,7 +2307,7 @@ def google_auth():
             # In production, you should verify the token properly
             idinfo = id_token.verify_oauth2_token(
                 token, 
-                google_requests.Request(), 
+                get_google_request(), 
                 GOOGLE_CLIENT_ID
             )
             
@@ -708,11 +2320,11 @@ def google_auth():
         except ValueError as e:
             # For development, let's also try a direct API call approach
             try:
-                response = requests.get(f'https://www.googleapis.com/oauth2/v1/tokeninfo?access_token={token}')
+                response = google_api_get(f'https://www.googleapis.com/oauth2/v1/tokeninfo?access_token={token}')
                 if response.status_code == 200:
                     token_info = response.json()
                     # Get user profile
-                    profile_response = requests.get(f'https://www.googleapis.com/oauth2/v1/userinfo?access_token={token}')
+                    profile_response = google_api_get(f'https://www.googleapis.com/oauth2/v1/userinfo?access_token={token}')
                     if profile_response.status_code == 200:
                         profile_data = profile_response.json()
                         google_id = profile_data['id']
@@ -723,6 +2335,8 @@ def google_auth():
                         return jsonify({'error': 'Failed to get user profile from Google'}), 400
                 else:
                     return jsonify({'error': 'Invalid Google token'}), 400
+            except CircuitOpenError:
+                raise
             except Exception as api_error:
                 return jsonify({'error': f'Google authentication failed: {str(api_error)}'}), 400
         
@@ -730,6 +2344,7 @@ def google_auth():
         existing_user = User.query.filter_by(google_id=google_id).first()
         if existing_user:
             # User exists, log them in
+            record_activity('auth.login', existing_user.id, method='google')
             access_token = create_access_token(identity=str(existing_user.id))
             return jsonify({
                 'access_token': access_token,
@@ -763,6 +2378,7 @@ def google_auth():
         
         db.session.add(new_user)
         db.session.commit()
+        record_activity('auth.register', new_user.id, method='google')
         
         # Create access token
         access_token = create_access_token(identity=str(new_user.id))
@@ -773,11 +2389,27 @@ def google_auth():
             'message': 'User registered successfully'
         }), 201
         
+    except CircuitOpenError:
+        return google_unavailable()
     except Exception as e:
         return jsonify({'error': f'Authentication failed: {str(e)}'}), 500
 
-@app.route('/api/me', methods=['GET'])
+@api.errorhandler(ShardMovingError)
+def shard_moving(error):
+    response = jsonify({'error': 'Your data is being moved, changes are paused for a moment - please try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(SHARD_MOVE_DRAIN_SECONDS) + 5)
+    return response
+
+def google_unavailable():
+    response = jsonify({'error': 'Google sign-in is temporarily unavailable, please try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(breakers['google'].open_seconds))
+    return response
+
+@api.route('/api/me', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_current_user():
     current_user_id = int(get_jwt_identity())
     user = User.query.get(current_user_id)
@@ -788,15 +2420,300 @@ def get_current_user():
     return jsonify({'user': user.to_dict()}), 200
 
 # Todo Routes (Updated with authentication)
-@app.route('/api/todos', methods=['GET'])
+@api.route('/api/todos', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_todos():
+    """List todos newest first (order=created) or in manual order (order=position).
+
+    ?tags=a,b keeps todos tagged with all of them (tag_mode=all, the default)
+    or any of them (tag_mode=any). With ?limit=N the list is paged;
+    X-Next-Cursor carries the cursor for the next page.
+    ?include_archived=true mixes in archived todos (flagged archived: true).
+    """
+    current_user_id = int(get_jwt_identity())
+    order = request.args.get('order', 'created')
+    if order not in TODO_ORDERS:
+        return jsonify({'error': 'order must be created or position'}), 400
+    include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+
+    query = select(*TODO_ROW_COLUMNS).where(Todo.user_id == current_user_id).order_by(*TODO_ORDERS[order])
+    archived_query = (
+        select(*ARCHIVED_TODO_ROW_COLUMNS)
+        .where(ArchivedTodo.user_id == current_user_id)
+        .order_by(*ARCHIVED_TODO_ORDERS[order])
+    )
+    if request.args.get('tags'):
+        tag_mode = request.args.get('tag_mode', 'all')
+        if tag_mode not in ('all', 'any'):
+            return jsonify({'error': 'tag_mode must be all or any'}), 400
+        try:
+            names = normalize_tag_names([name for name in request.args['tags'].split(',') if name.strip()])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if names:
+            query = query.where(tag_filter(current_user_id, names, tag_mode))
+            archived_query = archived_query.where(archived_tag_filter(names, tag_mode))
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            query = query.where(cursor_filter(order, cursor))
+            archived_query = archived_query.where(cursor_filter(order, cursor, ArchivedTodo))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    limit = request.args.get('limit', type=int)
+    if not limit:
+        todos = load_todo_rows(query)
+        if include_archived:
+            todos = merge_archived(order, todos, load_archived_todo_rows(archived_query))
+        return jsonify(todo_dicts(todos))
+
+    limit = max(1, min(limit, TODO_PAGE_MAX))
+    todos = load_todo_rows(query.limit(limit + 1))
+    if include_archived:
+        todos = merge_archived(order, todos, load_archived_todo_rows(archived_query.limit(limit + 1)))
+    response = jsonify(todo_dicts(todos[:limit]))
+    if len(todos) > limit:
+        response.headers['X-Next-Cursor'] = make_cursor(order, todos[limit - 1])
+    return response
+
+@api.route('/api/todos/stats', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_todos_stats():
+    """Return the user's todo counters from their stats row"""
     current_user_id = int(get_jwt_identity())
-    todos = Todo.query.filter_by(user_id=current_user_id).order_by(Todo.created_at.desc()).all()
-    return jsonify([todo.to_dict() for todo in todos])
+    return jsonify(get_todo_stats(current_user_id).to_dict())
 
-@app.route('/api/send-email-summary', methods=['POST'])
+@api.route('/api/activity', methods=['GET'])
 @jwt_required()
+@read_replica
+def get_activity():
+    """The user's activity log, newest first, optionally for one ?action= or ?todo_id=.
+
+    Paged with ?limit=N (default 50); X-Next-Cursor carries the cursor for the
+    next page. Events show up a few seconds after they happen (write-behind).
+    """
+    current_user_id = int(get_jwt_identity())
+    query = ActivityEvent.query.filter_by(user_id=current_user_id).order_by(ActivityEvent.id.desc())
+    if request.args.get('action'):
+        query = query.filter(ActivityEvent.action == request.args['action'])
+    if request.args.get('todo_id'):
+        query = query.filter(ActivityEvent.todo_id == request.args.get('todo_id', type=int))
+    cursor = request.args.get('cursor')
+    if cursor:
+        if not cursor.isdigit():
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(ActivityEvent.id < int(cursor))
+
+    limit = max(1, min(request.args.get('limit', 50, type=int), ACTIVITY_PAGE_MAX))
+    events = query.limit(limit + 1).all()
+    response = jsonify([event.to_dict() for event in events[:limit]])
+    if len(events) > limit:
+        response.headers['X-Next-Cursor'] = str(events[limit - 1].id)
+    return response
+
+# Bulk export / import
+EXPORT_FIELDS = ['id', 'title', 'description', 'completed', 'created_at', 'updated_at']
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+
+def parse_import_row(row):
+    """Validate one imported record and return the column values to insert"""
+    title = row.get('title') or ''
+    if not isinstance(title, str):
+        raise ValueError('title must be a string')
+    title = title.strip()
+    if not title:
+        raise ValueError('title is required')
+    if len(title) > 200:
+        raise ValueError('title is longer than 200 characters')
+    description = row.get('description') or ''
+    if not isinstance(description, str):
+        raise ValueError('description must be a string')
+
+    completed = row.get('completed', False)
+    if isinstance(completed, str):
+        completed = completed.strip().lower() in ('true', '1', 'yes')
+
+    values = {
+        'title': title,
+        'description': description,
+        'completed': bool(completed)
+    }
+    if row.get('created_at'):
+        values['created_at'] = datetime.fromisoformat(row['created_at'])
+        values['updated_at'] = datetime.fromisoformat(row.get('updated_at') or row['created_at'])
+    return values
+
+@api.route('/api/todos/export', methods=['GET'])
+@jwt_required()
+def export_todos():
+    """Stream all of the user's todos as NDJSON or CSV from a server-side cursor.
+
+    With ?include_archived=true the archived todos follow the active ones.
+    """
+    current_user_id = int(get_jwt_identity())
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    order = request.args.get('order', 'created')
+    if order not in TODO_ORDERS:
+        return jsonify({'error': 'order must be created or position'}), 400
+    include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+
+    identity = get_jwt_identity()
+    queries = [
+        select(*[getattr(Todo, field) for field in EXPORT_FIELDS])
+        .where(Todo.user_id == current_user_id)
+        .order_by(*TODO_ORDERS[order])
+    ]
+    if include_archived:
+        queries.append(
+            select(*[literal(True).label(field) if field == 'completed' else getattr(ArchivedTodo, field)
+                     for field in EXPORT_FIELDS])
+            .where(ArchivedTodo.user_id == current_user_id)
+            .order_by(*ARCHIVED_TODO_ORDERS[order])
+        )
+
+    def generate():
+        with replica_reads(identity):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if export_format == 'csv':
+                writer.writerow(EXPORT_FIELDS)
+
+            for query in queries:
+                rows = db.session.execute(
+                    query.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+                )
+                for batch in rows.partitions():
+                    for row in batch:
+                        record = row._asdict()
+                        record['created_at'] = record['created_at'].isoformat()
+                        record['updated_at'] = record['updated_at'].isoformat()
+                        if export_format == 'csv':
+                            writer.writerow([record[field] for field in EXPORT_FIELDS])
+                        else:
+                            buffer.write(json.dumps(record))
+                            buffer.write('\n')
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+            if export_format == 'csv' and buffer.tell():
+                yield buffer.getvalue()
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=todos.{export_format}'}
+    )
+
+@api.route('/api/todos/import', methods=['POST'])
+@jwt_required()
+def import_todos():
+    """Import NDJSON or CSV from the request body in batched, bounded transactions.
+
+    The body is parsed as it arrives, so memory stays flat regardless of size.
+    No per-item notification emails are sent.
+    """
+    current_user_id = int(get_jwt_identity())
+    import_format = request.args.get('format')
+    if not import_format:
+        import_format = 'csv' if 'csv' in (request.content_type or '') else 'ndjson'
+    if import_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    if not db.session.get(User, current_user_id):
+        return jsonify({'error': 'User not found'}), 404
+
+    start = time.perf_counter()
+    imported = 0
+    rejected = 0
+    errors = []
+    batch = []
+
+    def reject(line_number, error):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < 20:
+            errors.append({'line': line_number, 'error': str(error)})
+
+    def csv_lines():
+        # A line that isn't UTF-8 is rejected and left out of the CSV
+        for line_number, line in enumerate(request.stream, 1):
+            try:
+                yield line.decode('utf-8')
+            except UnicodeDecodeError as e:
+                reject(line_number, e)
+
+    # Decode line by line; the WSGI input stream isn't a full io object under gunicorn
+    if import_format == 'csv':
+        records = enumerate(csv.DictReader(csv_lines()), 2)
+    else:
+        records = ((line_number, line) for line_number, line in enumerate(request.stream, 1) if line.strip())
+
+    # Imported todos go to the end of the manual order, in file order
+    position = last_position(current_user_id)
+
+    def flush(batch):
+        nonlocal position
+        # One executemany needs the same keys in every row, so rows without
+        # timestamps get the batch's
+        now = datetime.utcnow()
+        for values, position in zip(batch, keys_after(position, len(batch))):
+            values['position'] = position
+            values.setdefault('created_at', now)
+            values.setdefault('updated_at', now)
+        completed = sum(1 for values in batch if values['completed'])
+        db.session.execute(Todo.__table__.insert(), batch)
+        adjust_todo_stats(current_user_id, total=len(batch), active=len(batch) - completed, completed=completed)
+        db.session.commit()
+
+    for line_number, record in records:
+        try:
+            if import_format == 'ndjson':
+                # UnicodeDecodeError is a ValueError
+                record = json.loads(record.decode('utf-8'))
+                if not isinstance(record, dict):
+                    raise ValueError('expected a JSON object')
+            values = parse_import_row(record)
+        except (ValueError, TypeError) as e:
+            reject(line_number, e)
+            continue
+
+        values['user_id'] = current_user_id
+        batch.append(values)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush(batch)
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+        imported += len(batch)
+
+    elapsed = time.perf_counter() - start
+    log.info('todos.imported', "📥 Imported todos", user_id=current_user_id, imported=imported,
+             rejected=rejected, seconds=round(elapsed, 2))
+    record_activity('todo.import', current_user_id, imported=imported, rejected=rejected)
+
+    return jsonify({
+        'message': 'Import finished',
+        'rows_imported': imported,
+        'rows_rejected': rejected,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(imported / elapsed, 1) if elapsed else imported
+    }), 200
+
+@api.route('/api/send-email-summary', methods=['POST'])
+@jwt_required()
+@rate_limit('send_email_summary')
+@admission_limit('smtp')
 def send_email_summary():
     """Send email summary of active tasks on demand"""
     current_user_id = int(get_jwt_identity())
@@ -807,18 +2724,31 @@ def send_email_summary():
         return jsonify({'error': 'User not found'}), 404
     
     # Check if email configuration is set up
-    if not app.config['MAIL_USERNAME'] or not app.config['MAIL_PASSWORD']:
+    if not current_app.config['MAIL_USERNAME'] or not current_app.config['MAIL_PASSWORD']:
         return jsonify({
             'error': 'Email configuration not set up',
             'message': 'Please configure email settings to send notifications'
         }), 400
     
+    if breakers['smtp'].is_open():
+        response = jsonify({
+            'error': 'Email is temporarily unavailable',
+            'message': 'Please try again shortly'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(breakers['smtp'].open_seconds))
+        return response
+    
     try:
-        # Get all active todos for the user
-        active_todos = Todo.query.filter_by(user_id=current_user_id, completed=False).order_by(Todo.created_at.desc()).all()
+        # Get the newest active todos for the user
+        with replica_reads(get_jwt_identity()):
+            active_todos = active_task_rows(current_user_id, EMAIL_TASK_LIST_LIMIT)
+            active_count = get_todo_stats(current_user_id).active
+        more_tasks = max(active_count - len(active_todos), 0)
         
         # Create email subject
-        subject = f"📊 Todo Summary: {len(active_todos)} Active Tasks | Sent on Demand"
+        render_started = time.perf_counter()
+        subject = f"📊 Todo Summary: {active_count} Active Tasks | Sent on Demand"
         
         # Build active tasks list for HTML
         active_tasks_html = ""
@@ -835,17 +2765,21 @@ def send_email_summary():
                     <br><small style="color: #666;">📅 Created: {task_date}</small>
                 </div>
                 """
+            if more_tasks:
+                active_tasks_html += f"<p style='color: #666; font-style: italic;'>➕ {more_tasks} more active tasks - open the app to see them all</p>"
         else:
             active_tasks_html = "<p style='color: #666; font-style: italic;'>🎉 No active tasks! You're all caught up!</p>"
         
         # Build active tasks list for plain text
         active_tasks_text = ""
         if active_todos:
-            active_tasks_text = f"\n📋 Your Current Active Tasks ({len(active_todos)} total):\n" + "="*50 + "\n"
+            active_tasks_text = f"\n📋 Your Current Active Tasks ({active_count} total):\n" + "="*50 + "\n"
             for i, task in enumerate(active_todos, 1):
                 task_description = f"\n   📝 {task.description}" if task.description else ""
                 task_date = task.created_at.strftime('%b %d, %Y')
                 active_tasks_text += f"\n📌 {i}. {task.title}{task_description}\n   📅 Created: {task_date}\n"
+            if more_tasks:
+                active_tasks_text += f"\n➕ {more_tasks} more active tasks - open the app to see them all\n"
         else:
             active_tasks_text = "\n🎉 No active tasks! You're all caught up!"
         
@@ -880,7 +2814,7 @@ def send_email_summary():
                     
                     <div class="stats-bar">
                         <h3>📊 Your Task Summary</h3>
-                        <p><strong>{len(active_todos)} Active Tasks</strong> • {'Ready to tackle!' if active_todos else 'All caught up!'}</p>
+                        <p><strong>{active_count} Active Tasks</strong> • {'Ready to tackle!' if active_todos else 'All caught up!'}</p>
                     </div>
                     
                     <div class="tasks-container">
@@ -905,7 +2839,7 @@ def send_email_summary():
                 <div class="footer">
                     <p>📱 This email was sent on-demand from your Todo App</p>
                     <p>🔧 You requested this summary using the "Send Email Summary" button</p>
-                    <p>📊 Total Active Tasks: {len(active_todos)} | Sent: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
+                    <p>📊 Total Active Tasks: {active_count} | Sent: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
                 </div>
             </div>
         </body>
@@ -921,7 +2855,7 @@ def send_email_summary():
         Here's your current task summary as requested:
         
         📊 TASK SUMMARY:
-        • Total Active Tasks: {len(active_todos)}
+        • Total Active Tasks: {active_count}
         • Status: {'Ready to tackle!' if active_todos else 'All caught up!'}
         {active_tasks_text}
         
@@ -941,21 +2875,22 @@ def send_email_summary():
         """
         
         # Create message
-        msg = Message(
+        msg = make_message(
             subject=subject,
             recipients=[user.email],
             html=html_body,
             body=text_body
         )
+        server_timing.add_since('render', render_started)
         
         # Send email synchronously
-        success = send_email_sync(msg)
+        success = send_email_sync(msg, 'summary')
         
         if success:
             return jsonify({
                 'message': 'Email summary sent successfully',
                 'email': user.email,
-                'active_tasks_count': len(active_todos),
+                'active_tasks_count': active_count,
                 'sent_at': datetime.now().isoformat()
             }), 200
         else:
@@ -964,14 +2899,14 @@ def send_email_summary():
                 'message': 'Please check email configuration and try again'
             }), 500
             
-    except Exception as e:
-        print(f"Error sending email summary: {str(e)}")
+    except Exception:
+        log.exception('email.summary_error', "Error sending email summary")
         return jsonify({
             'error': 'Internal server error',
             'message': 'Failed to send email summary'
         }), 500
 
-@app.route('/api/todos', methods=['POST'])
+@api.route('/api/todos', methods=['POST'])
 @jwt_required()
 def create_todo():
     current_user_id = int(get_jwt_identity())
@@ -979,20 +2914,39 @@ def create_todo():
     
     if not data or not data.get('title'):
         return jsonify({'error': 'Title is required'}), 400
+    try:
+        tag_names = normalize_tag_names(data.get('tags', []))
+        due_at = parse_datetime_field(data, 'due_at')
+        remind_at = parse_datetime_field(data, 'remind_at')
+        recurrence = data.get('recurrence')
+        if recurrence is not None:
+            normalize_rule(recurrence, due_at or datetime.utcnow())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Get user information for email
     user = User.query.get(current_user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
+    # New todos go to the top of the manual order
     todo = Todo(
         title=data['title'],
         description=data.get('description', ''),
+        position=key_between(None, first_position(current_user_id)),
+        due_at=due_at,
+        remind_at=remind_at,
         user_id=current_user_id
     )
+    set_recurrence(todo, recurrence)
     
     db.session.add(todo)
+    adjust_todo_stats(current_user_id, total=1, active=1)
+    db.session.flush()
+    tag_todos(current_user_id, [todo.id], tag_names)
     db.session.commit()
+    reminders.notify((g.get('shard_bind'), todo.id), todo.remind_at)
+    record_activity('todo.create', current_user_id, todo.id)
     
     # Send email notification synchronously (if enabled)
     email_sent = False
@@ -1006,13 +2960,11 @@ def create_todo():
             todo_description=todo.description,
             user_id=current_user_id
         )
-        if email_sent:
-            print(f"📧 Email notification sent successfully for todo creation: {todo.title}")
-        else:
-            print(f"📧 Email notification failed for todo creation: {todo.title}")
+        if not email_sent:
+            log.debug('todos.created_without_email', "📧 No email notification for todo creation", todo_id=todo.id)
     except Exception as e:
         email_error = str(e)
-        print(f"❌ Failed to send email notification: {email_error}")
+        log.error('email.todo_notification_error', "❌ Failed to send email notification", error=email_error)
     
     # Return todo data with email status
     response_data = todo.to_dict()
@@ -1022,7 +2974,7 @@ def create_todo():
     
     return jsonify(response_data), 201
 
-@app.route('/api/todos/<int:todo_id>', methods=['PUT'])
+@api.route('/api/todos/<int:todo_id>', methods=['PUT'])
 @jwt_required()
 def update_todo(todo_id):
     current_user_id = int(get_jwt_identity())
@@ -1032,34 +2984,226 @@ def update_todo(todo_id):
         return jsonify({'error': 'Todo not found'}), 404
     
     data = request.get_json()
+
+    if group_commit.enabled() and set(data or {}) == {'completed'} and not todo.recurrence:
+        # Checkbox toggle: commit together with concurrent toggles in this worker
+        try:
+            with server_timing.phase('db'):
+                group_commit.submit(
+                    g.get('shard_bind'), partial(toggle_completed, todo.id, current_user_id, bool(data['completed']))
+                )
+        except group_commit.GroupCommitTimeout as e:
+            if not e.may_have_applied:
+                response = jsonify({'error': 'Server is busy, the change was not saved; please try again',
+                                    'applied': False})
+                response.status_code = 503
+                response.headers['Retry-After'] = '1'
+                return response
+            # Still running: it may yet commit. Setting completed is idempotent, so a retry is safe
+            g.wrote_to_primary = True
+            return jsonify({'message': 'The change may or may not have been saved; reload the todo to check',
+                            'applied': None, 'id': todo.id}), 202
+        g.wrote_to_primary = True
+        db.session.expire(todo)
+        record_activity('todo.update', current_user_id, todo.id, fields=['completed'])
+        return jsonify(todo.to_dict())
     
+    try:
+        if 'due_at' in data:
+            todo.due_at = parse_datetime_field(data, 'due_at')
+        if 'remind_at' in data:
+            todo.remind_at = parse_datetime_field(data, 'remind_at')
+            # A new reminder time is a new reminder
+            todo.reminder_sent_at = None
+            todo.reminder_claim = None
+            todo.reminder_claimed_until = None
+            todo.reminder_attempts = None
+            todo.reminder_failed_at = None
+        if 'recurrence' in data:
+            set_recurrence(todo, data['recurrence'])
+        if 'due_at' in data and todo.recurrence and todo.due_at is None:
+            raise ValueError('a recurring todo needs a due_at; clear recurrence to remove it')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if 'tags' in data:
+        try:
+            tag_names = normalize_tag_names(data['tags'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        current_names = [tag.name for tag in todo.tags]
+        untag_todos(current_user_id, [todo.id], [name for name in current_names if name not in tag_names])
+        tag_todos(current_user_id, [todo.id], [name for name in tag_names if name not in current_names])
+        db.session.expire(todo, ['tags'])
     if 'title' in data:
         todo.title = data['title']
     if 'description' in data:
         todo.description = data['description']
-    if 'completed' in data:
+    next_todo = None
+    if 'completed' in data and bool(data['completed']) != bool(todo.completed):
         todo.completed = data['completed']
+        change = 1 if todo.completed else -1
+        adjust_todo_stats(current_user_id, active=-change, completed=change)
+        if todo.completed:
+            next_todo = spawn_next_occurrence(todo)
     
     todo.updated_at = datetime.utcnow()
     db.session.commit()
+    if 'remind_at' in data:
+        reminders.notify((g.get('shard_bind'), todo.id), todo.remind_at)
+    record_activity('todo.update', current_user_id, todo.id, fields=sorted(data))
     
+    response_data = todo.to_dict()
+    if next_todo:
+        reminders.notify((g.get('shard_bind'), next_todo.id), next_todo.remind_at)
+        record_activity('todo.create', current_user_id, next_todo.id, occurrence_of=todo.id)
+        response_data['next_occurrence'] = next_todo.to_dict()
+    return jsonify(response_data)
+
+@api.route('/api/todos/<int:todo_id>/move', methods=['POST'])
+@jwt_required()
+def move_todo(todo_id):
+    """Move a todo in the manual order by giving it one new order key.
+
+    Body: {"after_id": id of the todo that should be directly above it} and/or
+    {"before_id": id of the todo that should be directly below it}.
+    """
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    after_id = data.get('after_id')
+    before_id = data.get('before_id')
+    if after_id is None and before_id is None:
+        return jsonify({'error': 'after_id or before_id is required'}), 400
+    if todo_id in (after_id, before_id):
+        return jsonify({'error': 'A todo cannot be moved next to itself'}), 400
+
+    todo = Todo.query.filter_by(id=todo_id, user_id=current_user_id).first()
+    if not todo:
+        return jsonify({'error': 'Todo not found'}), 404
+    neighbour_ids = [neighbour_id for neighbour_id in (after_id, before_id) if neighbour_id is not None]
+    neighbours = {
+        neighbour.id: neighbour
+        for neighbour in Todo.query.filter(Todo.user_id == current_user_id, Todo.id.in_(neighbour_ids))
+    }
+    if len(neighbours) != len(set(neighbour_ids)):
+        return jsonify({'error': 'Neighbour todo not found'}), 404
+
+    for attempt in (1, 2):
+        above, below = neighbours.get(after_id), neighbours.get(before_id)
+        if above and below and above.position and below.position and above.position > below.position:
+            return jsonify({'error': 'after_id must be directly above before_id'}), 409
+        try:
+            todo.position = position_between(current_user_id, todo_id, above, below)
+            break
+        except ValueError:
+            if attempt == 2:
+                return jsonify({'error': 'after_id must be directly above before_id'}), 409
+            # Unkeyed todos, or neighbours that got the same key from concurrent
+            # inserts: rebalance once and retry
+            rebalance_positions(current_user_id)
+            db.session.expire_all()
+
+    db.session.commit()
+    record_activity('todo.move', current_user_id, todo.id)
+    if len(todo.position) > ORDER_KEY_MAX_LENGTH:
+        schedule_position_rebalance(current_app._get_current_object(), current_user_id)
+
     return jsonify(todo.to_dict())
 
-@app.route('/api/todos/<int:todo_id>', methods=['DELETE'])
+@api.route('/api/todos/<int:todo_id>/restore', methods=['POST'])
+@jwt_required()
+def restore_todo(todo_id):
+    """Move an archived todo back to the active list (it stays completed)"""
+    current_user_id = int(get_jwt_identity())
+    archived = ArchivedTodo.query.filter_by(id=todo_id, user_id=current_user_id).first()
+    if not archived:
+        return jsonify({'error': 'Archived todo not found'}), 404
+
+    todo = restore_archived_todo(archived)
+    db.session.commit()
+    record_activity('todo.restore', current_user_id, todo.id)
+    return jsonify(todo.to_dict())
+
+@api.route('/api/todos/tags', methods=['POST'])
+@jwt_required()
+def bulk_tag_todos():
+    """Add and/or remove tags on many todos at once.
+
+    Body: {"todo_ids": [...], "add": ["work"], "remove": ["someday"]}
+    """
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    todo_ids = data.get('todo_ids')
+    if not isinstance(todo_ids, list) or not todo_ids or not all(isinstance(todo_id, int) for todo_id in todo_ids):
+        return jsonify({'error': 'todo_ids must be a non-empty list of ids'}), 400
+    if len(todo_ids) > TAG_BULK_MAX:
+        return jsonify({'error': f'At most {TAG_BULK_MAX} todos per request'}), 400
+    try:
+        add = normalize_tag_names(data.get('add', []))
+        remove = normalize_tag_names(data.get('remove', []))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not add and not remove:
+        return jsonify({'error': 'add or remove is required'}), 400
+
+    # Only the caller's todos; unknown ids are reported, not an error
+    owned = db.session.scalars(
+        select(Todo.id).where(Todo.user_id == current_user_id, Todo.id.in_(set(todo_ids)))
+    ).all()
+    removed = untag_todos(current_user_id, owned, remove)
+    added = tag_todos(current_user_id, owned, add)
+    db.session.commit()
+    record_activity('todo.tag', current_user_id, todos=len(owned), add=add, remove=remove)
+
+    return jsonify({
+        'todos_matched': len(owned),
+        'links_added': added,
+        'links_removed': removed,
+        'not_found': sorted(set(todo_ids) - set(owned))
+    })
+
+@api.route('/api/tags', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_tags():
+    """Tag sidebar: the user's tags with todo counts, read from the maintained counters"""
+    current_user_id = int(get_jwt_identity())
+    tags = Tag.query.filter(Tag.user_id == current_user_id, Tag.todo_count > 0).order_by(Tag.name)
+    return jsonify([tag.to_dict() for tag in tags])
+
+@api.route('/api/todos/<int:todo_id>', methods=['DELETE'])
 @jwt_required()
 def delete_todo(todo_id):
     current_user_id = int(get_jwt_identity())
     todo = Todo.query.filter_by(id=todo_id, user_id=current_user_id).first()
     
     if not todo:
-        return jsonify({'error': 'Todo not found'}), 404
-    
+        archived = ArchivedTodo.query.filter_by(id=todo_id, user_id=current_user_id).first()
+        if not archived:
+            return jsonify({'error': 'Todo not found'}), 404
+        db.session.delete(archived)
+        adjust_todo_stats(current_user_id, total=-1, completed=-1)
+        db.session.commit()
+        record_activity('todo.delete', current_user_id, todo_id, archived=True)
+        return jsonify({'message': 'Todo deleted successfully'})
+    
+    # The todo_tag rows go with the todo (ON DELETE CASCADE); their counts go here
+    db.session.execute(
+        update(Tag)
+        .where(Tag.id.in_(select(todo_tag.c.tag_id).where(todo_tag.c.todo_id == todo.id)))
+        .values(todo_count=Tag.todo_count - 1)
+        .execution_options(synchronize_session=False)
+    )
     db.session.delete(todo)
+    if todo.completed:
+        adjust_todo_stats(current_user_id, total=-1, completed=-1)
+    else:
+        adjust_todo_stats(current_user_id, total=-1, active=-1)
     db.session.commit()
+    record_activity('todo.delete', current_user_id, todo_id)
     
     return jsonify({'message': 'Todo deleted successfully'})
 
-@app.route('/api/debug/token', methods=['GET'])
+@api.route('/api/debug/token', methods=['GET'])
 @jwt_required()
 def debug_token():
     from flask_jwt_extended import get_jwt
@@ -1074,10 +3218,171 @@ def debug_token():
         'is_blacklisted': token_data.get('jti') in blacklisted_tokens
     })
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy'})
 
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics for this worker; protected by METRICS_TOKEN when set"""
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/admin/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """Saved request profiles and sampling files, newest first"""
+    return jsonify(profiling.list_artifacts())
+
+PROFILE_TEXT_SORTS = ('cumulative', 'tottime', 'calls')
+
+@api.route('/api/admin/profiles/<name>', methods=['GET'])
+@admin_required
+def get_profile(name):
+    """Download a saved profile, or its top functions as text with ?format=text"""
+    path = profiling.artifact_path(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    if request.args.get('format') == 'text' and name.endswith('.pstats'):
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in PROFILE_TEXT_SORTS:
+            return jsonify({'error': f"sort must be one of {', '.join(PROFILE_TEXT_SORTS)}"}), 400
+        return Response(profiling.pstats_text(path, sort), mimetype='text/plain')
+    return send_file(path, as_attachment=True)
+
+@api.route('/api/admin/profiler/sampling', methods=['POST'])
+@admin_required
+def start_sampling_profiler():
+    """Sample the stacks of requests in every worker for the next `seconds`"""
+    if not profiling.PROFILER_ENABLED:
+        return jsonify({'error': 'Profiling is disabled (PROFILER_ENABLED)'}), 409
+    data = request.get_json(silent=True) or {}
+    seconds = data.get('seconds', 30)
+    interval_ms = data.get('interval_ms', profiling.PROFILE_SAMPLE_INTERVAL_MS)
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (seconds, interval_ms)):
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    control = profiling.start_sampling(seconds, interval_ms)
+    return jsonify({
+        'id': control['id'],
+        'until': datetime.fromtimestamp(control['until'], timezone.utc).isoformat(),
+        'interval_ms': control['interval_ms']
+    }), 202
+
+@api.route('/api/admin/profiler/sampling/<sampling_id>', methods=['GET'])
+@admin_required
+def get_sampling_profile(sampling_id):
+    """Flame graph of a finished sampling window: speedscope JSON, or folded stacks with ?format=folded"""
+    stacks = profiling.merged_samples(sampling_id)
+    if stacks is None:
+        return jsonify({'error': 'No samples for this window (it may still be running)'}), 404
+    if request.args.get('format') == 'folded':
+        return Response(profiling.folded_text(stacks), mimetype='text/plain')
+    return jsonify(profiling.speedscope_json(stacks, f'Sampling window {sampling_id}'))
+
+@api.route('/api/admin/memory', methods=['GET'])
+@admin_required
+def memory_overview():
+    """This worker's RSS and its history, retained memory per route and tracemalloc state.
+
+    ?objects=true adds the most common live object types (walks the whole heap).
+    """
+    overview = {
+        'pid': os.getpid(),
+        'rss_bytes': memory.rss_bytes(),
+        'rss_history': memory.rss_history(),
+        'routes': memory.route_stats(),
+        'tracemalloc': memory.tracing_status(),
+        'gc_counts': gc.get_count(),
+        'jwt_blocklist_size': len(blacklisted_tokens),
+    }
+    if request.args.get('objects', 'false').lower() == 'true':
+        counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+        overview['objects'] = dict(counts.most_common(request.args.get('limit', 30, type=int)))
+    return jsonify(overview)
+
+@api.route('/api/admin/memory/tracemalloc', methods=['POST'])
+@admin_required
+def set_memory_tracing():
+    """Start ({"tracing": true, "frames": N}) or stop tracemalloc in this worker"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get('tracing'), bool):
+        return jsonify({'error': 'tracing must be true or false'}), 400
+    frames = data.get('frames', memory.MEMORY_TRACEMALLOC_FRAMES)
+    if not isinstance(frames, int) or isinstance(frames, bool) or not 1 <= frames <= 100:
+        return jsonify({'error': 'frames must be between 1 and 100'}), 400
+    if data['tracing']:
+        memory.start_tracing(frames)
+    else:
+        memory.stop_tracing()
+    return jsonify({'pid': os.getpid(), **memory.tracing_status()})
+
+def memory_query_options():
+    """key_type and limit for allocation site listings, or raise ValueError"""
+    key_type = request.args.get('key_type', 'lineno')
+    if key_type not in memory.KEY_TYPES:
+        raise ValueError(f"key_type must be one of {', '.join(memory.KEY_TYPES)}")
+    return key_type, max(1, min(request.args.get('limit', 20, type=int), 500))
+
+@api.route('/api/admin/memory/snapshots', methods=['GET'])
+@admin_required
+def list_memory_snapshots():
+    return jsonify(memory.list_snapshots())
+
+@api.route('/api/admin/memory/snapshots', methods=['POST'])
+@admin_required
+def take_memory_snapshot():
+    """Snapshot this worker's traced allocations and return its top allocation sites"""
+    try:
+        name = memory.take_snapshot()
+    except RuntimeError as e:
+        return jsonify({'error': f'{e}: start it with POST /api/admin/memory/tracemalloc'}), 409
+    return jsonify({
+        'name': name,
+        'pid': os.getpid(),
+        'top': memory.top_sites(memory.load_snapshot(name))
+    }), 201
+
+@api.route('/api/admin/memory/snapshots/<name>', methods=['GET'])
+@admin_required
+def get_memory_snapshot(name):
+    """Top allocation sites of a snapshot (?key_type=lineno|filename|traceback&limit=N)"""
+    try:
+        key_type, limit = memory_query_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    snapshot = memory.load_snapshot(name)
+    if snapshot is None:
+        return jsonify({'error': 'Snapshot not found'}), 404
+    return jsonify({'name': name, 'top': memory.top_sites(snapshot, key_type, limit)})
+
+@api.route('/api/admin/memory/diff', methods=['GET'])
+@admin_required
+def diff_memory_snapshots():
+    """Allocation sites that changed most between two snapshots of one worker (?base=...&current=...)"""
+    try:
+        key_type, limit = memory_query_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    base_name, current_name = request.args.get('base', ''), request.args.get('current', '')
+    base, current = memory.load_snapshot(base_name), memory.load_snapshot(current_name)
+    if base is None or current is None:
+        return jsonify({'error': 'Snapshot not found'}), 404
+    if base_name.split('-')[0] != current_name.split('-')[0]:
+        return jsonify({'error': 'Snapshots are from different worker processes'}), 400
+    return jsonify({
+        'base': base_name,
+        'current': current_name,
+        'sites': memory.diff_sites(base, current, key_type, limit)
+    })
+
+@api.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Report ready only once this worker's warm-up has finished"""
+    status = warmup_status()
+    return jsonify(status), 200 if is_ready() else 503
+
 # Global variable to cache the frontend directory path
 _frontend_dir_cache = None
 
@@ -1088,7 +3393,6 @@ def get_frontend_build_dir():
     if _frontend_dir_cache and os.path.exists(_frontend_dir_cache):
         return _frontend_dir_cache
     
-    import os
     possible_paths = [
         os.path.join(os.path.dirname(__file__), '..', 'frontend', 'build'),  # Local development
         os.path.join(os.getcwd(), 'frontend', 'build'),  # Render deployment
@@ -1104,11 +3408,57 @@ def get_frontend_build_dir():
     
     return None
 
+# Warm-up steps, run per worker before it serves requests (see warmup.py)
+@warmup_step('db_pool')
+def warm_db_pool():
+    """Open several pooled connections up front and return them to the pool"""
+    count = int(os.environ.get('WARMUP_DB_CONNECTIONS', '2'))
+    engines = [db.engine] + [db.engines[bind_key] for bind_key in REPLICA_BIND_KEYS + SHARD_BIND_KEYS]
+    for engine in engines:
+        connections = [engine.connect() for _ in range(count)]
+        for connection in connections:
+            connection.exec_driver_sql('SELECT 1')
+            connection.close()
+
+@warmup_step('static_manifest')
+def warm_static_manifest():
+    """Resolve the frontend build dir and pull index.html and the asset manifest into the page cache"""
+    frontend_dir = get_frontend_build_dir()
+    if not frontend_dir:
+        return
+    for name in ('index.html', 'asset-manifest.json'):
+        path = os.path.join(frontend_dir, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                f.read()
+
+@warmup_step('google_certs')
+def warm_google_certs():
+    get_google_request()(GOOGLE_CERTS_URL, method='GET')
+
+@warmup_step('email_templates')
+def warm_email_templates():
+    """Set up Flask-Mail and build one MIME message so the first real email doesn't pay for it"""
+    make_message(
+        subject='Warm-up',
+        sender='warmup@localhost',
+        recipients=['warmup@localhost'],
+        html='<p>📝 Warm-up</p>',
+        body='📝 Warm-up'
+    ).as_string()
+
+@warmup_step('query')
+def warm_query():
+    """Run the list query once so mappers and the statement cache are ready"""
+    User.query.filter_by(id=0).first()
+    with using_shard(each_shard()[0]):
+        load_todo_rows(select(*TODO_ROW_COLUMNS).where(Todo.user_id == 0).order_by(*TODO_ORDERS['created']))
+        active_task_rows(0)
+
 # Add specific route for static files with better error handling
-@app.route('/static/<path:filename>')
+@api.route('/static/<path:filename>')
 def serve_static(filename):
     from flask import send_from_directory, send_file, jsonify
-    import os
     
     frontend_dir = get_frontend_build_dir()
     
@@ -1158,9 +3508,8 @@ def serve_static(filename):
     }), 404
 
 # Debug route to check build directory contents
-@app.route('/debug/build-info')
+@api.route('/debug/build-info')
 def debug_build_info():
-    import os
     
     frontend_dir = get_frontend_build_dir()
     
@@ -1204,11 +3553,9 @@ def debug_build_info():
     return jsonify(debug_info)
 
 # Route to dynamically serve the correct static files based on what's in index.html
-@app.route('/auto-fix-static')
+@api.route('/auto-fix-static')
 def auto_fix_static():
     """Automatically detect and fix static file serving issues"""
-    import os
-    import re
     
     frontend_dir = get_frontend_build_dir()
     if not frontend_dir:
@@ -1248,11 +3595,10 @@ def auto_fix_static():
     })
 
 # Serve React frontend (for single service deployment)
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
+@api.route('/', defaults={'path': ''})
+@api.route('/<path:path>')
 def serve_frontend(path):
     from flask import send_from_directory, send_file, jsonify
-    import os
     
     # If it's an API route, let Flask handle it normally
     if path.startswith('api/'):
@@ -1301,9 +3647,13 @@ def serve_frontend(path):
             'files': os.listdir(frontend_dir) if os.path.exists(frontend_dir) else 'Directory does not exist'
         }), 500
 
-# Create tables
-with app.app_context():
-    db.create_all()
+# WSGI entry point (gunicorn app:app); tables are created by `flask --app app init-db`
+app = create_app()
 
 if __name__ == '__main__':
+    with app.app_context():
+        init_database()
+        report_database_engines()
+    start_warmup(app)
+    start_reminders(app)
     app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5001)))
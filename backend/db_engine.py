@@ -0,0 +1,110 @@
+"""Database engine configuration: pool sizing for Postgres, pragmas for SQLite"""
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import logs
+
+log = logs.get_logger('db')
+
+
+def _env_int(name, default):
+    value = os.environ.get(name, '')
+    return int(value) if value.lstrip('-').isdigit() else default
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() == 'true'
+
+
+# SQLite pragmas applied to every new connection
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+    'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    # Negative cache_size is in KiB: 64 MiB keeps the todo/user indexes hot
+    'cache_size': -_env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024),
+    'temp_store': 'MEMORY',
+    # Needed for ON DELETE CASCADE; SQLite ships with foreign keys off
+    'foreign_keys': 'ON',
+}
+
+
+def is_sqlite(database_uri):
+    return database_uri.startswith('sqlite')
+
+
+def build_engine_options(database_uri):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for the configured database"""
+    if is_sqlite(database_uri):
+        # Pragmas are applied per connection by the listener below; the busy
+        # timeout is also passed to the driver so it covers the connect itself
+        return {
+            'connect_args': {
+                'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            },
+        }
+
+    options = {
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    }
+
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 30000)
+    if database_uri.startswith('postgresql') and statement_timeout > 0:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def describe_engine(engine):
+    """Return the effective engine settings, read back from a live connection"""
+    settings = {'dialect': engine.dialect.name, 'pool': type(engine.pool).__name__}
+
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            for name in SQLITE_PRAGMAS:
+                settings[name] = connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+        return settings
+
+    pool = engine.pool
+    settings.update({
+        'pool_size': pool.size() if hasattr(pool, 'size') else None,
+        'max_overflow': getattr(pool, '_max_overflow', None),
+        'pool_timeout': getattr(pool, '_timeout', None),
+        'pool_recycle': getattr(pool, '_recycle', None),
+        'pool_pre_ping': getattr(pool, '_pre_ping', None),
+    })
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            settings['statement_timeout'] = connection.exec_driver_sql('SHOW statement_timeout').scalar()
+    return settings
+
+
+def report_engine_settings(engine):
+    """Log the effective engine settings at startup"""
+    try:
+        log.info('db.engine', "✅ Database engine", url=engine.url.render_as_string(hide_password=True),
+                 **describe_engine(engine))
+    except Exception as e:
+        log.warning('db.engine_unreadable', "⚠️ Could not read database engine settings", error=str(e))
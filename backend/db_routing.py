@@ -0,0 +1,153 @@
+"""Read-replica routing: read-only routes query a replica, writes stay on the primary.
+
+After a user's own write their reads stay on the primary for a few seconds.
+The time of the write is kept in a local SQLite file shared by the gunicorn
+workers (like the rate limiter's buckets), so the pin holds whichever worker
+serves the next read.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+import logs
+from db_engine import build_engine_options
+from sharding import SHARDING_ENABLED, current_shard, touches_sharded_table
+
+# Comma separated list of replica URLs, e.g. two local SQLite files or Postgres standbys
+REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+
+# After a user's own write, keep their reads on the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS', '5'))
+REPLICA_PIN_STORAGE_PATH = os.environ.get(
+    'REPLICA_PIN_STORAGE_PATH', os.path.join(tempfile.gettempdir(), 'todoapp-replica-pins.db')
+)
+
+REPLICA_BIND_KEYS = [f'replica_{i}' for i in range(len(REPLICA_URLS))]
+
+log = logs.get_logger('db_routing')
+
+# One connection per process, used under a lock (see ratelimit.py)
+_connection = None
+_connection_pid = None
+_connection_lock = threading.Lock()
+
+
+def build_replica_binds():
+    """Build SQLALCHEMY_BINDS entries for the configured replicas"""
+    binds = {}
+    for key, url in zip(REPLICA_BIND_KEYS, REPLICA_URLS):
+        if url.startswith('postgres://'):
+            url = url.replace('postgres://', 'postgresql://', 1)
+        binds[key] = {'url': url, **build_engine_options(url)}
+    return binds
+
+
+def _connect():
+    """This process's connection (opened after fork); call with _connection_lock held"""
+    global _connection, _connection_pid
+    if _connection_pid != os.getpid():
+        connection = sqlite3.connect(REPLICA_PIN_STORAGE_PATH, timeout=1, isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=OFF')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS last_write (user_id TEXT PRIMARY KEY, at REAL NOT NULL) WITHOUT ROWID'
+        )
+        _connection, _connection_pid = connection, os.getpid()
+    return _connection
+
+
+def record_write(user_id):
+    """Pin a user to the primary for READ_YOUR_WRITES_SECONDS, in every worker"""
+    now = time.time()
+    try:
+        with _connection_lock:
+            connection = _connect()
+            connection.execute(
+                'INSERT INTO last_write (user_id, at) VALUES (?, ?) '
+                'ON CONFLICT (user_id) DO UPDATE SET at = excluded.at',
+                (str(user_id), now)
+            )
+            # Occasionally drop expired pins so the file stays the size of the recent writers
+            if random.random() < 0.001:
+                connection.execute('DELETE FROM last_write WHERE at < ?', (now - READ_YOUR_WRITES_SECONDS,))
+    except sqlite3.Error as e:
+        log.warning('replica.pin_failed', "⚠️ Could not record a write for read-your-writes", error=str(e))
+
+
+def is_pinned_to_primary(user_id):
+    try:
+        with _connection_lock:
+            row = _connect().execute('SELECT at FROM last_write WHERE user_id = ?', (str(user_id),)).fetchone()
+    except sqlite3.Error as e:
+        # Reading from the primary is always correct, only slower
+        log.warning('replica.pin_unavailable', "⚠️ Read-your-writes store unavailable", error=str(e))
+        return True
+    return row is not None and time.time() - row[0] < READ_YOUR_WRITES_SECONDS
+
+
+class RoutingSession(Session):
+    """Session that sends reads to g.replica_bind when a route opted in.
+
+    Flushes and DML statements always go to the primary, so a read-only route
+    that ends up writing still writes to the right place. In sharded mode, statements on
+    sharded tables go to the current user's shard instead (see sharding.py);
+    replicas only serve the central tables then.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if SHARDING_ENABLED and touches_sharded_table(mapper, clause):
+                return self._db.engines[current_shard(self._db.engine)]
+            replica_key = g.get('replica_bind')
+            if replica_key and not self._flushing and not (clause is not None and clause.is_dml):
+                return self._db.engines[replica_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def mark_request_wrote(session, flush_context):
+    if has_app_context():
+        g.wrote_to_primary = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def mark_request_wrote_dml(orm_execute_state):
+    # insert()/update()/delete() run through session.execute without a flush
+    if has_app_context() and (orm_execute_state.is_insert or orm_execute_state.is_update
+                              or orm_execute_state.is_delete):
+        g.wrote_to_primary = True
+
+
+@contextmanager
+def replica_reads(user_id=None):
+    """Route queries in this block to a replica unless the user just wrote"""
+    if not REPLICA_BIND_KEYS or (user_id is not None and is_pinned_to_primary(user_id)):
+        yield
+        return
+
+    previous = g.get('replica_bind')
+    g.replica_bind = random.choice(REPLICA_BIND_KEYS)
+    try:
+        yield
+    finally:
+        g.replica_bind = previous
+
+
+def read_replica(view):
+    """Decorator for read-only routes; place it below @jwt_required()"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads(get_jwt_identity()):
+            return view(*args, **kwargs)
+    return wrapper
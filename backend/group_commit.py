@@ -0,0 +1,138 @@
+"""Group commit: concurrent small writes share one transaction, and one fsync.
+
+With GROUP_COMMIT_ENABLED, a request hands its mutation (a function issuing
+statements on the session) to this worker's committer and blocks. The
+committer takes the mutations that arrive within GROUP_COMMIT_WINDOW_MS of
+the first one (at most GROUP_COMMIT_MAX_BATCH), runs them in one transaction
+per bind and commits once; each request is answered only after that commit
+returned. If the batch fails, its mutations are retried one transaction each
+so only the failing one reports an error.
+
+A request that waits longer than GROUP_COMMIT_TIMEOUT_SECONDS gets
+GroupCommitTimeout. If its mutation was still queued it is withdrawn and never
+runs; once its batch has started it may still commit, which the exception's
+may_have_applied says.
+
+Batches form between requests a worker process handles at the same time, so
+the mode pays off with gevent workers (SERVER_MODE=async) or threaded
+servers, and most with SQLITE_SYNCHRONOUS=FULL, where every commit is an
+fsync. A sync worker only ever has one request in flight.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+import metrics
+
+GROUP_COMMIT_ENABLED = os.environ.get('GROUP_COMMIT_ENABLED', 'False').lower() == 'true'
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get('GROUP_COMMIT_WINDOW_MS', '2'))
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', '200'))
+# A request gives up waiting for its batch after this long
+GROUP_COMMIT_TIMEOUT_SECONDS = float(os.environ.get('GROUP_COMMIT_TIMEOUT_SECONDS', '30'))
+
+metrics.describe('group_commit_batches_total', 'Group commit transactions by outcome', 'counter')
+metrics.describe('group_commit_mutations_total', 'Mutations committed through group commit', 'counter')
+metrics.describe('group_commit_timeouts_total', 'Requests that stopped waiting for their batch', 'counter')
+
+
+class GroupCommitTimeout(Exception):
+    """Raised when a mutation's batch didn't commit in time; may_have_applied is False if it was withdrawn"""
+
+    def __init__(self, may_have_applied):
+        super().__init__('group commit timed out' + (' after its batch started' if may_have_applied else ''))
+        self.may_have_applied = may_have_applied
+
+
+class GroupCommitter:
+    def __init__(self, run_batch, window_seconds=GROUP_COMMIT_WINDOW_MS / 1000, max_batch=GROUP_COMMIT_MAX_BATCH):
+        # run_batch(key, mutations) runs the mutations in one transaction on
+        # the key's bind and returns their results, or raises
+        self.run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def submit(self, key, mutation):
+        """Run mutation in the next batch for key; returns its result once the batch is committed"""
+        if self._pid != os.getpid():
+            self._start()
+        future = Future()
+        self._queue.put((key, mutation, future))
+        try:
+            return future.result(timeout=GROUP_COMMIT_TIMEOUT_SECONDS)
+        except TimeoutError:
+            # Succeeds only while the mutation is queued; the committer then skips it
+            withdrawn = future.cancel()
+            metrics.inc('group_commit_timeouts_total', outcome='withdrawn' if withdrawn else 'in_batch')
+            raise GroupCommitTimeout(may_have_applied=not withdrawn) from None
+
+    def _start(self):
+        # Threads don't survive fork, so each worker process starts its own
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, name='group-commit', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, key, items):
+        try:
+            results = self.run_batch(key, [mutation for mutation, _ in items])
+        except Exception:
+            metrics.inc('group_commit_batches_total', outcome='failure')
+            # Find the bad mutation(s): one transaction each
+            for mutation, future in items:
+                try:
+                    future.set_result(self.run_batch(key, [mutation])[0])
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        metrics.inc('group_commit_batches_total', outcome='success')
+        metrics.inc('group_commit_mutations_total', len(items))
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+    def _run(self):
+        while True:
+            by_key = {}
+            for key, mutation, future in self._collect():
+                # False for a mutation withdrawn by its timed out request
+                if future.set_running_or_notify_cancel():
+                    by_key.setdefault(key, []).append((mutation, future))
+            for key, items in by_key.items():
+                self._commit(key, items)
+
+
+_committer = None
+
+
+def configure(run_batch):
+    global _committer
+    if GROUP_COMMIT_ENABLED:
+        _committer = GroupCommitter(run_batch)
+    return _committer
+
+
+def enabled():
+    return _committer is not None
+
+
+def submit(key, mutation):
+    return _committer.submit(key, mutation)
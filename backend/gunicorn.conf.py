@@ -0,0 +1,46 @@
+# Gunicorn configuration (picked up automatically when gunicorn runs from backend/)
+#
+# SERVER_MODE=sync   - default, one request at a time per worker process
+# SERVER_MODE=async  - gevent workers: every request runs in its own greenlet and
+#                      yields while it waits on SMTP, Google or the database, so a
+#                      slow upstream no longer blocks the whole worker
+import os
+
+server_mode = os.environ.get('SERVER_MODE', 'sync').lower()
+
+if server_mode == 'async':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('ASYNC_WORKER_CONNECTIONS', '1000'))
+else:
+    worker_class = 'sync'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+
+
+def post_fork(server, worker):
+    if server_mode != 'async':
+        return
+
+    # psycopg2 is a C driver, so monkey patching alone doesn't make it cooperative
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        server.log.info("✅ psycopg2 patched for gevent")
+    except ImportError:
+        server.log.info("⚠️ psycogreen not installed - Postgres queries will block the worker")
+
+
+def post_worker_init(worker):
+    """Runs in each worker after the app is loaded and before it accepts requests"""
+    from app import report_database_engines, start_reminders
+    from warmup import start_warmup
+
+    with worker.wsgi.app_context():
+        report_database_engines()
+    # In the background, so /api/ready can answer 503; other requests wait until it has finished
+    start_warmup(worker.wsgi)
+    start_reminders(worker.wsgi)
+
+
+def when_ready(server):
+    server.log.info(f"🚀 Serving in {server_mode} mode with {worker_class} workers")
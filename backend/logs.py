@@ -0,0 +1,252 @@
+"""Structured logging: JSON lines, formatted and written off the request thread.
+
+A log call on a request only checks its sampling and rate limits and puts
+the record on a bounded queue; a QueueListener thread per worker process
+formats it as one JSON object per line and writes it to stdout, so requests
+never wait on (or contend for) the stream. Every record carries the id of
+the request it was logged in (g.request_id, see X-Request-ID in app.py).
+
+Noisy events can be sampled with LOG_SAMPLE_RATES ("email.sent=0.1,..."),
+and each event is limited to LOG_RATE_LIMIT records per
+LOG_RATE_LIMIT_SECONDS; the number of records suppressed is added to the
+next one of that event that gets through. Records that find the queue full
+are dropped (and counted) rather than blocking the request.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_app_context
+
+import metrics
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()  # json / text
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+LOG_SAMPLE_RATES = {
+    event.strip(): float(rate)
+    for event, _, rate in (item.partition('=') for item in os.environ.get('LOG_SAMPLE_RATES', '').split(','))
+    if event.strip() and rate
+}
+LOG_RATE_LIMIT = int(os.environ.get('LOG_RATE_LIMIT', '50'))
+LOG_RATE_LIMIT_SECONDS = float(os.environ.get('LOG_RATE_LIMIT_SECONDS', '10'))
+
+ROOT_LOGGER = 'todo'
+
+metrics.describe('log_records_total', 'Log records queued for writing, by level', 'counter')
+metrics.describe('log_records_dropped_total', 'Log records dropped by sampling, rate limits or a full queue',
+                 'counter')
+metrics.describe('log_queue_size', 'Log records waiting to be written', 'gauge')
+
+
+def current_request_id():
+    return g.get('request_id') if has_app_context() else None
+
+
+class SamplingFilter(logging.Filter):
+    """Sample and rate limit records per event; warnings and errors are rate limited but never sampled"""
+
+    def __init__(self, sample_rates=None, rate_limit=LOG_RATE_LIMIT, per_seconds=LOG_RATE_LIMIT_SECONDS):
+        super().__init__()
+        self.sample_rates = LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+        self.rate_limit = rate_limit
+        self.per_seconds = per_seconds
+        self._windows = {}  # event -> [window start, records let through, suppressed not yet reported]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        event = getattr(record, 'event', None) or record.msg
+        rate = self.sample_rates.get(event)
+        if rate is not None and record.levelno < logging.WARNING:
+            if random.random() >= rate:
+                metrics.inc('log_records_dropped_total', reason='sampled')
+                return False
+            record.sample_rate = rate
+
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(event)
+            if window is None or now - window[0] >= self.per_seconds:
+                window = self._windows[event] = [now, 0, window[2] if window else 0]
+            if window[1] >= self.rate_limit:
+                window[2] += 1
+                metrics.inc('log_records_dropped_total', reason='rate_limited')
+                return False
+            window[1] += 1
+            suppressed, window[2] = window[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Blocking, so stopping works even when the queue is full
+        self.queue.put(self._sentinel)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """Queue records for this process's writer thread, started on first use after fork"""
+
+    def __init__(self, target, max_queued=LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(max_queued))
+        self.target = target
+        self.max_queued = max_queued
+        self._listener = None
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def prepare(self, record):
+        # Everything that depends on the calling thread is resolved here; the
+        # JSON formatting is left to the writer thread
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = current_request_id()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            metrics.inc('log_records_total', level=record.levelname.lower())
+        except queue.Full:
+            metrics.inc('log_records_dropped_total', reason='queue_full')
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        super().emit(record)
+
+    def size(self):
+        return self.queue.qsize()
+
+    def stop(self):
+        """Write out everything queued and stop the writer thread (the next record starts a new one)"""
+        with self._start_lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+    def _start(self):
+        # Threads don't survive fork, so each worker process starts its own
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.max_queued)
+            self._listener = _Listener(self.queue, self.target)
+            self._listener.start()
+            self._pid = os.getpid()
+        atexit.register(self.stop)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'pid': record.process,
+        }
+        for key in ('suppressed', 'sample_rate'):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        for key, value in getattr(record, 'fields', {}).items():
+            entry.setdefault(key, value)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """The message followed by its fields, for reading in a terminal"""
+
+    def format(self, record):
+        fields = dict(getattr(record, 'fields', {}))
+        for key in ('request_id', 'suppressed'):
+            if getattr(record, key, None):
+                fields[key] = getattr(record, key)
+        line = ' '.join([record.getMessage()] + [f'{key}={value}' for key, value in fields.items()])
+        return f'{line}\n{record.exc_text}' if record.exc_text else line
+
+
+class EventLogger:
+    """Logger whose records name an event and carry keyword fields:
+
+        log.info('email.sent', "✅ Email sent", recipients=msg.recipients)
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def _log(self, level, event, message, exc_info=None, **fields):
+        if self.logger.isEnabledFor(level):
+            # Built directly rather than via Logger.log, which walks the stack
+            # for a file and line number the JSON lines don't include
+            record = self.logger.makeRecord(self.logger.name, level, '(unknown file)', 0, message, None,
+                                            exc_info, extra={'event': event, 'fields': fields})
+            self.logger.handle(record)
+
+    def debug(self, event, message, **fields):
+        self._log(logging.DEBUG, event, message, **fields)
+
+    def info(self, event, message, **fields):
+        self._log(logging.INFO, event, message, **fields)
+
+    def warning(self, event, message, **fields):
+        self._log(logging.WARNING, event, message, **fields)
+
+    def error(self, event, message, **fields):
+        self._log(logging.ERROR, event, message, **fields)
+
+    def exception(self, event, message, **fields):
+        """Log an error with the traceback of the exception being handled"""
+        self._log(logging.ERROR, event, message, exc_info=sys.exc_info(), **fields)
+
+
+def get_logger(name):
+    return EventLogger(logging.getLogger(f'{ROOT_LOGGER}.{name}'))
+
+
+_handler = None
+
+
+def configure():
+    """Attach the queue handler to the app's loggers (once per process)"""
+    global _handler
+    if _handler is not None:
+        return _handler
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if LOG_FORMAT == 'text' else JsonFormatter())
+    _handler = BackgroundQueueHandler(output)
+    _handler.addFilter(SamplingFilter())
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(_handler)
+    logger.propagate = False
+    return _handler
+
+
+def flush():
+    """Wait until everything queued so far is written (for CLI commands and tests)"""
+    if _handler is not None:
+        _handler.stop()
+
+
+@metrics.register_collector
+def collect_log_queue():
+    if _handler is not None:
+        yield 'log_queue_size', {}, _handler.size()
@@ -0,0 +1,254 @@
+"""Memory diagnostics for a worker: RSS history, per-route retained memory, tracemalloc snapshots.
+
+- RSS is exported as process_resident_memory_bytes and also recorded every
+  MEMORY_RSS_INTERVAL_SECONDS, with the number of requests each route served
+  in that interval (the last MEMORY_RSS_HISTORY points). Growth can then be
+  lined up with the routes that ran.
+- With MEMORY_ROUTE_SAMPLE_RATE set, RetainedMemoryMiddleware counts, for
+  that fraction of requests, the memory blocks still allocated once the
+  response has been sent and released (sys.getallocatedblocks() before and
+  after), plus traced bytes while tracemalloc runs. A route whose sampled
+  requests keep leaving blocks behind after its caches have warmed up is
+  leaking. The count is process wide, so concurrent requests blur it; it is
+  exact with sync workers. Sampled requests pay for two gc.collect() calls.
+- tracemalloc is started on demand (it slows allocation down considerably).
+  Snapshots are dumped to MEMORY_SNAPSHOT_DIR with the worker's pid in the
+  name. Top allocation sites can be listed per snapshot, and two snapshots
+  of the same worker can be diffed.
+
+All of it is per worker process: tracing, snapshots and history belong to
+the worker that served the admin request (reported as pid).
+"""
+import gc
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+import metrics
+
+MEMORY_ROUTE_SAMPLE_RATE = float(os.environ.get('MEMORY_ROUTE_SAMPLE_RATE', '0'))
+MEMORY_RSS_INTERVAL_SECONDS = float(os.environ.get('MEMORY_RSS_INTERVAL_SECONDS', '60'))
+MEMORY_RSS_HISTORY = int(os.environ.get('MEMORY_RSS_HISTORY', '1440'))
+MEMORY_SNAPSHOT_DIR = os.environ.get('MEMORY_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'todoapp-memory'))
+MEMORY_SNAPSHOT_KEEP = int(os.environ.get('MEMORY_SNAPSHOT_KEEP', '20'))
+MEMORY_TRACEMALLOC_FRAMES = int(os.environ.get('MEMORY_TRACEMALLOC_FRAMES', '10'))
+
+SNAPSHOT_NAME = re.compile(r'^(\d+)-[0-9T]+-\d+\.tracemalloc$')
+KEY_TYPES = ('lineno', 'filename', 'traceback')
+# Where the app leaves the request's endpoint for the middleware
+ROUTE_ENVIRON_KEY = 'todo.memory_route'
+# Allocations made by the diagnostics themselves
+IGNORED_TRACES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+metrics.describe('process_resident_memory_bytes', 'Resident set size of the worker process', 'gauge')
+metrics.describe('memory_route_samples_total', 'Requests sampled for retained memory, by route', 'counter')
+metrics.describe('memory_route_retained_blocks_total', 'Memory blocks left allocated by sampled requests, by route',
+                 'counter')
+metrics.describe('memory_route_retained_bytes_total',
+                 'Traced bytes left allocated by sampled requests while tracemalloc runs, by route', 'counter')
+
+_lock = threading.Lock()
+_route_stats = {}  # route -> {'samples', 'retained_blocks', 'retained_bytes', 'max_retained_blocks'}
+_history = deque(maxlen=MEMORY_RSS_HISTORY)
+_route_requests = Counter()  # requests per route since the last history point
+_next_history_point = 0.0
+_snapshot_seq = 0
+
+
+def rss_bytes():
+    """Current resident set size (Linux), or the peak where /proc isn't available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Per-request accounting
+
+class RetainedMemoryMiddleware:
+    """WSGI middleware measuring what sampled requests leave allocated after their response is gone"""
+
+    def __init__(self, wsgi_app, sample_rate=MEMORY_ROUTE_SAMPLE_RATE):
+        self.wsgi_app = wsgi_app
+        self.sample_rate = sample_rate
+
+    def __call__(self, environ, start_response):
+        if random.random() >= self.sample_rate:
+            return self.wsgi_app(environ, start_response)
+        return self._sampled(environ, start_response)
+
+    def _sampled(self, environ, start_response):
+        # Collections on both sides keep garbage cycles (this request's or
+        # earlier ones') out of the count
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        blocks = sys.getallocatedblocks()
+        result = self.wsgi_app(environ, start_response)
+        try:
+            yield from result
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+            del result
+            route = environ.get(ROUTE_ENVIRON_KEY, 'unmatched')
+            gc.collect()
+            _record_retained(
+                route,
+                sys.getallocatedblocks() - blocks,
+                tracemalloc.get_traced_memory()[0] - traced if traced is not None and tracemalloc.is_tracing()
+                else None
+            )
+
+
+def _record_retained(route, blocks, traced):
+    with _lock:
+        stats = _route_stats.setdefault(
+            route, {'samples': 0, 'retained_blocks': 0, 'retained_bytes': 0, 'max_retained_blocks': 0}
+        )
+        stats['samples'] += 1
+        stats['retained_blocks'] += blocks
+        stats['max_retained_blocks'] = max(stats['max_retained_blocks'], blocks)
+        if traced is not None:
+            stats['retained_bytes'] += traced
+    metrics.inc('memory_route_samples_total', route=route)
+    metrics.inc('memory_route_retained_blocks_total', blocks, route=route)
+    if traced is not None:
+        metrics.inc('memory_route_retained_bytes_total', traced, route=route)
+
+
+def record_request(route):
+    """Count the request for the RSS history, taking a history point when one is due"""
+    global _next_history_point
+    now = time.monotonic()
+    with _lock:
+        _route_requests[route] += 1
+        if now < _next_history_point:
+            return
+        _next_history_point = now + MEMORY_RSS_INTERVAL_SECONDS
+        requests = dict(_route_requests)
+        _route_requests.clear()
+    _history.append({'time': time.time(), 'rss_bytes': rss_bytes(), 'requests': requests})
+
+
+def route_stats():
+    with _lock:
+        return {
+            route: {**stats, 'retained_blocks_per_request': round(stats['retained_blocks'] / stats['samples'], 1)}
+            for route, stats in _route_stats.items()
+        }
+
+
+def rss_history():
+    return list(_history)
+
+
+# tracemalloc
+
+def start_tracing(frames=MEMORY_TRACEMALLOC_FRAMES):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    tracemalloc.stop()
+
+
+def tracing_status():
+    if not tracemalloc.is_tracing():
+        return {'tracing': False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        'tracing': True,
+        'frames': tracemalloc.get_traceback_limit(),
+        'traced_bytes': current,
+        'traced_peak_bytes': peak,
+        'overhead_bytes': tracemalloc.get_tracemalloc_memory(),
+    }
+
+
+def take_snapshot():
+    """Dump a snapshot of the traced allocations; returns its name (raises RuntimeError if not tracing)"""
+    global _snapshot_seq
+    if not tracemalloc.is_tracing():
+        raise RuntimeError('tracemalloc is not tracing')
+    snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED_TRACES)
+    with _lock:
+        _snapshot_seq += 1
+        name = f"{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}-{_snapshot_seq}.tracemalloc"
+    os.makedirs(MEMORY_SNAPSHOT_DIR, exist_ok=True)
+    snapshot.dump(os.path.join(MEMORY_SNAPSHOT_DIR, name))
+
+    names = sorted(list_snapshots(), key=lambda entry: entry['modified'])
+    for entry in names[:max(len(names) - MEMORY_SNAPSHOT_KEEP, 0)]:
+        try:
+            os.remove(os.path.join(MEMORY_SNAPSHOT_DIR, entry['name']))
+        except OSError:
+            pass
+    return name
+
+
+def list_snapshots():
+    if not os.path.isdir(MEMORY_SNAPSHOT_DIR):
+        return []
+    snapshots = []
+    for name in os.listdir(MEMORY_SNAPSHOT_DIR):
+        match = SNAPSHOT_NAME.match(name)
+        if match:
+            stat = os.stat(os.path.join(MEMORY_SNAPSHOT_DIR, name))
+            snapshots.append({'name': name, 'pid': int(match[1]), 'size': stat.st_size, 'modified': stat.st_mtime})
+    return sorted(snapshots, key=lambda entry: entry['modified'], reverse=True)
+
+
+def load_snapshot(name):
+    """The named snapshot, or None for unknown or unsafe names"""
+    if not SNAPSHOT_NAME.match(name):
+        return None
+    path = os.path.join(MEMORY_SNAPSHOT_DIR, name)
+    return tracemalloc.Snapshot.load(path) if os.path.isfile(path) else None
+
+
+def _site(traceback, key_type):
+    if key_type == 'traceback':
+        return [f'{frame.filename}:{frame.lineno}' for frame in traceback]
+    frame = traceback[0]
+    return frame.filename if key_type == 'filename' else f'{frame.filename}:{frame.lineno}'
+
+
+def top_sites(snapshot, key_type='lineno', limit=20):
+    return [
+        {'site': _site(stat.traceback, key_type), 'size': stat.size, 'count': stat.count}
+        for stat in snapshot.statistics(key_type)[:limit]
+    ]
+
+
+def diff_sites(base, current, key_type='lineno', limit=20):
+    """Allocation sites that grew (or shrank) most from base to current"""
+    return [
+        {
+            'site': _site(stat.traceback, key_type),
+            'size_diff': stat.size_diff,
+            'count_diff': stat.count_diff,
+            'size': stat.size,
+            'count': stat.count,
+        }
+        for stat in current.compare_to(base, key_type)[:limit]
+    ]
+
+
+@metrics.register_collector
+def collect_rss():
+    yield 'process_resident_memory_bytes', {}, rss_bytes()
@@ -0,0 +1,60 @@
+"""In-process metrics registry with Prometheus text exposition (per worker process)"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(float)  # (name, labels) -> value
+_gauges = {}  # (name, labels) -> value
+_help = {}
+_collectors = []  # callables yielding (name, labels dict, value) at scrape time
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def describe(name, help_text, metric_type):
+    _help[name] = (help_text, metric_type)
+
+
+def inc(name, amount=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += amount
+
+
+def set_gauge(name, value, **labels):
+    _gauges[_key(name, labels)] = value
+
+
+def register_collector(collector):
+    """Register a callable that yields (name, labels, value) gauges when scraped"""
+    _collectors.append(collector)
+    return collector
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+def render_prometheus():
+    samples = defaultdict(list)
+    with _lock:
+        for (name, labels), value in _counters.items():
+            samples[name].append((labels, value))
+    for (name, labels), value in list(_gauges.items()):
+        samples[name].append((labels, value))
+    for collector in _collectors:
+        for name, labels, value in collector():
+            samples[name].append((tuple(sorted(labels.items())), value))
+
+    lines = []
+    for name in sorted(samples):
+        if name in _help:
+            help_text, metric_type = _help[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in samples[name]:
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,162 @@
+"""Fractional indexing: order keys that always leave room between two neighbours.
+
+A key is a variable-length integer part followed by an optional fraction, all
+in base 62, and keys sort correctly as plain byte strings. Moving an item only
+needs a new key between its new neighbours, so one row is updated and nothing
+is renumbered. The integer part (head letter a-z / A-Z gives its length) makes
+repeated appends at either end grow keys logarithmically; only repeated
+inserts into the same gap lengthen the fraction, which a rebalance resets.
+
+The key format follows the fractional-indexing scheme used by Figma and
+rocicorp/fractional-indexing.
+"""
+import os
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+SMALLEST_INTEGER = 'A' + DIGITS[0] * 26
+
+# Keys longer than this get the owner's list rebalanced in the background
+ORDER_KEY_MAX_LENGTH = int(os.environ.get('ORDER_KEY_MAX_LENGTH', '32'))
+# Stored key width; rebalancing keeps keys far below this
+ORDER_KEY_COLUMN_LENGTH = 255
+
+
+def _midpoint(a, b):
+    """Fraction strictly between a and b ('' is the bottom, None the top)"""
+    if b is not None and a >= b:
+        raise ValueError(f'{a!r} is not below {b!r}')
+    if a.endswith(DIGITS[0]) or (b and b.endswith(DIGITS[0])):
+        raise ValueError('fraction has a trailing zero')
+    if b is not None:
+        # Keep the common prefix and find the midpoint of what follows
+        n = 0
+        while (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _integer_length(head):
+    if 'a' <= head <= 'z':
+        return ord(head) - ord('a') + 2
+    if 'A' <= head <= 'Z':
+        return ord('Z') - ord(head) + 2
+    raise ValueError(f'invalid order key head {head!r}')
+
+
+def _integer_part(key):
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f'invalid order key {key!r}')
+    return key[:length]
+
+
+def validate_key(key):
+    """Raise ValueError unless key is a well-formed order key"""
+    if not key or key == SMALLEST_INTEGER:
+        raise ValueError(f'invalid order key {key!r}')
+    if any(char not in DIGITS for char in key):
+        raise ValueError(f'invalid order key {key!r}')
+    integer = _integer_part(key)
+    if key[len(integer):].endswith(DIGITS[0]):
+        raise ValueError(f'invalid order key {key!r}')
+
+
+def _increment_integer(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) + 1
+        if value < len(DIGITS):
+            digits[i] = DIGITS[value]
+            return head + ''.join(digits)
+        digits[i] = DIGITS[0]
+    # Carried out of the last digit: move to the next integer length
+    if head == 'Z':
+        return 'a' + DIGITS[0]
+    if head == 'z':
+        return None
+    head = chr(ord(head) + 1)
+    if head > 'a':
+        digits.append(DIGITS[0])
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+
+def _decrement_integer(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) - 1
+        if value >= 0:
+            digits[i] = DIGITS[value]
+            return head + ''.join(digits)
+        digits[i] = DIGITS[-1]
+    if head == 'a':
+        return 'Z' + DIGITS[-1]
+    if head == 'A':
+        return None
+    head = chr(ord(head) - 1)
+    if head < 'Z':
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+
+def key_between(a, b):
+    """Return a key that sorts after a and before b; either may be None for an open end"""
+    if a is not None:
+        validate_key(a)
+    if b is not None:
+        validate_key(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f'{a!r} is not below {b!r}')
+
+    if a is None and b is None:
+        return 'a' + DIGITS[0]
+
+    if a is None:
+        integer_b = _integer_part(b)
+        fraction_b = b[len(integer_b):]
+        if integer_b == SMALLEST_INTEGER:
+            return integer_b + _midpoint('', fraction_b)
+        if integer_b < b:
+            return integer_b
+        decremented = _decrement_integer(integer_b)
+        if decremented is None:
+            raise ValueError('cannot decrement any further')
+        return decremented
+
+    if b is None:
+        integer_a = _integer_part(a)
+        fraction_a = a[len(integer_a):]
+        incremented = _increment_integer(integer_a)
+        return integer_a + _midpoint(fraction_a, None) if incremented is None else incremented
+
+    integer_a = _integer_part(a)
+    fraction_a = a[len(integer_a):]
+    integer_b = _integer_part(b)
+    fraction_b = b[len(integer_b):]
+    if integer_a == integer_b:
+        return integer_a + _midpoint(fraction_a, fraction_b)
+    incremented = _increment_integer(integer_a)
+    if incremented is None:
+        raise ValueError('cannot increment any further')
+    if incremented < b:
+        return incremented
+    return integer_a + _midpoint(fraction_a, None)
+
+
+def keys_after(a, count):
+    """Generate count ascending keys after a (None for an empty list), e.g. for appends"""
+    for _ in range(count):
+        a = key_between(a, None)
+        yield a
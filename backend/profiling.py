@@ -0,0 +1,276 @@
+"""Profiling: cProfile for single requests and a sampling profiler across requests.
+
+Both are off unless PROFILER_ENABLED is set; with it off a request pays for
+one flag check. With it on:
+
+- An admin's request carrying "X-Profile: 1" runs under cProfile (one such
+  request at a time per worker). Its stats are saved in PROFILE_DIR as a
+  .pstats file, named in the X-Profile-Id response header.
+- Starting a sampling window writes a control file in PROFILE_DIR that each
+  worker notices within a second, on its next request. The worker then
+  records the stacks of its threads serving requests every
+  PROFILE_SAMPLE_INTERVAL_MS until the window ends and saves them in
+  collapsed ("folded") form. The workers' files are merged on download,
+  as folded text for flamegraph.pl or as speedscope JSON.
+
+Under gevent workers the sampler runs on a real OS thread and sees
+whichever greenlet is running at each sample, and a request profile also
+counts the other greenlets that ran while the request was waiting.
+"""
+import _thread
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'False').lower() == 'true'
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'todoapp-profiles'))
+# Oldest artifacts beyond this many are deleted
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '100'))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+PROFILE_SAMPLE_MAX_SECONDS = float(os.environ.get('PROFILE_SAMPLE_MAX_SECONDS', '300'))
+
+ARTIFACT_NAME = re.compile(r'^[A-Za-z0-9._-]+$')
+SAMPLING_CONTROL_FILE = 'sampling.json'
+
+
+def _original(module, name, default):
+    """The unpatched function if gevent has monkey patched the module"""
+    if 'gevent.monkey' in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched(module):
+            return monkey.get_original(module, name)
+    return default
+
+
+_request_profile_lock = threading.Lock()
+
+_sampling = None  # the running window's control dict, in this worker
+_sampled_threads = Counter()  # OS thread ident -> requests in flight on it
+# Shared with the sampler, which is a real OS thread even under gevent
+_threads_lock = _original('_thread', 'allocate_lock', _thread.allocate_lock)()
+_next_control_check = 0.0
+_control_lock = threading.Lock()
+
+
+def _artifact_path(name):
+    return os.path.join(PROFILE_DIR, name)
+
+
+def _prune():
+    names = [name for name in os.listdir(PROFILE_DIR) if name != SAMPLING_CONTROL_FILE]
+    if len(names) <= PROFILE_KEEP:
+        return
+    names.sort(key=lambda name: os.path.getmtime(_artifact_path(name)))
+    for name in names[:len(names) - PROFILE_KEEP]:
+        try:
+            os.remove(_artifact_path(name))
+        except OSError:
+            pass
+
+
+def list_artifacts():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    artifacts = []
+    for name in os.listdir(PROFILE_DIR):
+        if name == SAMPLING_CONTROL_FILE:
+            continue
+        stat = os.stat(_artifact_path(name))
+        artifacts.append({'name': name, 'size': stat.st_size, 'modified': stat.st_mtime})
+    return sorted(artifacts, key=lambda artifact: artifact['modified'], reverse=True)
+
+
+def artifact_path(name):
+    """Path of a stored artifact, or None for unknown or unsafe names"""
+    if not ARTIFACT_NAME.match(name) or name == SAMPLING_CONTROL_FILE:
+        return None
+    path = _artifact_path(name)
+    return path if os.path.isfile(path) else None
+
+
+# Single request profiles
+
+def start_request_profile():
+    """Start profiling this request; None if another request in this worker is being profiled"""
+    if not _request_profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def finish_request_profile(profiler, label):
+    """Stop the profiler and save its stats; returns the artifact name"""
+    profiler.disable()
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{re.sub(r'[^A-Za-z0-9_-]', '_', label)}.pstats"
+        profiler.dump_stats(_artifact_path(name))
+        _prune()
+        return name
+    finally:
+        _request_profile_lock.release()
+
+
+def abandon_request_profile(profiler):
+    profiler.disable()
+    _request_profile_lock.release()
+
+
+def pstats_text(path, sort='cumulative', limit=60):
+    """Human readable top functions of a saved profile"""
+    stream = io.StringIO()
+    pstats.Stats(path, stream=stream).sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+# Sampling profiler
+
+def start_sampling(seconds, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+    """Open a sampling window for every worker sharing PROFILE_DIR; returns the control dict"""
+    seconds = min(max(seconds, 1), PROFILE_SAMPLE_MAX_SECONDS)
+    control = {
+        'id': time.strftime('%Y%m%dT%H%M%S'),
+        'until': time.time() + seconds,
+        'interval_ms': max(interval_ms, 1),
+    }
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = _artifact_path(SAMPLING_CONTROL_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(control, f)
+    os.replace(path + '.tmp', path)
+    return control
+
+
+def _check_control_file():
+    global _next_control_check, _sampling
+    with _control_lock:
+        now = time.monotonic()
+        if now < _next_control_check:
+            return
+        _next_control_check = now + 1
+        try:
+            with open(_artifact_path(SAMPLING_CONTROL_FILE)) as f:
+                control = json.load(f)
+        except (OSError, ValueError):
+            return
+        if control['until'] <= time.time() or (_sampling and _sampling['id'] == control['id']):
+            return
+        _sampling = control
+        _original('_thread', 'start_new_thread', _thread.start_new_thread)(_sample, (control,))
+
+
+def enter_request():
+    """Called as a request starts: joins a new sampling window and marks this thread as sampled"""
+    if time.monotonic() >= _next_control_check:
+        _check_control_file()
+    if _sampling is None:
+        return None
+    ident = _original('_thread', 'get_ident', _thread.get_ident)()
+    with _threads_lock:
+        _sampled_threads[ident] += 1
+    return ident
+
+
+def exit_request(ident):
+    with _threads_lock:
+        _sampled_threads[ident] -= 1
+        if _sampled_threads[ident] <= 0:
+            del _sampled_threads[ident]
+
+
+def _frame_name(code):
+    filename = '/'.join(code.co_filename.replace(os.sep, '/').split('/')[-2:])
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def _sample(control):
+    global _sampling
+    sleep = _original('time', 'sleep', time.sleep)
+    interval = control['interval_ms'] / 1000
+    stacks = Counter()
+    try:
+        while time.time() < control['until']:
+            frames = sys._current_frames()
+            with _threads_lock:
+                idents = list(_sampled_threads)
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    stacks[';'.join(reversed(stack))] += 1
+            sleep(interval)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"sample-{control['id']}-{os.getpid()}.folded"
+        with open(_artifact_path(name), 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        _prune()
+    finally:
+        _sampling = None
+
+
+def merged_samples(sampling_id):
+    """Folded stacks of a sampling window, summed over the workers that took part"""
+    if not ARTIFACT_NAME.match(sampling_id) or not os.path.isdir(PROFILE_DIR):
+        return None
+    prefix = f'sample-{sampling_id}-'
+    names = [name for name in os.listdir(PROFILE_DIR) if name.startswith(prefix) and name.endswith('.folded')]
+    if not names:
+        return None
+    stacks = Counter()
+    for name in names:
+        with open(_artifact_path(name)) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                stacks[stack] += int(count)
+    return stacks
+
+
+def folded_text(stacks):
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+def speedscope_json(stacks, name):
+    """A speedscope (https://www.speedscope.app) sampled profile of folded stacks, weighted by sample count"""
+    frames = []
+    frame_index = {}
+    samples = []
+    weights = []
+    for stack, count in stacks.most_common():
+        sample = []
+        for frame in stack.split(';'):
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                match = re.match(r'^(.*) \((.*):(\d+)\)$', frame)
+                frames.append({'name': match[1], 'file': match[2], 'line': int(match[3])} if match
+                              else {'name': frame})
+            sample.append(frame_index[frame])
+        samples.append(sample)
+        weights.append(count)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'todo-app',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'none',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
@@ -0,0 +1,187 @@
+"""Token-bucket rate limiting shared across gunicorn workers through a local SQLite file.
+
+Every rule is a set of buckets keyed by client IP, user id or email address.
+A check is one short write transaction on a WAL database with fsync off, which
+keeps it well under a millisecond. Buckets are lost if the file is deleted, and
+that is acceptable for rate limiting.
+"""
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+import logs
+import metrics
+
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True').lower() == 'true'
+RATELIMIT_STORAGE_PATH = os.environ.get(
+    'RATELIMIT_STORAGE_PATH', os.path.join(tempfile.gettempdir(), 'todoapp-ratelimit.db')
+)
+# Number of reverse proxies in front of the app whose X-Forwarded-For entry we trust
+RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', '0'))
+
+log = logs.get_logger('ratelimit')
+
+# Rule name -> "scope:count/period" list; scopes are ip, user and email
+DEFAULT_RULES = {
+    'login': 'ip:20/minute,email:5/minute',
+    'forgot_password': 'ip:5/minute,email:3/hour',
+    'send_email_summary': 'ip:30/hour,user:10/hour',
+}
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+metrics.describe('ratelimit_rejected_total', 'Requests rejected with 429', 'counter')
+
+
+def parse_rule(spec):
+    """Parse 'ip:10/minute,email:5/hour' into [(scope, capacity, refill per second)]"""
+    limits = []
+    for part in spec.split(','):
+        scope, rate = part.strip().split(':')
+        count, period = rate.split('/')
+        limits.append((scope, int(count), int(count) / PERIODS[period]))
+    return limits
+
+
+RULES = {
+    name: parse_rule(os.environ.get(f'RATELIMIT_{name.upper()}', spec))
+    for name, spec in DEFAULT_RULES.items()
+}
+
+# One connection per process, used under a lock: threading.local would be
+# greenlet-local under gevent and open a connection for every request
+_connection = None
+_connection_pid = None
+_connection_lock = threading.Lock()
+
+UPSERT_BUCKET = '''
+INSERT INTO buckets (key, tokens, updated, allowed) VALUES (:key, :capacity - 1, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = CASE WHEN min(:capacity, tokens + (:now - updated) * :rate) >= 1
+                  THEN min(:capacity, tokens + (:now - updated) * :rate) - 1
+                  ELSE min(:capacity, tokens + (:now - updated) * :rate) END,
+    allowed = min(:capacity, tokens + (:now - updated) * :rate) >= 1,
+    updated = :now
+'''
+
+
+def _connect():
+    """This process's connection (opened after fork); call with _connection_lock held"""
+    global _connection, _connection_pid
+    if _connection_pid != os.getpid():
+        connection = sqlite3.connect(RATELIMIT_STORAGE_PATH, timeout=1, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=OFF')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, allowed INTEGER NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        _connection, _connection_pid = connection, os.getpid()
+    return _connection
+
+
+def take_token(key, capacity, rate):
+    """Take one token from the bucket; returns (allowed, tokens left)"""
+    now = time.time()
+    with _connection_lock:
+        connection = _connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(UPSERT_BUCKET, {'key': key, 'capacity': capacity, 'rate': rate, 'now': now})
+            tokens, allowed = connection.execute(
+                'SELECT tokens, allowed FROM buckets WHERE key = ?', (key,)
+            ).fetchone()
+            # Occasionally drop buckets idle for a day so the file stays small
+            if random.random() < 0.001:
+                connection.execute('DELETE FROM buckets WHERE updated < ?', (now - 86400,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+    return bool(allowed), tokens
+
+
+def client_ip():
+    if RATELIMIT_TRUSTED_PROXIES:
+        forwarded = [ip.strip() for ip in request.headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+        if len(forwarded) >= RATELIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATELIMIT_TRUSTED_PROXIES]
+    return request.remote_addr or 'unknown'
+
+
+def _scope_value(scope):
+    if scope == 'ip':
+        return client_ip()
+    if scope == 'user':
+        try:
+            return get_jwt_identity()
+        except RuntimeError:  # Route without @jwt_required
+            return None
+    if scope == 'email':
+        data = request.get_json(silent=True) or {}
+        email = data.get('email') or data.get('username')
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+    return None
+
+
+def rate_limit(rule_name):
+    """Decorator: apply RULES[rule_name] and send RateLimit-* headers; place below @jwt_required()"""
+    limits = RULES[rule_name]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not RATELIMIT_ENABLED:
+                return view(*args, **kwargs)
+
+            # Report the bucket closest to empty
+            tightest = None
+            rejected = None
+            try:
+                for scope, capacity, rate in limits:
+                    value = _scope_value(scope)
+                    if value is None:
+                        continue
+                    allowed, tokens = take_token(f'{rule_name}:{scope}:{value}', capacity, rate)
+                    state = (tokens / capacity, capacity, tokens, rate)
+                    if tightest is None or state < tightest:
+                        tightest = state
+                    if not allowed and rejected is None:
+                        rejected = state
+            except sqlite3.Error as e:
+                # Fail open: a broken limiter shouldn't take the endpoint down
+                log.warning('ratelimit.unavailable', "⚠️ Rate limiter unavailable", error=str(e))
+                return view(*args, **kwargs)
+
+            if rejected:
+                _, capacity, tokens, rate = rejected
+                metrics.inc('ratelimit_rejected_total', rule=rule_name)
+                retry_after = max(1, math.ceil((1 - tokens) / rate))
+                response = jsonify({'error': 'Too many requests, please slow down', 'retry_after': retry_after})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                _set_headers(response, capacity, tokens, rate)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if tightest:
+                _, capacity, tokens, rate = tightest
+                _set_headers(response, capacity, tokens, rate)
+            return response
+        return wrapper
+    return decorator
+
+
+def _set_headers(response, capacity, tokens, rate):
+    response.headers['RateLimit-Limit'] = str(capacity)
+    response.headers['RateLimit-Remaining'] = str(max(0, math.floor(tokens)))
+    response.headers['RateLimit-Reset'] = str(math.ceil((capacity - tokens) / rate))
@@ -0,0 +1,109 @@
+"""Read models: compact row DTOs for the paths that only read todos.
+
+Loading a Todo through the ORM builds an instance with its own __dict__,
+instance state and an identity-map entry, all of which the list, email and
+export paths never use. These NamedTuples are made straight from Core result
+rows (selecting the *_FIELDS columns in order), so a row costs one tuple.
+Each has the to_dict() of the model it stands for.
+"""
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+# Columns of a todo as listed by GET /api/todos, in TodoRow order (tags are loaded separately)
+TODO_ROW_FIELDS = (
+    'id', 'title', 'description', 'completed', 'created_at', 'updated_at', 'position',
+    'due_at', 'remind_at', 'reminder_sent_at', 'recurrence', 'user_id'
+)
+
+
+class TodoRow(NamedTuple):
+    id: int
+    title: str
+    description: Optional[str]
+    completed: bool
+    created_at: datetime
+    updated_at: datetime
+    position: Optional[str]
+    due_at: Optional[datetime]
+    remind_at: Optional[datetime]
+    reminder_sent_at: Optional[datetime]
+    recurrence: Optional[str]
+    user_id: int
+    tags: list
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'completed': self.completed,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'position': self.position,
+            'due_at': _iso(self.due_at),
+            'remind_at': _iso(self.remind_at),
+            'reminder_sent_at': _iso(self.reminder_sent_at),
+            'recurrence': self.recurrence,
+            'tags': self.tags,
+            'archived': False,
+            'user_id': self.user_id
+        }
+
+
+# ArchivedTodoRow order; tags is the stored JSON list
+ARCHIVED_TODO_ROW_FIELDS = (
+    'id', 'title', 'description', 'created_at', 'updated_at', 'position', 'due_at',
+    'remind_at', 'reminder_sent_at', 'recurrence', 'tags', 'archived_at', 'user_id'
+)
+
+
+class ArchivedTodoRow(NamedTuple):
+    id: int
+    title: str
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    position: Optional[str]
+    due_at: Optional[datetime]
+    remind_at: Optional[datetime]
+    reminder_sent_at: Optional[datetime]
+    recurrence: Optional[str]
+    tags: Optional[str]
+    archived_at: datetime
+    user_id: int
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'completed': True,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'position': self.position,
+            'due_at': _iso(self.due_at),
+            'remind_at': _iso(self.remind_at),
+            'reminder_sent_at': _iso(self.reminder_sent_at),
+            'recurrence': self.recurrence,
+            'tags': json.loads(self.tags) if self.tags else [],
+            'archived': True,
+            'archived_at': self.archived_at.isoformat(),
+            'user_id': self.user_id
+        }
+
+
+# What the email task lists show of each active todo
+TASK_ROW_FIELDS = ('id', 'title', 'description', 'created_at')
+
+
+class TaskRow(NamedTuple):
+    id: int
+    title: str
+    description: Optional[str]
+    created_at: datetime
@@ -0,0 +1,156 @@
+"""Recurrence rules for repeating todos (a subset of RFC 5545 RRULE).
+
+Accepted: 'daily', 'weekly', 'monthly', 'yearly', or an RRULE string such as
+'FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;COUNT=10' with FREQ, INTERVAL, BYDAY
+(weekly), BYMONTHDAY (monthly, 1..31 or -1 for the last day), COUNT and UNTIL.
+Monthly and yearly dates that don't exist (the 31st, Feb 29) fall on the last
+day of the month instead of being skipped.
+
+Only the next occurrence of a series is ever stored; next_occurrence() is
+called when the current one is completed.
+"""
+import calendar
+from datetime import datetime, timedelta
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+
+def parse_rule(text):
+    """Parse a rule into a dict; raises ValueError for anything unsupported"""
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError('recurrence must be a non-empty string')
+    text = text.strip().upper()
+    if text.startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    if text in FREQUENCIES:
+        text = f'FREQ={text}'
+
+    rule = {'INTERVAL': 1}
+    for part in text.split(';'):
+        if '=' not in part:
+            raise ValueError('recurrence must be daily, weekly, monthly, yearly or an RRULE like FREQ=WEEKLY;BYDAY=MO')
+        key, value = part.split('=', 1)
+        if key == 'FREQ':
+            if value not in FREQUENCIES:
+                raise ValueError('FREQ must be DAILY, WEEKLY, MONTHLY or YEARLY')
+            rule['FREQ'] = value
+        elif key in ('INTERVAL', 'COUNT'):
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f'{key} must be a positive integer')
+            rule[key] = int(value)
+        elif key == 'BYDAY':
+            days = value.split(',')
+            if not all(day in WEEKDAYS for day in days):
+                raise ValueError('BYDAY must list weekdays like MO,WE,FR')
+            rule['BYDAY'] = sorted({WEEKDAYS.index(day) for day in days})
+        elif key == 'BYMONTHDAY':
+            try:
+                days = sorted({int(day) for day in value.split(',')})
+            except ValueError:
+                raise ValueError('BYMONTHDAY must list days of the month')
+            if not all(1 <= day <= 31 or day == -1 for day in days):
+                raise ValueError('BYMONTHDAY days must be 1..31 or -1')
+            rule['BYMONTHDAY'] = days
+        elif key == 'UNTIL':
+            try:
+                rule['UNTIL'] = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S' if 'T' in value else '%Y%m%d')
+            except ValueError:
+                raise ValueError('UNTIL must look like 20251231 or 20251231T235959Z')
+        else:
+            raise ValueError(f'unsupported recurrence part {key}')
+
+    if 'FREQ' not in rule:
+        raise ValueError('recurrence needs a FREQ')
+    if 'BYDAY' in rule and rule['FREQ'] != 'WEEKLY':
+        raise ValueError('BYDAY is only supported with FREQ=WEEKLY')
+    if 'BYMONTHDAY' in rule and rule['FREQ'] != 'MONTHLY':
+        raise ValueError('BYMONTHDAY is only supported with FREQ=MONTHLY')
+    return rule
+
+
+def format_rule(rule):
+    parts = [f"FREQ={rule['FREQ']}"]
+    if rule['INTERVAL'] != 1:
+        parts.append(f"INTERVAL={rule['INTERVAL']}")
+    if 'BYDAY' in rule:
+        parts.append('BYDAY=' + ','.join(WEEKDAYS[day] for day in rule['BYDAY']))
+    if 'BYMONTHDAY' in rule:
+        parts.append('BYMONTHDAY=' + ','.join(str(day) for day in rule['BYMONTHDAY']))
+    if 'COUNT' in rule:
+        parts.append(f"COUNT={rule['COUNT']}")
+    if 'UNTIL' in rule:
+        parts.append(f"UNTIL={rule['UNTIL'].strftime('%Y%m%dT%H%M%SZ')}")
+    return ';'.join(parts)
+
+
+def normalize_rule(text, start):
+    """Canonical RRULE string for storage, pinned to the series start.
+
+    Monthly rules get the start's day of the month as BYMONTHDAY, so a
+    series starting on the 31st comes back to the 31st after a short month
+    (yearly ones step from the series start passed to next_occurrence).
+    """
+    rule = parse_rule(text)
+    if rule['FREQ'] == 'MONTHLY' and 'BYMONTHDAY' not in rule:
+        rule['BYMONTHDAY'] = [start.day]
+    return format_rule(rule)
+
+
+def _clamped(year, month, day, time_of):
+    last_day = calendar.monthrange(year, month)[1]
+    day = last_day if day == -1 else min(day, last_day)
+    return datetime(year, month, day, time_of.hour, time_of.minute, time_of.second)
+
+
+def _add_months(year, month, months):
+    month_index = year * 12 + month - 1 + months
+    return month_index // 12, month_index % 12 + 1
+
+
+def _step(rule, current, start):
+    """The occurrence right after current"""
+    interval = rule['INTERVAL']
+    freq = rule['FREQ']
+    if freq == 'DAILY':
+        return current + timedelta(days=interval)
+
+    if freq == 'WEEKLY':
+        days = rule.get('BYDAY')
+        if not days:
+            return current + timedelta(weeks=interval)
+        later = [day for day in days if day > current.weekday()]
+        if later:
+            return current + timedelta(days=later[0] - current.weekday())
+        week_start = current - timedelta(days=current.weekday())
+        return week_start + timedelta(weeks=interval, days=days[0])
+
+    if freq == 'MONTHLY':
+        days = rule.get('BYMONTHDAY') or [start.day]
+        candidates = sorted(_clamped(current.year, current.month, day, current) for day in days)
+        later = [candidate for candidate in candidates if candidate > current]
+        if later:
+            return later[0]
+        year, month = _add_months(current.year, current.month, interval)
+        return min(_clamped(year, month, day, current) for day in days)
+
+    return _clamped(current.year + interval, start.month, start.day, current)
+
+
+def next_occurrence(text, current, start, index, not_before=None):
+    """Next due date after `current`, the `index`-th occurrence of a series starting at `start`.
+
+    Occurrences before not_before (e.g. now, when a todo is completed late)
+    are skipped. Returns (due, index) or (None, None) when the series has ended.
+    """
+    rule = parse_rule(text)
+    due = current
+    while True:
+        due = _step(rule, due, start)
+        index += 1
+        if 'COUNT' in rule and index > rule['COUNT']:
+            return None, None
+        if 'UNTIL' in rule and due > rule['UNTIL']:
+            return None, None
+        if not_before is None or due >= not_before:
+            return due, index
@@ -0,0 +1,145 @@
+"""Reminder dispatch engine: an in-memory heap of the reminders due in the next window.
+
+The database is never polled row by row. Every REMINDER_WINDOW_SECONDS the
+engine asks load_due(until, limit) for pending reminders due before the end
+of the next window (an index range scan), keeps them in a heap, and sleeps
+until the earliest one is due. Due reminders are handed to dispatch(keys)
+in batches. Reminders set within the loaded window while the engine runs are
+added through notify().
+
+Delivery guarantees are up to dispatch: each worker may load the same
+reminders, so dispatch must claim rows atomically before sending them.
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import logs
+import metrics
+
+REMINDERS_ENABLED = os.environ.get('REMINDERS_ENABLED', 'True').lower() == 'true'
+REMINDER_WINDOW_SECONDS = float(os.environ.get('REMINDER_WINDOW_SECONDS', '60'))
+REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', '50'))
+# Most reminders held in memory; a denser window is loaded in several steps
+REMINDER_MAX_LOADED = int(os.environ.get('REMINDER_MAX_LOADED', '10000'))
+
+log = logs.get_logger('reminders')
+
+metrics.describe('reminder_queue_size', 'Reminders loaded into the in-memory heap', 'gauge')
+metrics.describe('reminder_loads_total', 'Next-window queries run', 'counter')
+
+
+class ReminderScheduler:
+    def __init__(self, load_due, dispatch, window_seconds=REMINDER_WINDOW_SECONDS,
+                 batch_size=REMINDER_BATCH_SIZE, max_loaded=REMINDER_MAX_LOADED):
+        self.load_due = load_due
+        self.dispatch = dispatch
+        self.window_seconds = window_seconds
+        self.batch_size = batch_size
+        self.max_loaded = max_loaded
+        self._heap = []  # (remind_at, key); keys are opaque todo identifiers from load_due
+        self._queued = set()
+        self._loaded_until = None
+        self._next_load = 0.0
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='reminders', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def join(self):
+        self._thread.join()
+
+    def queue_size(self):
+        return len(self._heap)
+
+    def notify(self, key, remind_at):
+        """Add a reminder set while running, if it falls inside the loaded window"""
+        with self._condition:
+            if self._loaded_until is None or remind_at > self._loaded_until:
+                return  # The next load picks it up
+            self._push(remind_at, key)
+            self._condition.notify()
+
+    def _push(self, remind_at, key):
+        if key not in self._queued:
+            self._queued.add(key)
+            heapq.heappush(self._heap, (remind_at, key))
+
+    def _load(self):
+        until = datetime.utcnow() + timedelta(seconds=self.window_seconds)
+        limit = max(self.max_loaded - len(self._heap), 1)
+        rows = self.load_due(until, limit)
+        metrics.inc('reminder_loads_total')
+        with self._condition:
+            for remind_at, key in rows:
+                self._push(remind_at, key)
+            if len(rows) >= limit:
+                # Window too dense to hold at once: come back when this part is done
+                self._loaded_until = rows[-1][0]
+                self._next_load = time.monotonic() + 1
+            else:
+                self._loaded_until = until
+                self._next_load = time.monotonic() + self.window_seconds / 2
+
+    def _run(self):
+        log.info('reminders.started', "⏰ Reminder engine started",
+                 window_seconds=self.window_seconds, batch_size=self.batch_size)
+        while not self._stopped:
+            if time.monotonic() >= self._next_load:
+                try:
+                    self._load()
+                except Exception as e:
+                    log.error('reminders.load_failed', "❌ Loading due reminders failed", error=str(e))
+                    self._next_load = time.monotonic() + self.window_seconds / 2
+
+            with self._condition:
+                now = datetime.utcnow()
+                due = []
+                while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                    _, key = heapq.heappop(self._heap)
+                    self._queued.discard(key)
+                    due.append(key)
+                if not due:
+                    wait = self._next_load - time.monotonic()
+                    if self._heap:
+                        wait = min(wait, (self._heap[0][0] - now).total_seconds())
+                    self._condition.wait(max(wait, 0.01))
+                    continue
+
+            try:
+                self.dispatch(due)
+            except Exception as e:
+                log.error('reminders.dispatch_failed', "❌ Reminder dispatch failed", reminders=len(due), error=str(e))
+
+
+_scheduler = None
+
+
+def start_scheduler(load_due, dispatch):
+    """Start this process's reminder engine once"""
+    global _scheduler
+    if _scheduler is None and REMINDERS_ENABLED:
+        _scheduler = ReminderScheduler(load_due, dispatch).start()
+    return _scheduler
+
+
+def notify(key, remind_at):
+    if _scheduler is not None and remind_at is not None:
+        _scheduler.notify(key, remind_at)
+
+
+@metrics.register_collector
+def collect_reminder_queue():
+    if _scheduler is not None:
+        yield 'reminder_queue_size', {}, _scheduler.queue_size()
@@ -0,0 +1,120 @@
+"""Circuit breakers for upstream calls (SMTP, Google).
+
+A breaker watches the outcome of the last BREAKER_WINDOW calls. When at least
+BREAKER_MIN_CALLS have been made and the failure rate reaches
+BREAKER_FAILURE_RATE it opens, and calls fail immediately with
+CircuitOpenError for BREAKER_OPEN_SECONDS. After that one trial call is let
+through (half-open): success closes the breaker, failure opens it again.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import logs
+import metrics
+
+FAILURE_RATE = float(os.environ.get('BREAKER_FAILURE_RATE', '0.5'))
+MIN_CALLS = int(os.environ.get('BREAKER_MIN_CALLS', '5'))
+WINDOW = int(os.environ.get('BREAKER_WINDOW', '20'))
+OPEN_SECONDS = float(os.environ.get('BREAKER_OPEN_SECONDS', '30'))
+
+log = logs.get_logger('resilience')
+
+STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+metrics.describe('circuit_breaker_state', 'Breaker state: 0 closed, 1 half-open, 2 open', 'gauge')
+metrics.describe('circuit_breaker_calls_total', 'Calls through a breaker by outcome', 'counter')
+metrics.describe('circuit_breaker_transitions_total', 'Breaker state changes', 'counter')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_rate=FAILURE_RATE, min_calls=MIN_CALLS, window=WINDOW, open_seconds=OPEN_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self._outcomes = deque(maxlen=window)  # True for failure
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        self.state = state
+        metrics.inc('circuit_breaker_transitions_total', upstream=self.name, to=state)
+        log.warning('breaker.transition', "🔌 Circuit breaker changed state", upstream=self.name, state=state)
+
+    def is_open(self):
+        """Cheap check for callers that want to skip work when the upstream is known bad"""
+        return self.state == 'open' and time.monotonic() - self.opened_at < self.open_seconds
+
+    def _allow(self):
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self._transition('half_open')
+            if self.state == 'half_open':
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def _record(self, failed):
+        with self._lock:
+            metrics.inc('circuit_breaker_calls_total', upstream=self.name, outcome='failure' if failed else 'success')
+            if self.state == 'half_open':
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                if failed:
+                    self.opened_at = time.monotonic()
+                    self._transition('open')
+                else:
+                    self._transition('closed')
+                return
+
+            self._outcomes.append(failed)
+            failures = sum(self._outcomes)
+            if (self.state == 'closed' and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self.opened_at = time.monotonic()
+                self._outcomes.clear()
+                self._transition('open')
+
+    def call(self, fn, *args, is_failure=None, **kwargs):
+        """Run fn through the breaker.
+
+        Exceptions count as failures and are re-raised; is_failure(result) can
+        mark a returned value (e.g. an HTTP 5xx) as a failure too.
+        """
+        if not self._allow():
+            metrics.inc('circuit_breaker_calls_total', upstream=self.name, outcome='rejected')
+            raise CircuitOpenError(f'{self.name} is unavailable (circuit open)')
+        try:
+            result = fn(*args, **kwargs)
+            failed = bool(is_failure and is_failure(result))
+        except BaseException:
+            # Including gevent's Timeout and GreenletExit: a half-open probe
+            # has to be settled, or the breaker never leaves half-open
+            self._record(True)
+            raise
+        self._record(failed)
+        return result
+
+
+breakers = {
+    'smtp': CircuitBreaker('smtp'),
+    'google': CircuitBreaker('google'),
+}
+
+
+@metrics.register_collector
+def collect_breaker_states():
+    for breaker in breakers.values():
+        state = 'open' if breaker.is_open() else ('half_open' if breaker.state != 'closed' else 'closed')
+        yield 'circuit_breaker_state', {'upstream': breaker.name}, STATE_VALUES[state]
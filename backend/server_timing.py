@@ -0,0 +1,100 @@
+"""Server-Timing header: where each API response's time went.
+
+The code doing the work adds its time to the request's phases: db (statement
+execution, from engine events), auth (JWT decode and blocklist check),
+serialize (to_dict() and JSON encoding), render (email bodies) and smtp.
+The header lists them with the request's total, e.g.
+
+    Server-Timing: auth;dur=0.3, db;dur=2.9;desc="queries=4", serialize;dur=1.2, total;dur=6.1
+
+so browser devtools and load tests can attribute latency per call. Time
+spent outside a request (background threads, CLI) isn't recorded.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+
+# Header order; any other phase follows these
+PHASES = ('auth', 'db', 'serialize', 'render', 'smtp')
+DESCRIPTIONS = {'db': 'queries={count}', 'smtp': 'messages={count}'}
+
+
+def begin():
+    if SERVER_TIMING_ENABLED:
+        g.server_timing = {}
+        g.server_timing_started = time.perf_counter()
+
+
+def _timings():
+    return g.get('server_timing') if has_request_context() else None
+
+
+def add(name, seconds):
+    """Add seconds to the request's phase"""
+    timings = _timings()
+    if timings is None:
+        return
+    entry = timings.get(name)
+    if entry is None:
+        timings[name] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+
+def add_since(name, started):
+    """Add the time since started (a time.perf_counter() value) to the request's phase"""
+    add(name, time.perf_counter() - started)
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_since(name, started)
+
+
+def header():
+    """The Server-Timing value for this request, or None"""
+    timings = _timings()
+    if timings is None:
+        return None
+    parts = []
+    for name in sorted(timings, key=lambda name: PHASES.index(name) if name in PHASES else len(PHASES)):
+        seconds, count = timings[name]
+        part = f'{name};dur={seconds * 1000:.1f}'
+        if name in DESCRIPTIONS:
+            part += f';desc="{DESCRIPTIONS[name].format(count=count)}"'
+        parts.append(part)
+    parts.append(f'total;dur={(time.perf_counter() - g.server_timing_started) * 1000:.1f}')
+    return ', '.join(parts)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with jsonify() counted as serialize"""
+
+    def response(self, *args, **kwargs):
+        with phase('serialize'):
+            return super().response(*args, **kwargs)
+
+
+if SERVER_TIMING_ENABLED:
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _start_statement(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and _timings() is not None:
+            context._server_timing_started = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _end_statement(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_server_timing_started', None)
+        if started is not None:
+            add_since('db', started)
@@ -0,0 +1,268 @@
+"""User-sharded SQLite mode: per-user data in N shard files, users in the central database.
+
+With DATABASE_SHARD_URLS set, the tables registered with shard_tables() (todos,
+tags, stats) live in one SQLite file per shard and each user's rows sit
+together in a single shard. Users, auth data and the user -> shard directory
+stay in the central database (SQLALCHEMY_DATABASE_URI). RoutingSession sends
+statements on sharded tables to the shard of the user in the JWT, or of the
+user selected with using_user_shard(), so users on different shards never
+share a write lock.
+
+Shard tables use AUTOINCREMENT with a separate id range per shard (shard i
+starts at i * SHARD_ID_SPACING). Ids are therefore unique across shards and
+survive moving a user with move_user(), which copies the user's rows while
+the user is briefly read-only.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import (Column, DateTime, Integer, MetaData, String, Table, func, insert, select,
+                        text, update)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.util import find_tables
+
+from db_engine import build_engine_options
+
+# Comma separated SQLite URLs, one per shard, e.g. sqlite:////data/shard0.db,sqlite:////data/shard1.db
+SHARD_URLS = [url.strip() for url in os.environ.get('DATABASE_SHARD_URLS', '').split(',') if url.strip()]
+SHARD_BIND_KEYS = [f'shard_{i}' for i in range(len(SHARD_URLS))]
+SHARDING_ENABLED = bool(SHARD_URLS)
+
+# How long a worker trusts its cached copy of a directory entry
+SHARD_DIRECTORY_CACHE_SECONDS = float(os.environ.get('SHARD_DIRECTORY_CACHE_SECONDS', '5'))
+# How long a move waits for requests that already resolved the old shard to finish
+SHARD_MOVE_DRAIN_SECONDS = float(os.environ.get('SHARD_MOVE_DRAIN_SECONDS', '35'))
+SHARD_ID_SPACING = 2 ** 40
+SHARD_MOVE_BATCH_SIZE = 1000
+
+# Central user -> shard directory (its own metadata, so it is never created in a shard)
+directory_metadata = MetaData()
+user_shard = Table(
+    'user_shard', directory_metadata,
+    Column('user_id', Integer, primary_key=True),
+    Column('shard', String(20), nullable=False, index=True),
+    Column('status', String(20), nullable=False, default='active'),  # active / moving
+    Column('updated_at', DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+)
+
+SHARDED_TABLES = set()
+
+_directory_cache = {}  # user_id -> (bind key, status, expires at)
+_directory_lock = threading.Lock()
+
+
+class ShardMovingError(Exception):
+    """Raised for a write by a user whose data is being moved to another shard"""
+
+
+def shard_tables(*tables):
+    """Register tables whose rows are stored per user in the shards"""
+    SHARDED_TABLES.update(table.name for table in tables)
+
+
+def build_shard_binds():
+    """Build SQLALCHEMY_BINDS entries for the configured shards"""
+    return {key: {'url': url, **build_engine_options(url)} for key, url in zip(SHARD_BIND_KEYS, SHARD_URLS)}
+
+
+def shard_metadata(metadata):
+    """Copy of the sharded tables for creating shard files.
+
+    Foreign keys to central tables (user) are dropped, since those rows live
+    in another file; keys between sharded tables keep their ON DELETE CASCADE.
+    """
+    copy = MetaData()
+    for table in metadata.sorted_tables:
+        if table.name not in SHARDED_TABLES:
+            continue
+        shard_table = table.to_metadata(copy)
+        for constraint in list(shard_table.foreign_key_constraints):
+            if constraint.elements[0].target_fullname.split('.')[0] not in SHARDED_TABLES:
+                shard_table.constraints.discard(constraint)
+                for foreign_key in constraint.elements:
+                    shard_table.foreign_keys.discard(foreign_key)
+                    foreign_key.parent.foreign_keys.discard(foreign_key)
+        if 'id' in shard_table.c and shard_table.c.id.primary_key:
+            shard_table.dialect_kwargs['sqlite_autoincrement'] = True
+    return copy
+
+
+def create_shard_schema(engine, shard_index, metadata):
+    """Create the shard's tables and start its id sequences in the shard's own range"""
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.dialect_kwargs.get('sqlite_autoincrement'):
+                connection.execute(
+                    text(
+                        'INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq '
+                        'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)'
+                    ),
+                    {'name': table.name, 'seq': shard_index * SHARD_ID_SPACING}
+                )
+
+
+def touches_sharded_table(mapper, clause):
+    if mapper is not None:
+        return mapper.persist_selectable.name in SHARDED_TABLES
+    if clause is not None:
+        return any(getattr(table, 'name', None) in SHARDED_TABLES
+                   for table in find_tables(clause, include_crud=True))
+    return False
+
+
+def lookup_shard(engine, user_id, fresh=False):
+    """(bind key, status) of the user's shard, placing new users on the least populated shard"""
+    now = time.monotonic()
+    cached = _directory_cache.get(user_id)
+    if cached and cached[2] > now and not fresh:
+        return cached[0], cached[1]
+
+    with engine.connect() as connection:
+        row = connection.execute(
+            select(user_shard.c.shard, user_shard.c.status).where(user_shard.c.user_id == user_id)
+        ).first()
+    if row is None:
+        row = _assign_shard(engine, user_id)
+
+    with _directory_lock:
+        _directory_cache[user_id] = (row[0], row[1], now + SHARD_DIRECTORY_CACHE_SECONDS)
+        if len(_directory_cache) > 100000:
+            for key in [key for key, entry in _directory_cache.items() if entry[2] < now]:
+                del _directory_cache[key]
+    return row[0], row[1]
+
+
+def _assign_shard(engine, user_id):
+    with engine.begin() as connection:
+        counts = dict(connection.execute(
+            select(user_shard.c.shard, func.count()).group_by(user_shard.c.shard)
+        ).all())
+        shard = min(SHARD_BIND_KEYS, key=lambda key: counts.get(key, 0))
+        try:
+            connection.execute(insert(user_shard).values(user_id=user_id, shard=shard, status='active'))
+            return shard, 'active'
+        except IntegrityError:
+            pass
+    # Another worker placed the user first
+    with engine.connect() as connection:
+        return connection.execute(
+            select(user_shard.c.shard, user_shard.c.status).where(user_shard.c.user_id == user_id)
+        ).one()
+
+
+def current_shard(engine):
+    """Bind key for sharded tables: the selected shard, or the shard of the user in the JWT"""
+    shard = g.get('shard_bind')
+    if shard:
+        return shard
+    identity = get_jwt_identity() if has_request_context() else None
+    if identity is None:
+        raise RuntimeError('No shard selected: use using_user_shard() outside authenticated requests')
+
+    shard, status = lookup_shard(engine, int(identity))
+    if status == 'moving' and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        raise ShardMovingError()
+    g.shard_bind = shard
+    return shard
+
+
+@contextmanager
+def using_shard(shard):
+    """Route sharded tables to the given bind key in this block"""
+    previous = g.get('shard_bind')
+    g.shard_bind = shard
+    try:
+        yield shard
+    finally:
+        g.shard_bind = previous
+
+
+@contextmanager
+def using_user_shard(engine, user_id):
+    """Route sharded tables to the user's shard (looked up fresh) in this block; no-op when not sharded"""
+    if not SHARDING_ENABLED:
+        yield None
+        return
+    with using_shard(lookup_shard(engine, user_id, fresh=True)[0]) as shard:
+        yield shard
+
+
+def each_shard():
+    """Bind keys to iterate over for work spanning all users ([None] when not sharded)"""
+    return SHARD_BIND_KEYS or [None]
+
+
+def _user_rows(table, user_id, tables):
+    """WHERE clause selecting the user's rows in a sharded table"""
+    if 'user_id' in table.c:
+        return table.c.user_id == user_id
+    for foreign_key in table.foreign_keys:
+        parent = foreign_key.column.table
+        if parent.name in tables and 'user_id' in parent.c:
+            return foreign_key.parent.in_(select(foreign_key.column).where(parent.c.user_id == user_id))
+    raise ValueError(f'cannot tell which rows of {table.name} belong to a user')
+
+
+def move_user(engines, central_engine, metadata, user_id, target, drain_seconds=SHARD_MOVE_DRAIN_SECONDS):
+    """Move a user's rows to another shard while other users keep running.
+
+    The user is read-only for the duration: the directory entry is set to
+    'moving' and, after the drain period, the rows are copied in one target
+    transaction, checked and only then is the directory switched. The source
+    copy is removed after another drain period. Returns rows copied per table.
+    """
+    source, status = lookup_shard(central_engine, user_id, fresh=True)
+    if source == target:
+        return {}
+    tables = [table for table in metadata.sorted_tables if table.name in SHARDED_TABLES]
+    names = {table.name: table for table in tables}
+
+    def set_directory(**values):
+        with central_engine.begin() as connection:
+            connection.execute(update(user_shard).where(user_shard.c.user_id == user_id).values(**values))
+
+    set_directory(status='moving')
+    try:
+        # Let in-flight writes that resolved the old entry finish and caches expire
+        time.sleep(drain_seconds)
+
+        copied = {}
+        with engines[source].connect() as source_connection, engines[target].begin() as target_connection:
+            # A failed earlier attempt may have left rows behind
+            for table in reversed(tables):
+                target_connection.execute(table.delete().where(_user_rows(table, user_id, names)))
+            for table in tables:
+                rows = source_connection.execute(
+                    select(table).where(_user_rows(table, user_id, names))
+                    .execution_options(yield_per=SHARD_MOVE_BATCH_SIZE)
+                )
+                copied[table.name] = 0
+                for batch in rows.partitions():
+                    target_connection.execute(table.insert(), [row._asdict() for row in batch])
+                    copied[table.name] += len(batch)
+            for table in tables:
+                count = target_connection.execute(
+                    select(func.count()).select_from(table).where(_user_rows(table, user_id, names))
+                ).scalar()
+                if count != copied[table.name]:
+                    raise RuntimeError(f'{table.name}: copied {copied[table.name]} rows but found {count}')
+    except BaseException:
+        set_directory(status='active')
+        raise
+
+    set_directory(shard=target, status='active')
+    with _directory_lock:
+        _directory_cache.pop(user_id, None)
+
+    # Readers may still hold the old entry until their cache expires
+    time.sleep(min(drain_seconds, SHARD_DIRECTORY_CACHE_SECONDS))
+    with engines[source].begin() as source_connection:
+        for table in reversed(tables):
+            source_connection.execute(table.delete().where(_user_rows(table, user_id, names)))
+    return copied
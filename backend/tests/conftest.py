@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+
+# Settings are read when the modules are imported, so they are set first
+_state_dir = tempfile.mkdtemp(prefix='todoapp-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_state_dir, 'import.db')
+os.environ['ADMISSION_STORAGE_PATH'] = os.path.join(_state_dir, 'admission.db')
+os.environ['RATELIMIT_STORAGE_PATH'] = os.path.join(_state_dir, 'ratelimit.db')
+os.environ['REPLICA_PIN_STORAGE_PATH'] = os.path.join(_state_dir, 'replica-pins.db')
+os.environ.setdefault('WARMUP_ENABLED', 'False')
+os.environ.setdefault('RATELIMIT_ENABLED', 'False')
+os.environ.setdefault('ACTIVITY_LOG_ENABLED', 'False')
+os.environ.setdefault('SEND_EMAIL_NOTIFICATIONS', 'False')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import app as todo_app
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A fresh app on its own SQLite database"""
+    flask_app = todo_app.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/todoapp.db', 'TESTING': True})
+    with flask_app.app_context():
+        todo_app.init_database()
+    yield flask_app
+    with flask_app.app_context():
+        todo_app.db.session.remove()
+        for engine in todo_app.db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, username='alice'):
+    """Register a user; returns their auth headers"""
+    response = client.post('/api/register', json={
+        'username': username, 'email': f'{username}@example.com', 'password': 'Passw0rd!23'
+    })
+    assert response.status_code == 201, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def auth(client):
+    return register(client)
@@ -0,0 +1,45 @@
+import threading
+
+import admission
+from admission import AdmissionGate, SlotStore
+
+
+def test_limit_is_shared_between_gates_on_the_same_store(tmp_path):
+    # Two gates on one file stand in for two worker processes
+    path = str(tmp_path / 'admission.db')
+    first = AdmissionGate('password_hash', limit=1, queue_size=4, queue_timeout=0.05, slots=SlotStore(path))
+    second = AdmissionGate('password_hash', limit=1, queue_size=4, queue_timeout=0.05, slots=SlotStore(path))
+
+    holder = first.acquire()
+    assert holder
+    assert second.acquire() is None
+
+    first.release(holder)
+    assert second.acquire()
+
+
+def test_queued_request_gets_a_slot_released_while_it_waits(tmp_path):
+    store = SlotStore(str(tmp_path / 'admission.db'))
+    gate = AdmissionGate('smtp', limit=1, queue_size=1, queue_timeout=2, slots=store)
+    holder = gate.acquire()
+    threading.Timer(0.1, gate.release, args=(holder,)).start()
+    assert gate.acquire()
+
+
+def test_expired_leases_are_freed(tmp_path, monkeypatch):
+    store = SlotStore(str(tmp_path / 'admission.db'))
+    monkeypatch.setattr(admission, 'ADMISSION_LEASE_SECONDS', -1)
+    assert store.take('google', 1)
+    # The first lease has already run out, as if its worker had died
+    assert store.take('google', 1)
+
+
+def test_full_gate_sheds_with_503(client, tmp_path, monkeypatch):
+    gate = AdmissionGate('password_hash', limit=1, queue_size=0, queue_timeout=0,
+                         slots=SlotStore(str(tmp_path / 'admission.db')))
+    monkeypatch.setitem(admission.gates, 'password_hash', gate)
+    gate.acquire()
+
+    response = client.post('/api/login', json={'username': 'alice', 'password': 'x'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(admission.RETRY_AFTER_SECONDS)
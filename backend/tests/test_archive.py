@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import app as todo_app
+from app import AccountDeletion, ArchivedTodo, Todo, archive_todos, db, init_database, run_account_deletion
+
+
+def add_todo(client, auth, title, completed=False, **fields):
+    todo = client.post('/api/todos', json={'title': title, **fields}, headers=auth).get_json()
+    if completed:
+        client.put(f"/api/todos/{todo['id']}", json={'completed': True}, headers=auth)
+    return todo
+
+
+def archive_all(app):
+    with app.app_context():
+        return archive_todos(datetime.utcnow() + timedelta(seconds=1))
+
+
+def titles(client, auth, **params):
+    return [todo['title'] for todo in client.get('/api/todos', query_string=params, headers=auth).get_json()]
+
+
+def test_archive_and_restore(app, client, auth):
+    add_todo(client, auth, 'open')
+    done = add_todo(client, auth, 'done', completed=True)
+    client.put(f"/api/todos/{done['id']}", json={'tags': ['home']}, headers=auth)
+
+    assert archive_all(app) == 1
+    assert titles(client, auth) == ['open']
+    assert sorted(titles(client, auth, include_archived='true')) == ['done', 'open']
+    assert client.get('/api/todos/stats', headers=auth).get_json()['completed'] == 1
+
+    response = client.post(f"/api/todos/{done['id']}/restore", headers=auth)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['id'] == done['id']
+    assert response.get_json()['tags'] == ['home']
+    assert sorted(titles(client, auth)) == ['done', 'open']
+
+
+def test_archived_ids_are_not_reused(app, client, auth):
+    add_todo(client, auth, 'first')
+    newest = add_todo(client, auth, 'newest', completed=True)
+    assert archive_all(app) == 1
+
+    again = add_todo(client, auth, 'again', completed=True)
+    assert again['id'] > newest['id']
+    assert archive_all(app) == 1
+    assert sorted(titles(client, auth, include_archived='true')) == ['again', 'first', 'newest']
+
+
+def test_init_database_rebuilds_a_todo_table_without_autoincrement(app, client, auth):
+    add_todo(client, auth, 'first')
+    newest = add_todo(client, auth, 'newest', completed=True)
+    with app.app_context():
+        # The todo table as created before AUTOINCREMENT
+        with db.engine.connect() as connection:
+            ddl = connection.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'todo'"))
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.exec_driver_sql(ddl.replace('AUTOINCREMENT', '').replace('todo (', 'todo_legacy (', 1))
+            connection.exec_driver_sql('INSERT INTO todo_legacy SELECT * FROM todo')
+            connection.exec_driver_sql('DROP TABLE todo')
+            connection.exec_driver_sql('ALTER TABLE todo_legacy RENAME TO todo')
+            connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+            connection.commit()
+        archive_todos(datetime.utcnow() + timedelta(seconds=1))
+
+    reused = add_todo(client, auth, 'reused')
+    assert reused['id'] == newest['id']
+
+    with app.app_context():
+        init_database()
+        archived = db.session.scalars(db.select(ArchivedTodo)).one()
+        assert archived.title == 'newest' and archived.id > reused['id']
+        db.session.add(Todo(title='later', user_id=archived.user_id))
+        db.session.commit()
+        later = db.session.scalars(db.select(Todo).filter_by(title='later')).one()
+        assert later.id > archived.id
+
+    assert client.delete(f"/api/todos/{reused['id']}", headers=auth).status_code == 200
+    assert sorted(titles(client, auth, include_archived='true')) == ['first', 'later', 'newest']
+
+
+def test_account_deletion_removes_archived_todos_in_chunks(app, client, auth, monkeypatch):
+    monkeypatch.setattr(todo_app, 'ACCOUNT_DELETION_CHUNK_SIZE', 1)
+    monkeypatch.setattr(todo_app, 'ACCOUNT_DELETION_PAUSE_MS', 0)
+    add_todo(client, auth, 'open')
+    add_todo(client, auth, 'old', completed=True)
+    add_todo(client, auth, 'older', completed=True)
+    archive_all(app)
+
+    with app.app_context():
+        user_id = db.session.scalar(db.select(Todo.user_id))
+        job = AccountDeletion(user_id=user_id)
+        db.session.add(job)
+        db.session.commit()
+        deleted_per_commit = []
+        monkeypatch.setattr(todo_app.time, 'sleep', lambda seconds: deleted_per_commit.append(job.todos_deleted))
+
+        job = run_account_deletion(job.id)
+        assert job.status == 'completed'
+        assert (job.todos_deleted, job.todos_total) == (3, 3)
+        assert deleted_per_commit == [1, 2, 3]
+        assert db.session.scalar(db.select(db.func.count(ArchivedTodo.id))) == 0
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+import app as todo_app
+import group_commit
+from group_commit import GroupCommitter, GroupCommitTimeout
+
+
+def run_async(function, *args):
+    """Run function in a thread; returns the thread and a dict that gets its result or error"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = function(*args)
+        except Exception as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, outcome
+
+
+def test_concurrent_mutations_share_a_batch():
+    batches = []
+    committer = GroupCommitter(lambda key, mutations: batches.append(key) or [m() for m in mutations],
+                               window_seconds=0.2)
+    runs = [run_async(committer.submit, 'shard', lambda n=n: n * 2) for n in range(5)]
+    for thread, _ in runs:
+        thread.join(5)
+    assert sorted(outcome['result'] for _, outcome in runs) == [0, 2, 4, 6, 8]
+    assert batches == ['shard']
+
+
+def test_a_failing_mutation_fails_alone():
+    def run_batch(key, mutations):
+        return [mutation() for mutation in mutations]
+
+    def bad():
+        raise ValueError('bad')
+
+    committer = GroupCommitter(run_batch, window_seconds=0.2)
+    good, good_outcome = run_async(committer.submit, None, lambda: 'ok')
+    failing, failing_outcome = run_async(committer.submit, None, bad)
+    good.join(5)
+    failing.join(5)
+    assert good_outcome == {'result': 'ok'}
+    assert isinstance(failing_outcome['error'], ValueError)
+
+
+@pytest.fixture
+def blocked_committer(monkeypatch):
+    """A committer whose first batch blocks until the returned event is set"""
+    monkeypatch.setattr(group_commit, 'GROUP_COMMIT_TIMEOUT_SECONDS', 0.2)
+    started, release = threading.Event(), threading.Event()
+    ran = []
+
+    def run_batch(key, mutations):
+        started.set()
+        release.wait(5)
+        ran.extend(mutations)
+        return [None] * len(mutations)
+    yield GroupCommitter(run_batch, window_seconds=0), started, release, ran
+    release.set()
+
+
+def test_timed_out_mutation_in_a_running_batch_may_have_applied(blocked_committer):
+    committer, started, release, ran = blocked_committer
+    with pytest.raises(GroupCommitTimeout) as timeout:
+        committer.submit(None, 'first')
+    assert started.is_set() and timeout.value.may_have_applied
+
+
+def test_timed_out_queued_mutation_is_withdrawn(blocked_committer):
+    committer, started, release, ran = blocked_committer
+    first, _ = run_async(committer.submit, None, 'first')
+    assert started.wait(5)
+    with pytest.raises(GroupCommitTimeout) as timeout:
+        committer.submit(None, 'queued')
+    assert not timeout.value.may_have_applied
+
+    release.set()
+    first.join(5)
+    # The committer moves on past the withdrawn mutation
+    assert committer.submit(None, 'next') is None
+    assert ran == ['first', 'next']
+
+
+@pytest.fixture
+def group_commit_on(app, monkeypatch):
+    committer = GroupCommitter(lambda shard, mutations: todo_app.run_group_commit(app, shard, mutations))
+    monkeypatch.setattr(group_commit, '_committer', committer)
+    return committer
+
+
+def test_checkbox_toggle_through_group_commit(client, auth, group_commit_on):
+    todo = client.post('/api/todos', json={'title': 'toggle me'}, headers=auth).get_json()
+    response = client.put(f"/api/todos/{todo['id']}", json={'completed': True}, headers=auth)
+    assert response.status_code == 200
+    assert response.get_json()['completed'] is True
+    assert client.get('/api/todos/stats', headers=auth).get_json()['completed'] == 1
+
+
+@pytest.mark.parametrize('may_have_applied, status', [(False, 503), (True, 202)])
+def test_toggle_timeouts(client, auth, group_commit_on, monkeypatch, may_have_applied, status):
+    def time_out(key, mutation):
+        raise GroupCommitTimeout(may_have_applied)
+    monkeypatch.setattr(group_commit_on, 'submit', time_out)
+
+    todo = client.post('/api/todos', json={'title': 'toggle me'}, headers=auth).get_json()
+    response = client.put(f"/api/todos/{todo['id']}", json={'completed': True}, headers=auth)
+    assert response.status_code == status
+    assert response.get_json()['applied'] is (None if may_have_applied else False)
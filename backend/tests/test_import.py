@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+
+def import_ndjson(client, auth, records):
+    body = '\n'.join(json.dumps(record) for record in records) + '\n'
+    return client.post('/api/todos/import?format=ndjson', data=body, headers=auth)
+
+
+def todos_by_title(client, auth):
+    return {todo['title']: todo for todo in client.get('/api/todos', headers=auth).get_json()}
+
+
+@pytest.mark.parametrize('records', [
+    [{'title': 'dated', 'created_at': '2024-01-01T00:00:00'}, {'title': 'undated'}],
+    [{'title': 'undated'}, {'title': 'dated', 'created_at': '2024-01-01T00:00:00'}],
+])
+def test_rows_with_and_without_timestamps_share_a_batch(client, auth, records):
+    response = import_ndjson(client, auth, records)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['rows_imported'] == 2
+
+    todos = todos_by_title(client, auth)
+    assert todos['dated']['created_at'].startswith('2024-01-01')
+    assert not todos['undated']['created_at'].startswith('2024-01-01')
+
+
+def test_invalid_rows_are_rejected_and_the_rest_imported(client, auth):
+    response = import_ndjson(client, auth, [
+        {'title': 'ok', 'description': 'fine'},
+        {'title': 'bad description', 'description': ['not', 'text']},
+        {'title': 42},
+        {'description': 'no title'},
+        {'title': 'done', 'completed': 'yes'},
+    ])
+    result = response.get_json()
+    assert response.status_code == 200
+    assert result['rows_imported'] == 2
+    assert [error['line'] for error in result['errors']] == [2, 3, 4]
+    assert set(todos_by_title(client, auth)) == {'ok', 'done'}
+
+    stats = client.get('/api/todos/stats', headers=auth).get_json()
+    assert (stats['total'], stats['active'], stats['completed']) == (2, 1, 1)
+
+
+def test_csv_import(client, auth):
+    body = 'title,description,completed\nfirst,,false\nsecond,notes,true\n'
+    response = client.post('/api/todos/import?format=csv', data=body, headers=auth)
+    assert response.get_json()['rows_imported'] == 2
+    assert todos_by_title(client, auth)['second']['completed'] is True
+
+
+@pytest.mark.parametrize('import_format, body, bad_line', [
+    ('ndjson', b'{"title": "ok"}\n{"title": "caf\xe9"}\n{"title": "also ok"}\n', 2),
+    ('csv', b'title\nok\ncaf\xe9\nalso ok\n', 3),
+])
+def test_lines_that_are_not_utf8_are_rejected(client, auth, import_format, body, bad_line):
+    response = client.post(f'/api/todos/import?format={import_format}', data=body, headers=auth)
+    result = response.get_json()
+    assert response.status_code == 200, result
+    assert (result['rows_imported'], result['rows_rejected']) == (2, 1)
+    assert [error['line'] for error in result['errors']] == [bad_line]
+    assert set(todos_by_title(client, auth)) == {'ok', 'also ok'}
@@ -0,0 +1,43 @@
+import sqlite3
+import threading
+
+import pytest
+
+import ratelimit
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'RATELIMIT_STORAGE_PATH', str(tmp_path / 'ratelimit.db'))
+    monkeypatch.setattr(ratelimit, '_connection', None)
+    monkeypatch.setattr(ratelimit, '_connection_pid', None)
+
+
+def test_one_connection_per_process(storage, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, 'connect', lambda *args, **kwargs: opened.append(args) or connect(*args, **kwargs))
+
+    threads = [threading.Thread(target=ratelimit.take_token, args=(f'test:{i}', 5, 1)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(opened) == 1
+
+
+def test_bucket_runs_out(storage):
+    results = [ratelimit.take_token('login:email:a@example.com', 3, 0.001)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+
+def test_login_is_limited_per_email(client, storage, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'RATELIMIT_ENABLED', True)
+    capacity = dict((scope, count) for scope, count, _ in ratelimit.RULES['login'])['email']
+
+    statuses = [
+        client.post('/api/login', json={'username': 'nobody@example.com', 'password': 'wrong'}).status_code
+        for _ in range(capacity + 1)
+    ]
+    assert statuses[-1] == 429
+    assert 429 not in statuses[:-1]
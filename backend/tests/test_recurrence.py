@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from app import Todo, db
+
+
+def add_daily(client, auth, **fields):
+    response = client.post('/api/todos', json={'title': 'water plants', 'due_at': '2030-01-01T09:00:00',
+                                               'recurrence': 'daily', **fields}, headers=auth)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
+
+
+def test_completing_spawns_the_next_occurrence(client, auth):
+    todo = add_daily(client, auth, remind_at='2030-01-01T08:30:00')
+    response = client.put(f"/api/todos/{todo['id']}", json={'completed': True}, headers=auth)
+    assert response.status_code == 200, response.get_json()
+
+    next_todo = response.get_json()['next_occurrence']
+    assert next_todo['due_at'].startswith('2030-01-02T09:00')
+    assert next_todo['remind_at'].startswith('2030-01-02T08:30')
+    assert next_todo['recurrence'] == todo['recurrence']
+
+
+def test_due_at_cannot_be_cleared_while_recurring(client, auth):
+    todo = add_daily(client, auth)
+    response = client.put(f"/api/todos/{todo['id']}", json={'due_at': None}, headers=auth)
+    assert response.status_code == 400
+
+    response = client.put(f"/api/todos/{todo['id']}", json={'due_at': None, 'recurrence': None}, headers=auth)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['due_at'] is None
+
+
+def test_completing_a_recurring_todo_without_due_at(app, client, auth):
+    todo = add_daily(client, auth, remind_at='2030-01-01T08:30:00')
+    with app.app_context():
+        db.session.get(Todo, todo['id']).due_at = None
+        db.session.commit()
+
+    response = client.put(f"/api/todos/{todo['id']}", json={'completed': True}, headers=auth)
+    assert response.status_code == 200, response.get_json()
+    due_at = datetime.fromisoformat(response.get_json()['next_occurrence']['due_at'])
+    assert due_at > datetime.utcnow() - timedelta(minutes=1)
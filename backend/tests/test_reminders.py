@@ -0,0 +1,135 @@
+import smtplib
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+import app as todo_app
+from app import Todo, User, db
+from resilience import CircuitBreaker
+
+
+class FakeConnection:
+    """Stands in for the SMTP connection; fails messages whose subject mentions "fail" """
+
+    def __init__(self, outbox):
+        self.outbox = outbox
+        self.last_message_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def send(self, message):
+        if 'fail' in message.subject:
+            raise smtplib.SMTPRecipientsRefused({})
+        self.outbox.append(message.subject)
+        self.last_message_bytes = len(message.subject)
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    sent = []
+    monkeypatch.setattr(todo_app, 'smtp_connection', lambda: FakeConnection(sent))
+    # Failures here shouldn't open the shared SMTP breaker for other tests
+    monkeypatch.setitem(todo_app.breakers, 'smtp', CircuitBreaker('smtp'))
+    return sent
+
+
+def add_due_reminders(client, auth, *titles):
+    ids = [client.post('/api/todos', json={'title': title}, headers=auth).get_json()['id']
+           for title in titles]
+    db.session.execute(update(Todo).where(Todo.id.in_(ids)).values(remind_at=datetime.utcnow() - timedelta(minutes=1)))
+    db.session.commit()
+    return ids
+
+
+def dispatch_due():
+    keys = [key for _, key in todo_app.load_due_reminders(datetime.utcnow(), 100)]
+    return todo_app.dispatch_reminders(keys)
+
+
+def expire_backoff():
+    db.session.execute(update(Todo).values(reminder_claimed_until=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+
+def test_one_failed_message_does_not_stop_the_batch(app, client, auth, outbox):
+    with app.app_context():
+        first, failing, last = add_due_reminders(client, auth, 'first', 'will fail', 'last')
+        assert dispatch_due() == 2
+        assert outbox == ['⏰ Reminder: first', '⏰ Reminder: last']
+
+        assert db.session.get(Todo, first).reminder_sent_at is not None
+        assert db.session.get(Todo, last).reminder_sent_at is not None
+        failed = db.session.get(Todo, failing)
+        assert failed.reminder_sent_at is None
+        assert failed.reminder_attempts == 1
+        assert failed.reminder_claimed_until > datetime.utcnow()
+
+        # Backing off: not claimed again yet
+        assert dispatch_due() == 0
+        assert db.session.get(Todo, failing).reminder_attempts == 1
+
+
+def test_failing_reminder_is_given_up_after_max_attempts(app, client, auth, outbox, monkeypatch):
+    monkeypatch.setattr(todo_app, 'REMINDER_MAX_ATTEMPTS', 3)
+    with app.app_context():
+        (todo_id,) = add_due_reminders(client, auth, 'will fail')
+        for _ in range(3):
+            dispatch_due()
+            expire_backoff()
+
+        todo = db.session.get(Todo, todo_id)
+        assert todo.reminder_attempts == 3
+        assert todo.reminder_failed_at is not None
+        assert todo_app.load_due_reminders(datetime.utcnow(), 100) == []
+
+
+def test_new_remind_at_resets_a_given_up_reminder(app, client, auth, outbox, monkeypatch):
+    monkeypatch.setattr(todo_app, 'REMINDER_MAX_ATTEMPTS', 1)
+    with app.app_context():
+        (todo_id,) = add_due_reminders(client, auth, 'will fail')
+        dispatch_due()
+    response = client.put(f'/api/todos/{todo_id}', json={'remind_at': '2030-01-01T09:00:00Z'}, headers=auth)
+    assert response.status_code == 200
+    with app.app_context():
+        todo = db.session.get(Todo, todo_id)
+        assert (todo.reminder_attempts, todo.reminder_failed_at) == (None, None)
+
+
+def test_reminder_of_a_missing_user_is_resolved(app, client, auth, outbox):
+    with app.app_context():
+        (todo_id,) = add_due_reminders(client, auth, 'orphan')
+        # As when the user lives in another database (sharded mode) and was deleted
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.execute(delete(User))
+            connection.commit()
+
+        assert dispatch_due() == 0
+        todo = db.session.get(Todo, todo_id)
+        assert todo.reminder_failed_at is not None
+        assert todo.reminder_claim is None
+        assert todo_app.load_due_reminders(datetime.utcnow(), 100) == []
+
+
+def test_leased_and_backing_off_reminders_are_loaded_for_when_they_end(app, client, auth, outbox):
+    with app.app_context():
+        backing_off, leased, due = add_due_reminders(client, auth, 'will fail', 'leased', 'due')
+        dispatch_due()
+        lease_end = datetime.utcnow() + timedelta(minutes=2)
+        db.session.execute(update(Todo).where(Todo.id == leased).values(reminder_sent_at=None,
+                                                                            reminder_claimed_until=lease_end))
+        db.session.execute(update(Todo).where(Todo.id == due).values(reminder_sent_at=None, reminder_claimed_until=None))
+        db.session.commit()
+        retry_at = db.session.get(Todo, backing_off).reminder_claimed_until
+
+        # Neither crowds out the due reminder while its lease or backoff runs
+        assert todo_app.load_due_reminders(datetime.utcnow(), 1) == [(db.session.get(Todo, due).remind_at,
+                                                                      (None, due))]
+        loaded = todo_app.load_due_reminders(datetime.utcnow() + timedelta(minutes=5), 10)
+        assert sorted(loaded) == sorted([(db.session.get(Todo, due).remind_at, (None, due)),
+                                         (retry_at, (None, backing_off)), (lease_end, (None, leased))])
@@ -0,0 +1,46 @@
+import multiprocessing
+
+from flask import g
+from sqlalchemy import insert, update
+
+import db_routing
+from app import Todo, TodoStats, db
+
+
+def test_core_dml_pins_the_request_to_the_primary(app, client, auth):
+    client.post('/api/todos', json={'title': 'first'}, headers=auth)
+    with app.test_request_context():
+        user_id = db.session.scalar(db.select(Todo.user_id))
+        db.session.execute(update(TodoStats).where(TodoStats.user_id == user_id).values(total=TodoStats.total + 1))
+        assert g.get('wrote_to_primary')
+
+    with app.test_request_context():
+        db.session.execute(insert(Todo.__table__).values(title='imported', user_id=user_id))
+        assert g.get('wrote_to_primary')
+
+
+def test_reads_do_not_pin(app):
+    with app.test_request_context():
+        db.session.execute(db.select(Todo)).all()
+        assert not g.get('wrote_to_primary')
+
+
+def test_dml_is_not_sent_to_a_replica(app):
+    with app.test_request_context():
+        # A replica route's statements would go to this (missing) bind
+        g.replica_bind = 'replica_0'
+        assert db.session.get_bind(clause=update(TodoStats).values(total=0)) is db.engine
+
+
+def test_a_write_pins_the_user_in_every_worker(monkeypatch):
+    # Another worker process: writes go through its own connection
+    context = multiprocessing.get_context('fork')
+    worker = context.Process(target=db_routing.record_write, args=('42',))
+    worker.start()
+    worker.join(5)
+    assert worker.exitcode == 0
+
+    assert db_routing.is_pinned_to_primary('42')
+    assert not db_routing.is_pinned_to_primary('43')
+    monkeypatch.setattr(db_routing, 'READ_YOUR_WRITES_SECONDS', 0)
+    assert not db_routing.is_pinned_to_primary('42')
@@ -0,0 +1,45 @@
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError
+
+
+class Interrupted(BaseException):
+    """Stands in for gevent.Timeout or GreenletExit"""
+
+
+def fail():
+    raise ConnectionError('down')
+
+
+def opened_breaker():
+    breaker = CircuitBreaker('test', min_calls=1, open_seconds=0)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == 'open'
+    return breaker
+
+
+def test_successful_probe_closes_the_breaker():
+    breaker = opened_breaker()
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == 'closed'
+
+
+def test_probe_interrupted_by_base_exception_reopens_the_breaker():
+    breaker = opened_breaker()
+
+    def interrupted():
+        raise Interrupted()
+    with pytest.raises(Interrupted):
+        breaker.call(interrupted)
+    assert breaker.state == 'open'
+    # The probe slot was released, so the next probe is let through
+    assert breaker.call(lambda: 'ok') == 'ok'
+
+
+def test_open_breaker_rejects_calls():
+    breaker = CircuitBreaker('test', min_calls=1, open_seconds=60)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
@@ -0,0 +1,28 @@
+from sqlalchemy import delete, insert
+
+import app as todo_app
+from app import Todo, TodoStats, db
+
+
+def test_concurrent_first_write_adds_to_the_seeded_row(app, client, auth, monkeypatch):
+    client.post('/api/todos', json={'title': 'first'}, headers=auth)
+    with app.app_context():
+        user_id = db.session.scalar(db.select(Todo.user_id))
+        db.session.execute(delete(TodoStats))
+        db.session.commit()
+
+    compute_todo_stats = todo_app.compute_todo_stats
+
+    def seeded_meanwhile(user_id):
+        # Another request seeds the row from the todos it could see, just before this one
+        db.session.execute(insert(TodoStats).values(user_id=user_id, total=1, active=1, completed=0))
+        return compute_todo_stats(user_id)
+    monkeypatch.setattr(todo_app, 'compute_todo_stats', seeded_meanwhile)
+
+    response = client.post('/api/todos', json={'title': 'second'}, headers=auth)
+    assert response.status_code == 201, response.get_json()
+    monkeypatch.undo()
+    stats = client.get('/api/todos/stats', headers=auth).get_json()
+    assert (stats['total'], stats['active'], stats['completed']) == (2, 2, 0)
+    with app.app_context():
+        assert db.session.get(TodoStats, user_id).total == 2
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+import app as todo_app
+import warmup
+
+
+@pytest.fixture
+def fresh_warmup(monkeypatch):
+    """Warm-up state as in a worker that hasn't started it yet"""
+    monkeypatch.setattr(warmup, '_status', {'state': 'not_started', 'started_at': None, 'finished_at': None,
+                                            'steps': {}})
+    monkeypatch.setattr(warmup, '_done', threading.Event())
+    warmup._done.set()
+
+
+@pytest.fixture
+def slow_step(fresh_warmup, monkeypatch):
+    """A single warm-up step that runs until the returned event is set"""
+    release = threading.Event()
+    monkeypatch.setitem(warmup._steps, 'slow', lambda: release.wait(5))
+    monkeypatch.setattr(warmup, 'WARMUP_STEPS', ['slow'])
+    yield release
+    release.set()
+
+
+def test_ready_is_503_until_background_warmup_finishes(app, client, slow_step):
+    thread = warmup.start_warmup(app)
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    assert response.get_json()['state'] in ('not_started', 'running')
+    assert client.get('/api/health').status_code == 200
+
+    slow_step.set()
+    thread.join(5)
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.get_json()['steps']['slow']['ok']
+
+
+def test_requests_wait_for_warmup(app, slow_step):
+    warmup.start_warmup(app)
+    responses = []
+    request = threading.Thread(target=lambda: responses.append(app.test_client().get('/api/todos')))
+    request.start()
+    request.join(0.3)
+    assert request.is_alive() and not responses
+
+    slow_step.set()
+    request.join(5)
+    # Served (401: no token) rather than turned away
+    assert responses[0].status_code == 401
+
+
+def test_requests_get_503_when_warmup_outlasts_the_hold(app, client, slow_step, monkeypatch):
+    monkeypatch.setattr(warmup, 'WARMUP_HOLD_SECONDS', 0.1)
+    warmup.start_warmup(app)
+    response = client.get('/api/todos')
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+
+
+def test_frontend_is_served_after_warmup_cached_its_dir(app, client, fresh_warmup, monkeypatch, tmp_path):
+    build = tmp_path / 'frontend' / 'build'
+    build.mkdir(parents=True)
+    (build / 'index.html').write_text('<html>todo</html>')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(todo_app, '_frontend_dir_cache', None)
+    monkeypatch.setattr(warmup, 'WARMUP_STEPS', ['static_manifest'])
+
+    assert warmup.run_warmup(app)['steps']['static_manifest']['ok']
+    assert todo_app._frontend_dir_cache == str(build)
+    for path in ('/', '/todos'):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert b'todo' in response.data
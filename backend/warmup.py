@@ -0,0 +1,103 @@
+"""Per-worker warm-up: prime connections and caches before the worker serves traffic.
+
+Warm-up runs on a background thread (a greenlet under gevent), so the worker
+can already answer /api/ready (503 until the steps have finished). Every
+other request the worker receives meanwhile is held until warm-up is done
+(at most WARMUP_HOLD_SECONDS, then 503), so none of them runs cold.
+"""
+import os
+import threading
+import time
+
+import logs
+
+WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', 'True').lower() == 'true'
+# How long a request waits for a warm-up in progress before it is answered 503
+WARMUP_HOLD_SECONDS = float(os.environ.get('WARMUP_HOLD_SECONDS', '30'))
+
+# Steps run in this order; unknown names are ignored
+WARMUP_STEPS = [
+    step.strip()
+    for step in os.environ.get('WARMUP_STEPS', 'db_pool,static_manifest,google_certs,email_templates,query').split(',')
+    if step.strip()
+]
+
+log = logs.get_logger('warmup')
+
+_steps = {}
+_status = {
+    'state': 'not_started' if WARMUP_ENABLED else 'disabled',
+    'started_at': None,
+    'finished_at': None,
+    'steps': {},
+}
+_lock = threading.Lock()
+# Cleared while a started warm-up hasn't finished
+_done = threading.Event()
+_done.set()
+
+
+def warmup_step(name):
+    """Register a warm-up step; the function runs inside an app context"""
+    def decorator(fn):
+        _steps[name] = fn
+        return fn
+    return decorator
+
+
+def run_warmup(app):
+    """Run the configured warm-up steps once; a failing step is recorded, not raised"""
+    with _lock:
+        if _status['state'] != 'not_started':
+            return _status
+        _status['state'] = 'running'
+        _status['started_at'] = time.time()
+
+    try:
+        with app.app_context():
+            for name in WARMUP_STEPS:
+                fn = _steps.get(name)
+                if fn is None:
+                    continue
+                start = time.perf_counter()
+                try:
+                    fn()
+                    _status['steps'][name] = {'ok': True}
+                except Exception as e:
+                    _status['steps'][name] = {'ok': False, 'error': str(e)}
+                    log.warning('warmup.step_failed', "⚠️ Warm-up step failed", step=name, error=str(e))
+                _status['steps'][name]['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    finally:
+        _status['finished_at'] = time.time()
+        _status['state'] = 'ready'
+        _done.set()
+    total_ms = round((_status['finished_at'] - _status['started_at']) * 1000, 1)
+    log.info('warmup.finished', "🔥 Warm-up finished", ms=total_ms, steps=list(_status['steps']))
+    return _status
+
+
+def start_warmup(app):
+    """Run warm-up in the background, holding requests until it finishes; returns the thread"""
+    # Cleared before the worker accepts connections, so no request slips in ahead of the steps
+    if _status['state'] == 'not_started':
+        _done.clear()
+    thread = threading.Thread(target=run_warmup, args=(app,), name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready():
+    return _status['state'] in ('ready', 'disabled')
+
+
+def wait_for_warmup():
+    """Block while a started warm-up is running (at most WARMUP_HOLD_SECONDS); returns whether it finished"""
+    return _done.wait(WARMUP_HOLD_SECONDS)
+
+
+def warmup_status():
+    return {
+        'ready': is_ready(),
+        'state': _status['state'],
+        'steps': dict(_status['steps']),
+    }
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark sync vs async (gevent) gunicorn workers with a slow SMTP upstream.
+
+Starts a fake SMTP server that sleeps before accepting each message, boots the
+backend under gunicorn in each SERVER_MODE and fires concurrent
+/api/send-email-summary requests plus GET /api/todos at it.
+
+Usage:
+    python benchmarks/bench_async_mode.py --concurrency 200 --requests 400 --latency 0.5
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+class SlowSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib/Flask-Mail, with injected latency on DATA"""
+    latency = 0.5
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        self.reply('220 bench ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.wfile.write(b'250-bench\r\n250 AUTH PLAIN LOGIN\r\n')
+            elif command.startswith('HELO'):
+                self.reply('250 bench')
+            elif command.startswith('AUTH'):
+                self.reply('235 Authentication successful')
+            elif command.startswith('DATA'):
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(self.latency)
+                self.reply('250 OK')
+            elif command.startswith('QUIT'):
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class ThreadedSMTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def http(method, url, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    req.add_header('Content-Type', 'application/json')
+    if token:
+        req.add_header('Authorization', f'Bearer {token}')
+    with urllib.request.urlopen(req, timeout=120) as resp:
+        return resp.status, json.loads(resp.read() or b'null')
+
+
+def wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            http('GET', url)
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server at {url} did not come up')
+
+
+def run_mode(mode, args, smtp_port):
+    port = free_port()
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    env = dict(
+        os.environ,
+        SERVER_MODE=mode,
+        DATABASE_URL=f'sqlite:///{db_path}',
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=str(smtp_port),
+        MAIL_USE_TLS='False',
+        MAIL_USERNAME='bench',
+        MAIL_PASSWORD='bench',
+        MAIL_DEFAULT_SENDER='bench@example.com',
+        WEB_CONCURRENCY=str(args.workers),
+    )
+    subprocess.run(['flask', '--app', 'app', 'init-db'], cwd=BACKEND_DIR, env=env,
+                   capture_output=True, check=True)
+    server = subprocess.Popen(
+        ['gunicorn', '--bind', f'127.0.0.1:{port}', 'app:app'],
+        cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f'http://127.0.0.1:{port}'
+    try:
+        wait_for(f'{base}/api/health')
+        _, data = http('POST', f'{base}/api/register',
+                       {'username': 'bench', 'email': 'bench@example.com', 'password': 'benchpass'})
+        token = data['access_token']
+
+        def timed(method, path):
+            start = time.perf_counter()
+            try:
+                status, _ = http(method, base + path, {} if method == 'POST' else None, token)
+            except Exception:
+                status = None
+            return status, time.perf_counter() - start
+
+        jobs = []
+        for i in range(args.requests):
+            if i % 2:
+                jobs.append(('GET', '/api/todos'))
+            else:
+                jobs.append(('POST', '/api/send-email-summary'))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda job: (job[0],) + timed(*job), jobs))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {'mode': mode, 'elapsed_s': round(elapsed, 2), 'req_per_s': round(len(jobs) / elapsed, 1)}
+    for method, label in (('GET', 'get_todos'), ('POST', 'email_summary')):
+        latencies = sorted(t for m, s, t in results if m == method and s == 200)
+        errors = sum(1 for m, s, _ in results if m == method and s != 200)
+        if latencies:
+            report[f'{label}_p50_ms'] = round(statistics.median(latencies) * 1000, 1)
+            report[f'{label}_p99_ms'] = round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1)
+        report[f'{label}_errors'] = errors
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds the SMTP server waits per message')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--modes', default='sync,async')
+    args = parser.parse_args()
+
+    SlowSMTPHandler.latency = args.latency
+    smtp_port = free_port()
+    smtp = ThreadedSMTPServer(('127.0.0.1', smtp_port), SlowSMTPHandler)
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+
+    print(f'📊 {args.requests} requests, concurrency {args.concurrency}, '
+          f'{args.workers} workers, SMTP latency {args.latency}s')
+    for mode in args.modes.split(','):
+        print(json.dumps(run_mode(mode, args, smtp_port)))
+    smtp.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure backend cold start: module import time and gunicorn time-to-first-response.
+
+Each run uses a fresh interpreter and a fresh SQLite database, so the numbers
+include everything a new worker pays before it can answer /api/health.
+
+Usage:
+    python benchmarks/bench_cold_start.py --runs 10
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+IMPORT_SNIPPET = 'import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)'
+
+
+def fresh_env():
+    db_path = os.path.join(tempfile.mkdtemp(), 'coldstart.db')
+    return dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=fresh_env(), capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_response(app_target, init_db):
+    env = fresh_env()
+    if init_db:
+        subprocess.run(['flask', '--app', 'app', 'init-db'], cwd=BACKEND_DIR, env=env,
+                       capture_output=True, check=True)
+
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        ['gunicorn', '--bind', f'127.0.0.1:{port}', app_target],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=5) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError('gunicorn exited before serving')
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(samples):
+    return {
+        'median_ms': round(statistics.median(samples) * 1000, 1),
+        'min_ms': round(min(samples) * 1000, 1),
+        'max_ms': round(max(samples) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--app', default='app:app', help='gunicorn app target')
+    parser.add_argument('--init-db', action='store_true', help='run `flask init-db` before booting gunicorn')
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    first_responses = [measure_first_response(args.app, args.init_db) for _ in range(args.runs)]
+
+    print(json.dumps({
+        'runs': args.runs,
+        'import_app': summarize(imports),
+        'time_to_first_response': summarize(first_responses),
+    }))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark checkbox-toggle throughput with group commit off and on.
+
+Boots the backend under gunicorn with gevent workers and SQLite at
+synchronous=FULL (every commit is an fsync), then has concurrent clients
+toggle their todos via PUT /api/todos/<id> {"completed": ...} for a fixed
+time. Checks afterwards that every user's stats still match their todos.
+
+Usage:
+    python benchmarks/bench_group_commit.py --concurrency 64 --seconds 10
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def http(method, url, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    req.add_header('Content-Type', 'application/json')
+    if token:
+        req.add_header('Authorization', f'Bearer {token}')
+    with urllib.request.urlopen(req, timeout=120) as resp:
+        return resp.status, json.loads(resp.read() or b'null')
+
+
+def wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            http('GET', url)
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server at {url} did not come up')
+
+
+def run_mode(group_commit, args):
+    port = free_port()
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    env = dict(
+        os.environ,
+        SERVER_MODE='async',
+        DATABASE_URL=f'sqlite:///{db_path}',
+        SQLITE_SYNCHRONOUS=args.synchronous,
+        GROUP_COMMIT_ENABLED=str(group_commit),
+        GROUP_COMMIT_WINDOW_MS=str(args.window_ms),
+        WEB_CONCURRENCY=str(args.workers),
+        WARMUP_STEPS='db_pool,query',
+        SEND_EMAIL_NOTIFICATIONS='False',
+        ACTIVITY_LOG_ENABLED='False',
+        REMINDERS_ENABLED='False',
+    )
+    subprocess.run(['flask', '--app', 'app', 'init-db'], cwd=BACKEND_DIR, env=env,
+                   capture_output=True, check=True)
+    server = subprocess.Popen(
+        ['gunicorn', '--bind', f'127.0.0.1:{port}', 'app:app'],
+        cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f'http://127.0.0.1:{port}'
+    try:
+        wait_for(f'{base}/api/health')
+        users = []
+        for i in range(args.users):
+            _, data = http('POST', f'{base}/api/register',
+                           {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': 'benchpass'})
+            token = data['access_token']
+            todo_ids = [http('POST', f'{base}/api/todos', {'title': f'todo {j}'}, token)[1]['id']
+                        for j in range(args.todos)]
+            users.append((token, todo_ids))
+
+        stop_at = time.perf_counter() + args.seconds
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def client(n):
+            token, todo_ids = users[n % len(users)]
+            rng = random.Random(n)
+            while time.perf_counter() < stop_at:
+                todo_id = rng.choice(todo_ids)
+                start = time.perf_counter()
+                try:
+                    status, _ = http('PUT', f'{base}/api/todos/{todo_id}', {'completed': rng.random() < 0.5}, token)
+                except Exception:
+                    status = None
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if status == 200:
+                        latencies.append(elapsed)
+                    else:
+                        errors[0] += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(client, range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+        # Counters must still agree with the todos after concurrent toggles
+        stats_ok = True
+        for token, _ in users:
+            _, todos = http('GET', f'{base}/api/todos', token=token)
+            _, stats = http('GET', f'{base}/api/todos/stats', token=token)
+            completed = sum(1 for todo in todos if todo['completed'])
+            stats_ok &= stats['completed'] == completed and stats['active'] == len(todos) - completed
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    report = {
+        'group_commit': group_commit,
+        'toggles': len(latencies),
+        'toggles_per_s': round(len(latencies) / elapsed, 1),
+        'errors': errors[0],
+        'stats_consistent': stats_ok,
+    }
+    if latencies:
+        report['p50_ms'] = round(statistics.median(latencies) * 1000, 1)
+        report['p99_ms'] = round(latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000, 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=16)
+    parser.add_argument('--todos', type=int, default=20, help='todos per user')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--window-ms', type=float, default=2)
+    parser.add_argument('--synchronous', default='FULL', help='SQLite synchronous pragma')
+    args = parser.parse_args()
+
+    print(f'📊 {args.concurrency} clients for {args.seconds:g}s, {args.workers} gevent workers, '
+          f'synchronous={args.synchronous}, window {args.window_ms:g}ms')
+    for group_commit in (False, True):
+        print(json.dumps(run_mode(group_commit, args)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Compare memory and allocations of loading todos as ORM objects vs row DTOs.
+
+Fills a temporary SQLite database with one user's todos (a third of them
+tagged), then loads them all the way GET /api/todos used to (Todo objects
+with selectinload(Todo.tags)) and the way it does now (load_todo_rows into
+TodoRow tuples). For each it reports, via tracemalloc, the memory retained
+by the loaded list, the peak while loading, the number of live allocations,
+and the wall time (measured separately, without tracing); each loader also
+serializes its rows with to_dict() to check the output matches.
+
+Usage:
+    python benchmarks/bench_read_models.py --todos 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--todos', type=int, default=100000)
+    parser.add_argument('--tags', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    os.environ.setdefault('WARMUP_ENABLED', 'False')
+    os.environ.setdefault('ACTIVITY_LOG_ENABLED', 'False')
+    os.environ.setdefault('REMINDERS_ENABLED', 'False')
+    sys.path.insert(0, BACKEND_DIR)
+    from sqlalchemy import insert, select
+    from sqlalchemy.orm import selectinload
+
+    from app import TODO_ROW_COLUMNS, Tag, Todo, User, app, db, init_database, load_todo_rows, todo_tag
+
+    with app.app_context():
+        init_database()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('benchpass')
+        db.session.add(user)
+        db.session.commit()
+        now = datetime.utcnow()
+        db.session.execute(insert(Tag), [
+            {'name': f'tag{i}', 'user_id': user.id} for i in range(args.tags)
+        ])
+        db.session.execute(insert(Todo), [
+            {'title': f'todo {i}', 'description': 'some description' if i % 2 else None,
+             'completed': i % 3 == 0, 'created_at': now - timedelta(seconds=i), 'updated_at': now,
+             'position': f'a{i:07d}', 'due_at': now + timedelta(days=i % 30) if i % 4 == 0 else None,
+             'user_id': user.id}
+            for i in range(args.todos)
+        ])
+        todo_ids = db.session.execute(select(Todo.id)).scalars().all()
+        tag_ids = db.session.execute(select(Tag.id)).scalars().all()
+        db.session.execute(insert(todo_tag), [
+            {'todo_id': todo_id, 'tag_id': tag_ids[todo_id % len(tag_ids)]}
+            for todo_id in todo_ids if todo_id % 3 == 0
+        ])
+        db.session.commit()
+        user_id = user.id
+
+        def load_orm():
+            return (Todo.query.options(selectinload(Todo.tags)).filter_by(user_id=user_id)
+                    .order_by(Todo.created_at.desc(), Todo.id.desc()).all())
+
+        def load_rows():
+            return load_todo_rows(
+                select(*TODO_ROW_COLUMNS).where(Todo.user_id == user_id)
+                .order_by(Todo.created_at.desc(), Todo.id.desc())
+            )
+
+        print(f'📊 {args.todos} todos, {args.tags} tags, a third of the todos tagged')
+        output = {}
+        for name, load in (('orm', load_orm), ('rows', load_rows)):
+            db.session.expunge_all()
+            gc.collect()
+            start = time.perf_counter()
+            load()
+            elapsed = time.perf_counter() - start
+            db.session.expunge_all()
+            gc.collect()
+
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            loaded = load()
+            gc.collect()
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            diff = [stat for stat in after.compare_to(before, 'filename') if stat.size_diff > 0]
+            retained = sum(stat.size_diff for stat in diff)
+            blocks = sum(stat.count_diff for stat in diff)
+
+            output[name] = json.dumps([item.to_dict() for item in loaded], default=str, sort_keys=True)
+            print(json.dumps({
+                'loader': name,
+                'todos': len(loaded),
+                'retained_mb': round(retained / 2 ** 20, 1),
+                'bytes_per_todo': round(retained / len(loaded)),
+                'live_blocks': blocks,
+                'blocks_per_todo': round(blocks / len(loaded), 1),
+                'peak_mb': round(peak / 2 ** 20, 1),
+                'load_s': round(elapsed, 3),
+            }))
+            del loaded
+        print(json.dumps({'same_output': output['orm'] == output['rows']}))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())